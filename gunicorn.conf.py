@@ -0,0 +1,48 @@
+# Gunicorn configuration used by the Dockerfile.
+# See: https://docs.gunicorn.org/en/stable/settings.html
+import gc
+import os
+
+# Render assigns a port dynamically through LISTEN_PORT
+bind = '0.0.0.0:' + os.environ.get('LISTEN_PORT', '8000')
+
+# Each worker is a separate process with its own memory. Everything the workers must agree on, e.g. the versions behind
+# ETags, the locks of single flight and the vote flush, the rate limits and the visit counts of hot pages, is kept in the
+# default cache, which all of them share through files (see CACHES in settings.py). Only values a worker can safely
+# keep to itself are kept in its memory
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+
+# The app is imported once in the master process and the workers are forked from it, so the import cost is only paid
+# once and the workers share the master's memory instead of each importing everything again.
+# Set GUNICORN_PRELOAD to False to compare against loading the app separately in each worker
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+
+# Runs in the master once the app has been loaded and before any workers are forked
+def when_ready(server):
+    if not preload_app:
+        return
+    from django.db import connections
+    from primeVideoReviewPlatform.warmup import warm_up
+    warm_up()
+    # Warming up reads from the database, and the connection it opened must not be inherited by the workers, which
+    # would then all use the same SQLite handle
+    connections.close_all()
+    # Everything created so far lives as long as the process does. Freezing it stops the garbage collector from
+    # writing to the memory pages that hold it, so the forked workers can keep sharing those pages with the master
+    # instead of each getting their own copy
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Database connections cannot be shared between processes, so each worker must open its own
+    from django.db import connections
+    connections.close_all()
+
+
+# Runs in each worker after it has loaded the app, which only happens here when the app is not preloaded
+def post_worker_init(worker):
+    if preload_app:
+        return
+    from primeVideoReviewPlatform.warmup import warm_up
+    warm_up()
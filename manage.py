@@ -6,6 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
+    # The tests clear the caches, so they are always run with settings that keep the caches apart from a running server
+    if sys.argv[1:2] == ['test']:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'primeVideoReviewPlatform.test_settings')
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'primeVideoReviewPlatform.settings')
     try:
         from django.core.management import execute_from_command_line
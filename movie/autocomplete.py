@@ -0,0 +1,114 @@
+import bisect
+import re
+import threading
+import time
+import unicodedata
+
+from primeVideoReviewPlatform.versions import MOVIE_TITLES, get_versions
+from .models import Movie
+
+# Maximum number of titles suggested for each search
+AUTOCOMPLETE_MAX_RESULTS = 10
+
+# The best titles for every search of up to this many characters are worked out when the index is built, since a search
+# of one or two characters matches a large share of the titles
+PRECOMPUTED_PREFIX_LENGTH = 3
+
+# The version of the titles is checked at most this often, so most searches do not even ask the cache
+VERSION_CHECK_SECONDS = 1
+
+# The popularity of the movies changes with every review, which does not change their titles, so the index is also
+# rebuilt this often to pick up the latest review counts
+POPULARITY_REFRESH_SECONDS = 5 * 60
+
+NON_WORD_PATTERN = re.compile(r'[\W_]+')
+
+
+# Lower cases a title or search, removes accents and replaces punctuation with spaces, so that 'amelie' finds 'Amélie'
+# and 'spider man' finds 'Spider-Man'
+def normalise_title(title):
+    decomposed = unicodedata.normalize('NFKD', title)
+    without_accents = ''.join(character for character in decomposed if not unicodedata.combining(character))
+    return NON_WORD_PATTERN.sub(' ', without_accents.casefold()).strip()
+
+
+# An in-memory index of every movie title, searched with binary search over a sorted list instead of the database.
+# Each title is added once for each word it contains, starting from that word, so 'godfather' finds 'The Godfather'.
+# Each entry points to the movie's position in the list of movies ordered by popularity, so the smallest positions
+# found are the most popular movies.
+# Each worker has its own copy, built when the worker starts (see warmup.py) and rebuilt when a movie is added, changed
+# or deleted, which is noticed through the MOVIE_TITLES version
+class TitleIndex:
+    def __init__(self):
+        # The built index is swapped in as one tuple, so a search never sees half of an old index and half of a new one
+        self.data = None
+        self.version = None
+        self.built_at = 0
+        self.version_checked_at = 0
+        self.build_lock = threading.Lock()
+
+    def build(self, version=None):
+        if version is None:
+            version = get_versions([MOVIE_TITLES])[0]
+        # Most reviewed first, the review count is kept in the ranking table
+        rows = Movie.objects.order_by().values_list('id', 'title', 'ranking__review_count')
+        movies = sorted(rows, key=lambda row: (-(row[2] or 0), row[1], row[0]))
+        entries = []
+        for position, (movie_id, title, review_count) in enumerate(movies):
+            words = normalise_title(title).split(' ')
+            for start in range(len(words)):
+                entries.append((' '.join(words[start:]), position))
+        entries.sort()
+        keys = [key for key, position in entries]
+        positions = [position for key, position in entries]
+
+        # The most popular movies for each short search
+        precomputed = {}
+        for key, position in entries:
+            for length in range(1, min(len(key), PRECOMPUTED_PREFIX_LENGTH) + 1):
+                precomputed.setdefault(key[:length], set()).add(position)
+        precomputed = {prefix: sorted(found)[:AUTOCOMPLETE_MAX_RESULTS] for prefix, found in precomputed.items()}
+
+        movies = [(movie_id, title) for movie_id, title, review_count in movies]
+        self.data = (keys, positions, movies, precomputed)
+        self.version = version
+        self.built_at = time.monotonic()
+
+    # Rebuilds the index if it is missing, a movie has changed or the popularity is out of date. While one thread of a
+    # worker rebuilds it, the others keep using the old index
+    def refresh_if_stale(self):
+        now = time.monotonic()
+        if self.data is not None and now - self.version_checked_at < VERSION_CHECK_SECONDS:
+            return
+        self.version_checked_at = now
+        version = get_versions([MOVIE_TITLES])[0]
+        if self.data is not None and version == self.version and now - self.built_at < POPULARITY_REFRESH_SECONDS:
+            return
+        if self.build_lock.acquire(blocking=self.data is None):
+            try:
+                self.build(version)
+            finally:
+                self.build_lock.release()
+
+    # Returns the (id, title) of the most popular movies with a word starting with the search, in order
+    def search(self, query, limit=AUTOCOMPLETE_MAX_RESULTS):
+        self.refresh_if_stale()
+        prefix = normalise_title(query)
+        # Read once, as another thread may swap in a new index while this searches. It should have been built by now,
+        # but nothing is suggested rather than failing if it has not
+        data = self.data
+        if not prefix or data is None:
+            return []
+        keys, positions, movies, precomputed = data
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH:
+            found = precomputed.get(prefix, [])
+        else:
+            # Every key starting with the prefix sorts between the prefix itself and the prefix followed by the
+            # highest possible character
+            start = bisect.bisect_left(keys, prefix)
+            end = bisect.bisect_left(keys, prefix + '\U0010ffff', start)
+            found = sorted(set(positions[start:end]))
+        return [movies[position] for position in found[:limit]]
+
+
+title_index = TitleIndex()
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from review.recommendations import build_similar_movies
+
+
+# Works out which movies are liked by the same users, for the "users who liked this also liked" section of each
+# movie's page. Run a refresh often (e.g. hourly) and a full build every so often (e.g. nightly).
+# Example: python manage.py build_similar_movies --refresh
+class Command(BaseCommand):
+    help = 'Calculates the similar movies shown on each movie page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refresh', action='store_true',
+                            help='Only recalculate movies affected by reviews written since the last build')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        movie_count = build_similar_movies(refresh=options['refresh'])
+        self.stdout.write('Updated the similar movies of %d movies in %.2fs' % (movie_count,
+                                                                                time.perf_counter() - start))
@@ -0,0 +1,103 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# This is run in a fresh python process, so that nothing has been imported yet. It loads the WSGI app the same way
+# gunicorn does and then sends it two requests, printing how long each step took
+STARTUP_SCRIPT = '''
+import json
+import sys
+import time
+
+start = time.perf_counter()
+from primeVideoReviewPlatform.wsgi import application
+loaded = time.perf_counter()
+if sys.argv[2] == 'warm-up':
+    from primeVideoReviewPlatform.warmup import warm_up
+    warm_up()
+warmed_up = time.perf_counter()
+
+from wsgiref.util import setup_testing_defaults
+
+
+def request(path):
+    environ = {'PATH_INFO': path}
+    setup_testing_defaults(environ)
+    statuses = []
+    response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    b''.join(response)
+    response.close()
+    return statuses[0]
+
+
+status = request(sys.argv[1])
+first_response = time.perf_counter()
+request(sys.argv[1])
+second_response = time.perf_counter()
+print(json.dumps({
+    'status': status,
+    'load': loaded - start,
+    'warm_up': warmed_up - loaded,
+    'first_response': first_response - warmed_up,
+    'second_response': second_response - first_response,
+}))
+'''
+
+
+# Measures how long a new worker takes to start and answer its first request.
+# Python's -X importtime option reports how long each module took to import, and the time to first response is
+# measured by sending a request straight to the WSGI app. Run with --warm-up to see the effect of the work that
+# gunicorn.conf.py does in the master process before forking the workers.
+# Example: python manage.py profile_startup --path /movies/ --top 20
+class Command(BaseCommand):
+    help = 'Reports import time per module and time to first response for a new worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/', help='Path of the page requested')
+        parser.add_argument('--top', type=int, default=25, help='Number of modules to show')
+        parser.add_argument('--warm-up', action='store_true', help='Warm up the app before the first request')
+
+    def handle(self, *args, **options):
+        environment = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE',
+                                                                             'primeVideoReviewPlatform.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT, options['path'],
+             'warm-up' if options['warm_up'] else 'cold'],
+            cwd=settings.BASE_DIR, env=environment, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            self.stderr.write(result.stderr)
+            return
+
+        imports = parse_import_times(result.stderr)
+        total_import_time = sum(self_time for self_time, cumulative, module in imports)
+        self.stdout.write('%d modules imported in %.1f ms' % (len(imports), total_import_time / 1000))
+        self.stdout.write('%10s %12s  %s' % ('self (ms)', 'total (ms)', 'module'))
+        for self_time, cumulative, module in sorted(imports, reverse=True)[:options['top']]:
+            self.stdout.write('%10.1f %12.1f  %s' % (self_time / 1000, cumulative / 1000, module))
+
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        self.stdout.write('')
+        self.stdout.write('Response status:       ' + timings['status'])
+        self.stdout.write('Loading the app:       %.1f ms' % (timings['load'] * 1000))
+        self.stdout.write('Warming up:            %.1f ms' % (timings['warm_up'] * 1000))
+        self.stdout.write('First response:        %.1f ms' % (timings['first_response'] * 1000))
+        self.stdout.write('Second response:       %.1f ms' % (timings['second_response'] * 1000))
+        self.stdout.write('Time to first response: %.1f ms' % (
+            (timings['load'] + timings['warm_up'] + timings['first_response']) * 1000))
+
+
+# Each line of -X importtime output looks like 'import time:  self [us] | cumulative | imported package', where the
+# package name is indented to show which module imported it
+def parse_import_times(output):
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative, module = line[len('import time:'):].split('|')
+        imports.append((int(self_time), int(cumulative), module.strip()))
+    return imports
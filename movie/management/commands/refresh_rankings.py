@@ -0,0 +1,21 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from movie.models import Movie
+from review.aggregates import MEAN_RATING_CACHE_KEY, refresh_movie_aggregates
+
+
+# Recalculates every movie's leaderboard scores and average rating from its reviews. The scores are kept up to date as
+# reviews are written, but the Bayesian ratings of movies that have not been reviewed in a while are based on an older
+# average of all movies, so running this every so often (e.g. daily) keeps them exact
+class Command(BaseCommand):
+    help = 'Recalculates the leaderboard scores of every movie'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        cache.delete(MEAN_RATING_CACHE_KEY)
+        movie_ids = list(Movie.objects.values_list('id', flat=True))
+        refresh_movie_aggregates(movie_ids)
+        self.stdout.write('Refreshed the rankings of %d movies in %.2fs' % (len(movie_ids), time.perf_counter() - start))
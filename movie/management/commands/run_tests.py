@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from primeVideoReviewPlatform.test_runner import print_timings
+
+# The tests of each app are run in their own process, each with its own in-memory database
+TEST_LABELS = ['movie.tests', 'user.tests', 'review.tests']
+
+TEST_SETTINGS = 'primeVideoReviewPlatform.test_settings'
+
+
+# Runs the tests of every app at the same time, using the fast settings in test_settings.py, and then reports how long
+# each test module took. The output of an app's tests is only shown in full if any of them failed.
+# Example: python manage.py run_tests --processes 2
+class Command(BaseCommand):
+    help = 'Runs the tests of every app in parallel and reports the time taken by each test module'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=min(len(TEST_LABELS), os.cpu_count() or 1),
+                            help='Number of apps tested at the same time')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory() as directory:
+            with ThreadPoolExecutor(max_workers=max(options['processes'], 1)) as executor:
+                results = list(executor.map(lambda label: self.run_label(label, directory), TEST_LABELS))
+
+        failed = []
+        timings = {}
+        for label, result, label_timings in results:
+            if result.returncode != 0:
+                failed.append(label)
+                self.stderr.write(result.stdout + result.stderr)
+            summary = [line for line in result.stderr.splitlines() if line.startswith('Ran ')]
+            self.stdout.write('%s: %s' % (label, summary[-1] if summary else 'failed to run'))
+            timings.update(label_timings)
+
+        print_timings(timings, self.stdout)
+        self.stdout.write('Finished in %.2fs' % (time.perf_counter() - started))
+        if failed:
+            raise CommandError('Tests failed in ' + ', '.join(failed))
+
+    # Runs the tests of one app, returning its label, the finished process and the time taken by each of its modules
+    def run_label(self, label, directory):
+        timings_file = os.path.join(directory, label + '.json')
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'test', label, '--settings=' + TEST_SETTINGS, '--timings-file', timings_file,
+             '--noinput'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True
+        )
+        timings = {}
+        if os.path.exists(timings_file):
+            with open(timings_file) as file:
+                timings = json.load(file)
+        return label, result, timings
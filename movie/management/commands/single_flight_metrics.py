@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from primeVideoReviewPlatform.single_flight import get_metrics
+
+
+# Shows how often cached pages and feeds were worked out, and how much work was saved by letting a single request work
+# out each of them, see primeVideoReviewPlatform/single_flight.py
+class Command(BaseCommand):
+    help = 'Shows how many cache misses were coalesced'
+
+    def handle(self, *args, **options):
+        metrics = get_metrics()
+        for metric, value in metrics.items():
+            self.stdout.write('%-14s %d' % (metric, value))
+        misses = metrics['computed'] + metrics['coalesced'] + metrics['stale'] + metrics['lock_timeouts']
+        if misses:
+            self.stdout.write('%.1f%% of misses did not need working out again'
+                              % (100 * (metrics['coalesced'] + metrics['stale']) / misses))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from primeVideoReviewPlatform.two_tier_cache import get_stats
+
+
+# Shows how often the values of each namespace of the two tier cache were found in a worker's memory, found in the shared
+# cache or read from the database, see primeVideoReviewPlatform/two_tier_cache.py
+class Command(BaseCommand):
+    help = 'Shows the hit and miss counts of each namespace of the two tier cache'
+
+    def handle(self, *args, **options):
+        for namespace, stats in get_stats().items():
+            self.stdout.write(namespace)
+            for stat, value in stats.items():
+                self.stdout.write('  %-12s %d' % (stat, value))
+            lookups = sum(stats.values())
+            if lookups:
+                self.stdout.write('  %.1f%% of lookups did not read the database'
+                                  % (100 * (lookups - stats['misses']) / lookups))
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.5 on 2026-10-19 18:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0005_alter_movie_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieRanking',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='movie.movie')),
+                ('review_count', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('bayesian_rating', models.FloatField(default=0)),
+                ('trending_score', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-bayesian_rating', 'movie'], name='ranking_top_rated_idx'), models.Index(fields=['-trending_score', 'movie'], name='ranking_trending_idx'), models.Index(fields=['-review_count', 'movie'], name='ranking_most_reviewed_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Fills in the rankings of movies that already have reviews
+
+import math
+from datetime import datetime, timezone
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+# These are copied from review/aggregates.py, so that this migration keeps working if they are changed later
+PRIOR_WEIGHT = 10
+DEFAULT_MEAN_RATING = 3.0
+TRENDING_HALF_LIFE_SECONDS = 3.5 * 24 * 60 * 60
+TRENDING_EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def add_activity(score, date_posted):
+    weight = math.log(2) * (date_posted - TRENDING_EPOCH).total_seconds() / TRENDING_HALF_LIFE_SECONDS
+    if score is None:
+        return weight
+    larger, smaller = max(score, weight), min(score, weight)
+    return larger + math.log1p(math.exp(smaller - larger))
+
+
+def populate_rankings(apps, schema_editor):
+    Review = apps.get_model('review', 'Review')
+    MovieRanking = apps.get_model('movie', 'MovieRanking')
+
+    totals = Review.objects.values('movie_id').annotate(count=Count('id'), total=Sum('rating_out_of_five'))
+    totals = {row['movie_id']: row for row in totals}
+    review_count = sum(row['count'] for row in totals.values())
+    mean = sum(row['total'] for row in totals.values()) / review_count if review_count else DEFAULT_MEAN_RATING
+
+    trending = {}
+    for movie_id, date_posted in Review.objects.order_by().values_list('movie_id', 'date_posted').iterator():
+        trending[movie_id] = add_activity(trending.get(movie_id), date_posted)
+
+    MovieRanking.objects.bulk_create([
+        MovieRanking(
+            movie_id=movie_id,
+            review_count=row['count'],
+            rating_sum=row['total'],
+            bayesian_rating=(PRIOR_WEIGHT * mean + row['total']) / (PRIOR_WEIGHT + row['count']),
+            trending_score=trending.get(movie_id),
+        )
+        for movie_id, row in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0006_movieranking'),
+        ('review', '0005_review_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_rankings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.5 on 2026-10-19 18:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0007_populate_movieranking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('date_computed', models.DateTimeField()),
+                ('movie', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='movie.movie')),
+                ('similar_movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movie.movie')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['movie', '-score'], name='similarity_movie_score_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-19 18:14
+
+from django.db import migrations, models
+import movie.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0008_moviesimilarity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movieranking',
+            name='rating_counts',
+            field=models.JSONField(default=movie.models.get_empty_rating_counts),
+        ),
+        migrations.AddField(
+            model_name='movieranking',
+            name='weekly_counts',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='movieranking',
+            name='weekly_counts_end',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
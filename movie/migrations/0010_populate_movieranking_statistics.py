@@ -0,0 +1,53 @@
+# Fills in the rating and weekly review counts of the rankings that already exist
+
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+# Copied from movie/models.py, so that this migration keeps working if it is changed later
+WEEKLY_COUNT_WEEKS = 12
+
+
+def get_week_start(moment):
+    day = moment.date()
+    return day - timedelta(days=day.weekday())
+
+
+def populate_statistics(apps, schema_editor):
+    Review = apps.get_model('review', 'Review')
+    MovieRanking = apps.get_model('movie', 'MovieRanking')
+
+    this_week = get_week_start(timezone.now())
+    rankings = {ranking.movie_id: ranking for ranking in MovieRanking.objects.all()}
+    for ranking in rankings.values():
+        ranking.rating_counts = [0, 0, 0, 0, 0]
+        ranking.weekly_counts = [0] * WEEKLY_COUNT_WEEKS
+        ranking.weekly_counts_end = this_week
+
+    # Hidden reviews do not count towards a movie's statistics
+    reviews = Review.objects.filter(hidden_at__isnull=True).order_by() \
+        .values_list('movie_id', 'rating_out_of_five', 'date_posted')
+    for movie_id, rating, date_posted in reviews.iterator():
+        ranking = rankings.get(movie_id)
+        if ranking is None:
+            continue
+        ranking.rating_counts[rating - 1] += 1
+        week = WEEKLY_COUNT_WEEKS - 1 - (this_week - get_week_start(date_posted)).days // 7
+        if 0 <= week < WEEKLY_COUNT_WEEKS:
+            ranking.weekly_counts[week] += 1
+
+    MovieRanking.objects.bulk_update(rankings.values(), ['rating_counts', 'weekly_counts', 'weekly_counts_end'],
+                                     batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0009_movieranking_statistics'),
+        ('review', '0008_review_votes'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_statistics, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,14 @@
+from datetime import timedelta
+
 from django.core.validators import DecimalValidator
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
 
 from primeVideoReviewPlatform import settings
+from primeVideoReviewPlatform.two_tier_cache import TwoTierCache
+from primeVideoReviewPlatform.versions import MOVIE_TITLES, MOVIES, bump_versions, movie_key
 
 
 class Movie(models.Model):
@@ -34,3 +41,134 @@ class Movie(models.Model):
 
     def set_local_image_url(self, filename):
         self.image_url = settings.MEDIA_URL + filename
+
+
+# The title and average rating shown at the top of each of a movie's review pages, which are read on almost every
+# request, so they are kept in each worker's memory. Any change to any movie drops them all
+MOVIE_HEADERS = TwoTierCache('movie_headers')
+
+
+# Returns a dictionary of the id, title and average rating of a movie, or None if it does not exist
+def get_movie_header(movie_id):
+    return MOVIE_HEADERS.get_or_set(movie_id, lambda: Movie.objects.filter(id=movie_id)
+                                    .values('id', 'title', 'average_rating_out_of_five').first())
+
+
+# Number of weeks of reviews counted for the sparkline on a movie's page
+WEEKLY_COUNT_WEEKS = 12
+
+
+def get_week_start(moment):
+    day = moment.date()
+    return day - timedelta(days=day.weekday())
+
+
+def get_empty_rating_counts():
+    return [0, 0, 0, 0, 0]
+
+
+# Moves a list of weekly review counts forward so that it ends with the given week, dropping the oldest weeks and
+# adding empty ones. Returns the new counts
+def shift_weekly_counts(counts, counts_end, week_start):
+    if counts_end is None or not counts:
+        return [0] * WEEKLY_COUNT_WEEKS
+    weeks = (week_start - counts_end).days // 7
+    if weeks <= 0:
+        return list(counts)
+    return (list(counts) + [0] * weeks)[-WEEKLY_COUNT_WEEKS:]
+
+
+# A small table holding each movie's leaderboard scores and review statistics, so that each leaderboard is read straight
+# from an index in order and a movie's page can show its statistics without calculating them from the review table.
+# The counters are kept up to date as reviews are written, see review/aggregates.py
+class MovieRanking(models.Model):
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='ranking')
+
+    review_count = models.IntegerField(default=0)
+
+    # The sum of all of the movie's ratings, which together with the count gives the average rating
+    rating_sum = models.IntegerField(default=0)
+
+    # The average rating pulled towards the average of all movies, so that a movie with a few reviews cannot
+    # outrank one with many reviews
+    bayesian_rating = models.FloatField(default=0)
+
+    # The log of the sum of every review's weight, where a review's weight halves every few days. Only the difference
+    # between movies matters, so the weights are measured from a fixed date and never have to be decayed
+    trending_score = models.FloatField(null=True, blank=True)
+
+    # The number of 1 to 5 star reviews, in that order
+    rating_counts = models.JSONField(default=get_empty_rating_counts)
+
+    # The number of reviews posted in each of the last few weeks, oldest first, ending with the week starting on
+    # weekly_counts_end (a Monday)
+    weekly_counts = models.JSONField(default=list)
+    weekly_counts_end = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-bayesian_rating', 'movie'], name='ranking_top_rated_idx'),
+            models.Index(fields=['-trending_score', 'movie'], name='ranking_trending_idx'),
+            models.Index(fields=['-review_count', 'movie'], name='ranking_most_reviewed_idx'),
+        ]
+
+    # Adds or removes (with a sign of -1) a review with the given rating, posted at the given time, from the statistics
+    def add_to_statistics(self, rating, date_posted, sign=1):
+        self.rating_counts[rating - 1] += sign
+        week_start = get_week_start(date_posted)
+        # A review posted this week moves the counts forward, one posted before the counts start is not counted
+        if self.weekly_counts_end is None or week_start > self.weekly_counts_end:
+            self.weekly_counts = shift_weekly_counts(self.weekly_counts, self.weekly_counts_end, week_start)
+            self.weekly_counts_end = week_start
+        week = WEEKLY_COUNT_WEEKS - 1 - (self.weekly_counts_end - week_start).days // 7
+        if week >= 0:
+            self.weekly_counts[week] += sign
+
+    # The weekly counts ending with the current week, which still need moving forward if the movie has not been
+    # reviewed this week
+    def get_weekly_counts(self):
+        return shift_weekly_counts(self.weekly_counts, self.weekly_counts_end, get_week_start(timezone.now()))
+
+    # The middle rating when all of the ratings are sorted, or the average of the two middle ratings
+    def get_median_rating(self):
+        total = sum(self.rating_counts)
+        if total == 0:
+            return None
+        middle_ratings = []
+        for position in sorted({(total - 1) // 2, total // 2}):
+            seen = 0
+            for rating, count in enumerate(self.rating_counts, start=1):
+                seen += count
+                if seen > position:
+                    middle_ratings.append(rating)
+                    break
+        return sum(middle_ratings) / len(middle_ratings)
+
+
+# The movies most often liked by the same users as a movie, worked out offline by the build_similar_movies command
+# (see review/recommendations.py), so that the detail page only has to read a few rows in index order
+class MovieSimilarity(models.Model):
+    # The index below starts with the movie, so a separate index for this column is not needed
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='similarities', db_index=False)
+
+    similar_movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+
+    # Higher is more similar, from 0 to 1
+    score = models.FloatField()
+
+    # When the build that calculated this row started. A refresh only recalculates movies affected by reviews written
+    # since the latest build
+    date_computed = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['movie', '-score'], name='similarity_movie_score_idx'),
+        ]
+
+
+# Any change to a movie, including its average rating being recalculated after a review changes, means the pages
+# showing it have changed
+@receiver([post_save, post_delete], sender=Movie)
+def movie_changed_callback(sender, instance, **kwargs):
+    bump_versions([MOVIES, MOVIE_TITLES, movie_key(instance.id)])
+    MOVIE_HEADERS.invalidate()
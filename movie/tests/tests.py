@@ -1,20 +1,53 @@
+import multiprocessing
+import threading
+import time
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from datetime import datetime, timedelta
 
-from movie.models import Movie
+from movie.autocomplete import AUTOCOMPLETE_MAX_RESULTS, TitleIndex, title_index
+from movie.models import MOVIE_HEADERS, Movie, MovieRanking, get_movie_header
+from primeVideoReviewPlatform import shared_cache, two_tier_cache
+from primeVideoReviewPlatform.shared_cache import SharedFileCache
+from primeVideoReviewPlatform.single_flight import get_lock, get_metrics, get_or_compute, store
+from primeVideoReviewPlatform.two_tier_cache import LocalCache, TwoTierCache
+from primeVideoReviewPlatform.versions import bump_versions, get_versions, movie_key
+
+
+# Stands in for another worker process using the same cache directory
+def get_other_worker_cache():
+    return SharedFileCache(settings.CACHES['default']['LOCATION'], {})
+
+
+# Asks for a value that another worker is working out, noting whether it had to work it out itself
+def get_or_compute_in_other_process(results):
+    def compute():
+        results.put('computed')
+        return 'value computed again'
+    results.put(get_or_compute('key', 1, compute, 60))
+
+
+def count_in_other_process(times):
+    other_worker = get_other_worker_cache()
+    for _ in range(times):
+        other_worker.incr('shared_count')
 
 
 # Relatively few tests are required for this since there is no way for any user (apart from the site owner) to do any
 # of the CRUD operations, hence we can have them all in one file
 
 class MovieTestCase(TestCase):
-    def setUp(self):
-        self.client = Client()
-
+    # The movie is created once for the class, and each test gets its own copy of it
+    @classmethod
+    def setUpTestData(cls):
         # Creating a test movie
-        self.movie = Movie.objects.create(
+        cls.movie = Movie.objects.create(
             id=1,
             title='Test Movie',
             description='Test Description',
@@ -70,3 +103,233 @@ class MovieTestCase(TestCase):
     def test_that_movie_rating_can_be_empty(self):
         self.movie.average_rating_out_of_five = None
         self.movie.full_clean()
+
+    # Caching and compression tests
+
+    def test_that_an_unchanged_movie_list_is_not_sent_again(self):
+        response = self.client.get(reverse('list'))
+        self.assertTrue(response['ETag'].startswith('W/'))
+        response = self.client.get(reverse('list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)  # 304 means the browser's copy can be used
+
+    def test_that_a_movie_is_sent_again_after_it_changes(self):
+        response = self.client.get(reverse('detail', kwargs={'pk': 1}))
+        self.movie.title = 'Changed title'
+        self.movie.save()
+        response = self.client.get(reverse('detail', kwargs={'pk': 1}), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Changed title')
+
+    @override_settings(COMPRESSION_MIN_LENGTH=0)
+    def test_that_pages_are_compressed_with_gzip(self):
+        response = self.client.get(reverse('list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    @override_settings(COMPRESSION_MIN_LENGTH=0)
+    def test_that_pages_are_compressed_with_brotli_when_the_browser_supports_it(self):
+        response = self.client.get(reverse('list'), HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    @override_settings(COMPRESSION_MIN_LENGTH=100_000)
+    def test_that_small_pages_are_not_compressed(self):
+        response = self.client.get(reverse('list'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    # Autocomplete tests
+
+    # Adds a movie with the given title and number of reviews, then rebuilds the autocomplete index
+    def add_movie(self, title, review_count=0):
+        movie = Movie.objects.create(title=title, description='Description', duration=timedelta(hours=2),
+                                     date_released=datetime.today())
+        if review_count:
+            MovieRanking.objects.create(movie=movie, review_count=review_count)
+        title_index.build()
+        return movie
+
+    def get_suggestions(self, query):
+        response = self.client.get(reverse('autocomplete'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [movie['title'] for movie in response.json()['results']]
+
+    def test_that_autocomplete_matches_the_start_of_any_word_of_a_title(self):
+        self.add_movie('The Godfather Part II')
+        self.add_movie('Amélie')
+        self.assertEqual(self.get_suggestions('godf'), ['The Godfather Part II'])
+        self.assertEqual(self.get_suggestions('The Godfather: part'), ['The Godfather Part II'])
+        self.assertEqual(self.get_suggestions('ame'), ['Amélie'])
+        self.assertEqual(self.get_suggestions('odfather'), [])
+        self.assertEqual(self.get_suggestions(''), [])
+
+    def test_that_autocomplete_suggests_the_most_reviewed_movies_first(self):
+        self.add_movie('Star Trek', review_count=5)
+        self.add_movie('Star Wars', review_count=50)
+        self.add_movie('Starship Troopers')
+        self.assertEqual(self.get_suggestions('sta'), ['Star Wars', 'Star Trek', 'Starship Troopers'])
+        self.assertEqual(self.get_suggestions('star w'), ['Star Wars'])
+
+    def test_that_the_autocomplete_index_is_rebuilt_when_a_movie_is_added(self):
+        title_index.build()
+        Movie.objects.create(title='Zodiac', description='Description', duration=timedelta(hours=2),
+                             date_released=datetime.today())
+        # The version is only checked every so often, which the test does not wait for
+        title_index.version_checked_at = 0
+        self.assertEqual(self.get_suggestions('zod'), ['Zodiac'])
+
+    def test_that_autocomplete_suggests_at_least_one_and_at_most_the_maximum_number_of_movies(self):
+        for number in range(AUTOCOMPLETE_MAX_RESULTS + 2):
+            self.add_movie('Movie ' + str(number))
+        for limit, expected in [(-3, 1), (0, 1), (2, 2), (100, AUTOCOMPLETE_MAX_RESULTS),
+                                ('abc', AUTOCOMPLETE_MAX_RESULTS)]:
+            response = self.client.get(reverse('autocomplete'), {'q': 'movie', 'limit': limit})
+            self.assertEqual(len(response.json()['results']), expected)
+
+    def test_that_autocomplete_suggests_nothing_if_the_index_has_not_been_built(self):
+        index = TitleIndex()
+        with patch.object(index, 'refresh_if_stale'):
+            self.assertEqual(index.search('movie'), [])
+
+    # Single flight tests
+
+    def test_that_only_one_of_many_requests_missing_the_same_value_works_it_out(self):
+        cache.clear()
+        computed = []
+
+        def compute():
+            computed.append(True)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get_or_compute('key', 1, compute, 60)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(computed), 1)
+        self.assertEqual(results, [('value', 1)] * 5)
+        self.assertEqual(get_metrics()['computed'], 1)
+        self.assertEqual(get_metrics()['coalesced'], 4)
+        # Once saved, the value is up to date until its version changes
+        self.assertEqual(get_or_compute('key', 1, compute, 60), ('value', 1))
+        self.assertEqual(get_metrics()['fresh'], 1)
+
+    def test_that_an_out_of_date_value_is_sent_while_another_request_works_out_the_new_one(self):
+        cache.clear()
+        store('key', 1, 'old value', 60)
+        lock = get_lock('key')
+        self.assertTrue(lock.acquire())
+        try:
+            self.assertEqual(get_or_compute('key', 2, lambda: 'new value', 60), ('old value', 1))
+        finally:
+            lock.release()
+        self.assertEqual(get_metrics()['stale'], 1)
+        self.assertEqual(get_or_compute('key', 2, lambda: 'new value', 60), ('new value', 2))
+
+    @patch('primeVideoReviewPlatform.single_flight.SINGLE_FLIGHT_WAIT_SECONDS', 0)
+    def test_that_a_request_works_out_the_value_itself_after_waiting_too_long(self):
+        cache.clear()
+        lock = get_lock('key')
+        self.assertTrue(lock.acquire())
+        try:
+            self.assertEqual(get_or_compute('key', 1, lambda: 'value', 60), ('value', 1))
+        finally:
+            lock.release()
+        self.assertEqual(get_metrics()['lock_timeouts'], 1)
+
+    @skipIf(shared_cache.fcntl is None, 'Files cannot be locked on this platform')
+    def test_that_a_request_waiting_in_another_worker_gets_the_value_without_working_it_out(self):
+        cache.clear()
+        lock = get_lock('key')
+        self.assertTrue(lock.acquire())
+        results = multiprocessing.get_context('fork').Queue()
+        process = multiprocessing.get_context('fork').Process(target=get_or_compute_in_other_process, args=(results,))
+        try:
+            process.start()
+            # Gives the other worker time to find the value missing and start waiting for the lock
+            time.sleep(0.5)
+            store('key', 1, 'value', 60)
+        finally:
+            lock.release()
+        process.join()
+        # Had the other worker worked the value out, it would have noted so first
+        self.assertEqual(results.get(timeout=5), ('value', 1))
+        self.assertEqual(get_metrics()['coalesced'], 1)
+
+    # Two tier cache tests
+
+    def test_that_a_movie_header_is_read_from_the_database_once_and_then_from_memory(self):
+        two_tier_cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_movie_header(self.movie.id)['title'], 'Test Movie')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_movie_header(self.movie.id)['title'], 'Test Movie')
+        # A worker that has not read it yet finds it in the shared cache
+        two_tier_cache.local_cache.clear()
+        with self.assertNumQueries(0):
+            get_movie_header(self.movie.id)
+        self.assertEqual(MOVIE_HEADERS.get_stats(), {'local_hits': 1, 'shared_hits': 1, 'misses': 1})
+        self.assertIsNone(get_movie_header(self.movie.id + 1))
+
+    def test_that_changing_a_movie_drops_the_headers_of_every_worker(self):
+        two_tier_cache.clear()
+        # Two namespaces with the same name share their version like two workers do
+        worker = TwoTierCache('test_headers')
+        other_worker = TwoTierCache('test_headers')
+        self.assertEqual(other_worker.get_or_set(1, lambda: 'old title'), 'old title')
+        worker.invalidate()
+        self.assertEqual(worker.get_or_set(1, lambda: 'new title'), 'new title')
+        # The other worker only checks the version every so often, which the test does not wait for
+        self.assertEqual(other_worker.get_or_set(1, lambda: 'newer title'), 'old title')
+        other_worker.version_checked_at = 0
+        self.assertEqual(other_worker.get_or_set(1, lambda: 'newer title'), 'new title')
+
+        self.assertEqual(get_movie_header(self.movie.id)['title'], 'Test Movie')
+        self.movie.title = 'Changed Title'
+        self.movie.save()
+        self.assertEqual(get_movie_header(self.movie.id)['title'], 'Changed Title')
+
+    def test_that_the_least_recently_used_values_are_dropped_first(self):
+        local_cache = LocalCache(max_entries=2, max_bytes=100)
+        local_cache.set('a', 'a', 60, 10)
+        local_cache.set('b', 'b', 60, 10)
+        local_cache.get('a')
+        local_cache.set('c', 'c', 60, 10)
+        self.assertIsNone(local_cache.get('b'))
+        self.assertEqual(local_cache.get('a')[0], 'a')
+        # Values are also dropped to stay under the size limit, and expire
+        local_cache.set('d', 'd', 60, 85)
+        self.assertEqual(list(local_cache.entries), ['a', 'd'])
+        local_cache.set('e', 'e', -1, 10)
+        self.assertIsNone(local_cache.get('e'))
+        self.assertEqual(list(local_cache.entries), ['d'])
+        self.assertEqual(local_cache.size, 85)
+
+    # Shared cache tests
+
+    def test_that_a_version_bumped_by_one_worker_is_seen_by_another(self):
+        worker = get_other_worker_cache()
+        other_worker = get_other_worker_cache()
+        keys = [movie_key(self.movie.id)]
+        with patch('primeVideoReviewPlatform.versions.cache', other_worker):
+            old_versions = get_versions(keys)
+        with patch('primeVideoReviewPlatform.versions.cache', worker):
+            bump_versions(keys)
+            new_versions = get_versions(keys)
+        self.assertNotEqual(new_versions, old_versions)
+        with patch('primeVideoReviewPlatform.versions.cache', other_worker):
+            self.assertEqual(get_versions(keys), new_versions)
+
+    @skipIf(shared_cache.fcntl is None, 'Files cannot be locked on this platform')
+    def test_that_counts_added_by_several_processes_at_once_are_not_lost(self):
+        cache.set('shared_count', 0, 60)
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=count_in_other_process, args=(50,)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(cache.get('shared_count'), 200)
+        # Adding a key that another process has already added fails
+        self.assertTrue(cache.add('shared_add', 1))
+        self.assertFalse(get_other_worker_cache().add('shared_add', 2))
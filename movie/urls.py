@@ -6,5 +6,7 @@ from . import views
 urlpatterns = [
     path('', views.MovieListView.as_view(), name='list'),
     path('movies/<int:pk>/', views.MovieDetailView.as_view(), name='detail'),
+    path('leaderboards/<str:board>/', views.LeaderboardView.as_view(), name='leaderboard'),
+    path('autocomplete/', views.MovieAutocompleteView.as_view(), name='autocomplete'),
     path('<int:pk>/reviews/', include('review.urls'))
 ]
\ No newline at end of file
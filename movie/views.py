@@ -1,20 +1,118 @@
-from .models import Movie
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from primeVideoReviewPlatform.versions import MOVIES, USERNAMES, make_etag, movie_key
+from review.feed import get_feed
+from user.watchlist import get_watchlisted_movie_ids
+from .autocomplete import AUTOCOMPLETE_MAX_RESULTS, title_index
+from .models import Movie, MovieRanking, MovieSimilarity
 from django.views import generic
 
 
+# These build the ETag of each page from the versions of the data shown on it, so a browser that already has the
+# latest copy of a page gets a 304 Not Modified response without the page being rendered
+def movie_list_etag(request, *args, **kwargs):
+    return make_etag(request, [MOVIES])
+
+
+# A movie's page shows the usernames of the authors of its latest reviews
+def movie_detail_etag(request, *args, **kwargs):
+    return make_etag(request, [movie_key(kwargs['pk']), USERNAMES])
+
+
 # This lists all the movies in the database
+@method_decorator(condition(etag_func=movie_list_etag), name='dispatch')
 class MovieListView(generic.ListView):
     model = Movie
     # Renders the result to the list.html file
     template_name = 'movie/list.html'
     context_object_name = 'movies'
-    # Displays 8 movies per page
+    # Displays 8 movies per page, in the order they were added
     paginate_by = 8
+    ordering = ['id']
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['leaderboards'] = get_leaderboard_links()
+        # The movies of the page on the user's watchlist are found with one query
+        context['watchlisted_movie_ids'] = get_watchlisted_movie_ids(self.request.user,
+                                                                     [movie.id for movie in context['movies']])
+        return context
+
+
+# The leaderboards that can be shown, mapping the name used in the url to the heading shown on the page and the field
+# the movies are ordered by. Each ordering matches one of MovieRanking's indexes
+LEADERBOARDS = {
+    'top-rated': ('Top rated', 'bayesian_rating'),
+    'trending': ('Trending this week', 'trending_score'),
+    'most-reviewed': ('Most reviewed', 'review_count'),
+}
+
+# Number of movies shown on each leaderboard
+LEADERBOARD_SIZE = 20
+
+# Number of similar movies shown on a movie's page
+SIMILAR_MOVIES_SHOWN = 5
+
+# Size of the sparkline of weekly reviews on a movie's page, in pixels
+SPARKLINE_WIDTH = 120
+SPARKLINE_HEIGHT = 30
+
+
+# The name and heading of each leaderboard, used to link to them
+def get_leaderboard_links():
+    return [(board, heading) for board, (heading, field) in LEADERBOARDS.items()]
+
+
+# Shows the highest scoring movies of a leaderboard. The scores are kept up to date as reviews are written, so this is
+# a single read of the ranking table in index order
+@method_decorator(condition(etag_func=movie_list_etag), name='dispatch')
+class LeaderboardView(generic.ListView):
+    template_name = 'movie/leaderboard.html'
+    context_object_name = 'rankings'
+
+    def get_queryset(self):
+        if self.kwargs['board'] not in LEADERBOARDS:
+            raise Http404('There is no such leaderboard')
+        heading, field = LEADERBOARDS[self.kwargs['board']]
+        # The review statistics are only shown on each movie's own page
+        return MovieRanking.objects.filter(**{field + '__isnull': False}).select_related('movie') \
+            .defer('rating_counts', 'weekly_counts', 'weekly_counts_end') \
+            .order_by('-' + field, 'movie')[:LEADERBOARD_SIZE]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['heading'] = LEADERBOARDS[self.kwargs['board']][0]
+        context['leaderboards'] = get_leaderboard_links()
+        return context
+
+
+# Returns the number and percentage of reviews giving each rating, from 5 stars down to 1
+def get_rating_distribution(ranking):
+    total = sum(ranking.rating_counts)
+    return [
+        {'stars': stars, 'count': count, 'percentage': round(100 * count / total) if total else 0}
+        for stars, count in reversed(list(enumerate(ranking.rating_counts, start=1)))
+    ]
+
+
+# Returns the points of a line through the weekly review counts, scaled to fit the sparkline
+def get_sparkline_points(weekly_counts):
+    highest = max(max(weekly_counts), 1)
+    step = SPARKLINE_WIDTH / max(len(weekly_counts) - 1, 1)
+    return ' '.join(
+        '%g,%g' % (round(week * step, 1), round(SPARKLINE_HEIGHT - SPARKLINE_HEIGHT * count / highest, 1))
+        for week, count in enumerate(weekly_counts)
+    )
 
 
 # Displays an individual movie with more information
+@method_decorator(condition(etag_func=movie_detail_etag), name='dispatch')
 class MovieDetailView(generic.DetailView):
-    model = Movie
+    # The ranking holds the movie's review statistics, so it is read in the same query as the movie
+    queryset = Movie.objects.select_related('ranking')
     # Renders the result to the detail.html file
     template_name = 'movie/detail.html'
     context_object_name = 'movie'
@@ -22,7 +120,48 @@ class MovieDetailView(generic.DetailView):
     # This method is used to get additional data
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # We create a variable to see if the movie has any reviews, and if it does then we  create a hyperlink to
-        # view them
-        context['has_reviews'] = self.object.review_set.all().exists()
+        # Only movies with reviews have a ranking. If it has one then we create a hyperlink to view the reviews and
+        # show the statistics kept with the ranking, without reading the reviews themselves
+        try:
+            ranking = self.object.ranking
+        except MovieRanking.DoesNotExist:
+            ranking = None
+        context['has_reviews'] = ranking is not None
+        if ranking is not None:
+            weekly_counts = ranking.get_weekly_counts()
+            context['review_count'] = ranking.review_count
+            context['median_rating'] = ranking.get_median_rating()
+            context['rating_distribution'] = get_rating_distribution(ranking)
+            context['weekly_review_count'] = sum(weekly_counts)
+            context['sparkline_points'] = get_sparkline_points(weekly_counts)
+            context['sparkline_weeks'] = len(weekly_counts)
+            context['sparkline_width'] = SPARKLINE_WIDTH
+            context['sparkline_height'] = SPARKLINE_HEIGHT
+            # The latest reviews are kept in the cache as they are written, see review/feed.py
+            context['latest_reviews'] = get_feed(self.object.id)
+        context['on_watchlist'] = bool(get_watchlisted_movie_ids(self.request.user, [self.object.id]))
+        # The similar movies are calculated ahead of time, so this only reads the first few rows of an index
+        context['similar_movies'] = [
+            similarity.similar_movie for similarity in MovieSimilarity.objects.filter(movie_id=self.object.id)
+            .select_related('similar_movie').order_by('-score')[:SIMILAR_MOVIES_SHOWN]
+        ]
         return context
+
+
+# Suggests movies whose titles have a word starting with what has been typed so far, most reviewed first, e.g.
+# /autocomplete/?q=godf. The titles are searched in memory, so this is fast enough to be called on every key press
+class MovieAutocompleteView(generic.View):
+
+    def get(self, request, *args, **kwargs):
+        # Between one and the maximum, as a negative limit would slice off the end of the results instead
+        try:
+            limit = max(1, min(int(request.GET.get('limit', AUTOCOMPLETE_MAX_RESULTS)), AUTOCOMPLETE_MAX_RESULTS))
+        except ValueError:
+            limit = AUTOCOMPLETE_MAX_RESULTS
+        movies = title_index.search(request.GET.get('q', ''), limit)
+        response = JsonResponse({'results': [
+            {'id': movie_id, 'title': title, 'url': reverse('detail', args=[movie_id])} for movie_id, title in movies
+        ]})
+        # The same search gives the same answer until a movie changes, so browsers can reuse it for a short while
+        response['Cache-Control'] = 'max-age=60'
+        return response
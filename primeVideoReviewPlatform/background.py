@@ -0,0 +1,25 @@
+import logging
+import threading
+
+from django.db import connections
+
+# Get logger to log errors in background work
+logger = logging.getLogger('logger')
+
+
+# Runs a function in a separate thread so that the request that started it does not have to wait for it to finish.
+# Anything started here must be safe to run again if the process is stopped part way through, since threads do not
+# survive a restart of the server
+def run_in_background(function, *args, **kwargs):
+    def run():
+        try:
+            function(*args, **kwargs)
+        except Exception:
+            logger.exception('Background task ' + function.__name__ + ' failed')
+        finally:
+            # Each thread gets its own database connection, which Django does not close for us outside of a request
+            connections.close_all()
+
+    thread = threading.Thread(target=run, name='background-' + function.__name__, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+# Brotli compresses html better than gzip, but it is optional, gzip is used if it is not installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+re_accepts_brotli = _lazy_re_compile(r'\bbr\b')
+
+# Anything that is already compressed, such as images or gzipped exports, does not get any smaller
+COMPRESSIBLE_CONTENT_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript',
+                              'image/svg+xml')
+
+# Higher qualities compress slightly better but are much slower, which is not worth it for pages rendered per request
+BROTLI_QUALITY = 5
+
+
+def compress_sequence_brotli(sequence):
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for chunk in sequence:
+        # Flushing after each chunk sends it to the browser straight away instead of waiting for the whole response
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+# Compresses responses with brotli if the browser supports it and gzip otherwise. Responses smaller than
+# COMPRESSION_MIN_LENGTH are sent as they are, since compressing them saves less time than it takes
+class CompressionMiddleware(GZipMiddleware):
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_LENGTH:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_CONTENT_TYPES):
+            return response
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        # Async streaming responses are left to the gzip middleware, this app only streams synchronously
+        if (brotli is None or not re_accepts_brotli.search(accept_encoding)
+                or (response.streaming and response.is_async)):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.streaming:
+            response.streaming_content = compress_sequence_brotli(response.streaming_content)
+            # The compressed size is not known until the whole response has been sent
+            del response.headers['Content-Length']
+        else:
+            compressed_content = brotli.compress(response.content, quality=BROTLI_QUALITY)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # The compressed body is different from the uncompressed one, so a strong ETag has to become a weak one
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,135 @@
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+# Get logger to log the requests that are refused
+logger = logging.getLogger('logger')
+
+# The limits of each kind of request, as the number of requests that can be made at once and the number of seconds it
+# takes to be allowed one more, for each user and for each IP address. These are token buckets: each request takes a
+# token, and the bucket is refilled with one token every so many seconds up to its size. Users can write a few reviews
+# in a row, but a script cannot keep writing them faster than a person would. Many users can share one IP address, so
+# its limits are higher
+RATE_LIMITS = {
+    'review_write': {'user': (10, 6), 'ip': (30, 2)},
+    'register': {'ip': (5, 60)},
+}
+
+# Buckets are kept in the default cache, which every worker shares, so a client is limited however many workers its
+# requests are spread over. They are kept in this process instead if the cache's files cannot be written, e.g. when the
+# disk is full, so requests are still limited by each worker. At most this many buckets are kept, after which they are
+# all forgotten and start again full
+MAX_LOCAL_BUCKETS = 10000
+
+local_buckets = {}
+local_buckets_lock = threading.Lock()
+
+
+# The address of the client. Behind a proxy such as Render's, every request comes from the proxy, which passes the
+# client's address on in X-Forwarded-For
+def get_client_ip(request):
+    if settings.RATE_LIMIT_USE_FORWARDED_FOR:
+        forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded_for:
+            # The proxy adds the address it received the request from to the end, anything before it came from the
+            # client and could be made up
+            return forwarded_for.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+# Refills the bucket for the time since it was last used, returning the number of seconds until it has a token (0 if it
+# has one now) and the bucket with that token taken, or None if there is no token to take
+def take_from_bucket(bucket, size, refill_seconds):
+    now = time.time()
+    tokens, updated_at = bucket if bucket is not None else (size, now)
+    tokens = min(size, tokens + (now - updated_at) / refill_seconds)
+    if tokens < 1:
+        return (1 - tokens) * refill_seconds, None
+    return 0, (tokens - 1, now)
+
+
+# Puts back a token taken from the bucket, for a request that was refused by another bucket after all
+def return_to_bucket(bucket, size, refill_seconds):
+    now = time.time()
+    tokens, updated_at = bucket if bucket is not None else (size, now)
+    return None, (min(size, tokens + (now - updated_at) / refill_seconds + 1), now)
+
+
+# Reads the bucket and saves the bucket that change returns, if any, returning what else change returned
+def update_bucket(key, size, refill_seconds, change):
+    # The bucket would be full again by the time it expires, so it does not need to be kept any longer
+    timeout = math.ceil(size * refill_seconds)
+    try:
+        # The bucket is locked while it is read and written back, so two workers taking a token at the same moment
+        # cannot both take the last one
+        with cache.lock(key):
+            result, bucket = change(cache.get(key), size, refill_seconds)
+            if bucket is not None:
+                cache.set(key, bucket, timeout)
+            return result
+    except OSError:
+        with local_buckets_lock:
+            result, bucket = change(local_buckets.get(key), size, refill_seconds)
+            if bucket is not None:
+                if len(local_buckets) >= MAX_LOCAL_BUCKETS:
+                    local_buckets.clear()
+                local_buckets[key] = bucket
+            return result
+
+
+# Takes a token from the bucket, returning 0 if there was one or else the number of seconds until there will be
+def take_token(key, size, refill_seconds):
+    return update_bucket(key, size, refill_seconds, take_from_bucket)
+
+
+def give_back_token(key, size, refill_seconds):
+    update_bucket(key, size, refill_seconds, return_to_bucket)
+
+
+# Returns the number of seconds the client has to wait before making this kind of request, or 0 if it can be made now.
+# A request that is allowed takes a token from both the user's and the IP address's bucket. One that is refused takes
+# none, otherwise a user sharing a busy IP address would use up their own allowance on requests that were refused
+def check_rate_limit(request, name):
+    limits = RATE_LIMITS[name]
+    identities = []
+    if 'user' in limits and request.user.is_authenticated:
+        identities.append(('user', str(request.user.id)))
+    if 'ip' in limits:
+        identities.append(('ip', get_client_ip(request)))
+    taken = []
+    for kind, identity in identities:
+        key = 'rate_limit:%s:%s:%s' % (name, kind, identity)
+        wait = take_token(key, *limits[kind])
+        if wait:
+            for taken_key, taken_kind in taken:
+                give_back_token(taken_key, *limits[taken_kind])
+            return wait
+        taken.append((key, kind))
+    return 0
+
+
+def too_many_requests(request, name, wait):
+    retry_after = max(1, math.ceil(wait))
+    logger.warning('Refused ' + name + ' request from ' + get_client_ip(request) + ' for user '
+                   + str(request.user) + ', retry after ' + str(retry_after) + ' seconds')
+    response = HttpResponse('Too many requests, please try again in %d seconds' % retry_after, status=429,
+                            content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+# Limits how often the form of a view can be submitted, see RATE_LIMITS. Viewing the form is not limited
+class RateLimitMixin:
+    rate_limit = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method == 'POST':
+            wait = check_rate_limit(request, self.rate_limit)
+            if wait:
+                return too_many_requests(request, self.rate_limit, wait)
+        return super().dispatch(request, *args, **kwargs)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -23,7 +24,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-(iv3koe=i9_&8!6)z*ue&i1b%uvkxmwosp@x9gs2amx6jg!hm8'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# The Dockerfile turns this off for the deployed app
+DEBUG = os.environ.get('DJANGO_DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost', 'softwareengineeringandagileassignment.onrender.com']
 
@@ -43,6 +45,16 @@ LOGIN_REDIRECT_URL = '/'
 # Go home after logging out
 LOGOUT_REDIRECT_URL = '/'
 
+# Emails such as the digests of new reviews are printed to the console unless an SMTP server is given, e.g. a local
+# test server started with: python -m aiosmtpd -n -l localhost:1025
+EMAIL_HOST = os.environ.get('DJANGO_EMAIL_HOST', '')
+EMAIL_PORT = int(os.environ.get('DJANGO_EMAIL_PORT', '25'))
+if EMAIL_HOST:
+    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+else:
+    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'notifications@primevideoreviews.example'
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -96,6 +108,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Serves the static files straight from the app, this has to come before every other middleware except security
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Compresses the pages, this has to come before anything that changes the content of the response
+    'primeVideoReviewPlatform.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -104,6 +120,18 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Whether the client's IP address is read from the X-Forwarded-For header set by a proxy in front of the app, which the
+# rate limits in primeVideoReviewPlatform/rate_limit.py use. Only turn this on behind a proxy, or clients can make up
+# their address
+RATE_LIMIT_USE_FORWARDED_FOR = os.environ.get('DJANGO_BEHIND_PROXY', 'False') == 'True'
+
+# Responses shorter than this many bytes are not compressed
+COMPRESSION_MIN_LENGTH = 1024
+
+# Identifies the deployed version of the code, this is included in ETags so that pages are re-sent after a deploy.
+# Render sets RENDER_GIT_COMMIT to the commit that is being deployed
+RELEASE = os.environ.get('RENDER_GIT_COMMIT', 'development')[:12]
+
 ROOT_URLCONF = 'primeVideoReviewPlatform.urls'
 
 TEMPLATES = [
@@ -122,6 +150,17 @@ TEMPLATES = [
     },
 ]
 
+# In production the templates never change while the server is running, so they are compiled once per worker and kept
+# in memory instead of being read from disk and parsed on every render
+if not DEBUG:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'primeVideoReviewPlatform.wsgi.application'
 
 
@@ -132,9 +171,34 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Background work such as account deletion writes in small batches, so a request that needs to write
+            # waits for the current batch to finish rather than failing straight away with 'database is locked'
+            'timeout': 20,
+        },
     }
 }
 
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# The server runs several worker processes (see gunicorn.conf.py), which must all see the same cached values: the
+# versions behind every ETag, locks, rate limits and counters. So the default cache is kept in files that every worker
+# on the server can read, see primeVideoReviewPlatform/shared_cache.py. Values that each worker can safely keep to
+# itself, such as rendered review cards, are kept in the memory of each worker in the local cache instead
+CACHES = {
+    'default': {
+        'BACKEND': 'primeVideoReviewPlatform.shared_cache.SharedFileCache',
+        'LOCATION': os.environ.get('DJANGO_SHARED_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'primevideo-cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -172,6 +236,26 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Static files that do not belong to a specific app, such as the Bootstrap stylesheet
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+
+# collectstatic copies all of the static files here, which is where they are served from in production
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# In production, collectstatic adds a hash of each file's contents to its name and writes gzip and brotli compressed
+# copies next to it. Since a file's name changes whenever its contents do, browsers are told to cache the files
+# forever, and WhiteNoise sends the compressed copy to browsers that accept it.
+# See: https://whitenoise.readthedocs.io/en/stable/django.html
+if not DEBUG:
+    STORAGES = {
+        'default': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        },
+        'staticfiles': {
+            'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+        },
+    }
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+# Values are read from and written to files that every worker process on the server can see. Files are locked with
+# fcntl, which is not available on Windows, where only the development server is run and there is a single process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Keys are spread over this many lock files, so the number of files stays the same however many keys there are
+LOCK_FILE_COUNT = 256
+
+# How often each process checks whether the cache has grown past MAX_ENTRIES. Django's file cache lists every file on
+# every write to check this
+CULL_INTERVAL_SECONDS = 60
+
+
+# A cache kept in files shared by every worker, like Django's file cache, except that add() and incr() cannot be
+# interleaved with each other across processes, and lock() holds a key while a value is read and written back
+class SharedFileCache(FileBasedCache):
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._lock_dir = os.path.join(self._dir, 'locks')
+        os.makedirs(self._lock_dir, exist_ok=True)
+        self._next_cull = 0
+
+    # Holds a lock on the key, shared with every other process using the same directory, until the block ends
+    @contextmanager
+    def lock(self, key, version=None):
+        if fcntl is None:
+            yield
+            return
+        key = self.make_and_validate_key(key, version=version)
+        number = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=4).digest(), 'big') % LOCK_FILE_COUNT
+        with open(os.path.join(self._lock_dir, '%d.lock' % number), 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self.lock(key, version):
+            return super().add(key, value, timeout, version)
+
+    # Unlike Django's file cache, the value keeps its expiry time
+    def incr(self, key, delta=1, version=None):
+        with self.lock(key, version):
+            fname = self._key_to_file(key, version)
+            try:
+                with open(fname, 'rb') as file:
+                    expiry = pickle.load(file)
+                    data = file.read()
+            except (FileNotFoundError, EOFError):
+                raise ValueError("Key '%s' not found" % key)
+            if expiry is not None and expiry < time.time():
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(zlib.decompress(data)) + delta
+            # Written to a new file that then replaces the old one, so readers never see half a value
+            fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+            renamed = False
+            try:
+                with open(fd, 'wb') as file:
+                    file.write(pickle.dumps(expiry, self.pickle_protocol))
+                    file.write(zlib.compress(pickle.dumps(value, self.pickle_protocol)))
+                os.replace(tmp_path, fname)
+                renamed = True
+            finally:
+                if not renamed:
+                    os.remove(tmp_path)
+            return value
+
+    def _cull(self):
+        if time.monotonic() < self._next_cull:
+            return
+        self._next_cull = time.monotonic() + CULL_INTERVAL_SECONDS
+        super()._cull()
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Values and counts are kept in the default cache, which every worker process of the server shares, so a request waiting
+# for a value finds it however many workers there are. Locks are taken on files, which works across all the worker
+# processes too. fcntl is not available on Windows, where a key added to the cache is used as the lock instead
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# When a value is missing, requests wait at most this long for another request that is already working it out, after
+# which they work it out themselves
+SINGLE_FLIGHT_WAIT_SECONDS = 5
+
+# How often a waiting request checks whether the lock has been released
+LOCK_POLL_SECONDS = 0.01
+
+# Values are kept for this long after they go out of date, so they can be sent while one request works out a new one
+STALE_SECONDS = 60
+
+# Keys are spread over this many lock files, so the number of files stays the same however many keys there are. Two keys
+# sharing a file only means one of them occasionally waits for the other
+LOCK_FILE_COUNT = 256
+
+# The counts of how the values were found, see get_metrics()
+METRICS = ['fresh', 'computed', 'coalesced', 'stale', 'lock_timeouts']
+
+
+def get_lock_dir():
+    return getattr(settings, 'SINGLE_FLIGHT_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'primevideo-locks'))
+
+
+def get_lock_number(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=4).digest(), 'big') % LOCK_FILE_COUNT
+
+
+# A lock held on a file shared by every process of the server
+class FileLock:
+    def __init__(self, key):
+        os.makedirs(get_lock_dir(), exist_ok=True)
+        self.path = os.path.join(get_lock_dir(), '%d.lock' % get_lock_number(key))
+        self.file = None
+
+    def acquire(self):
+        self.file = open(self.path, 'a')
+        try:
+            fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            self.file.close()
+            self.file = None
+            return False
+
+    def release(self):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+        self.file = None
+
+
+# A lock held by adding a key to the cache. It expires on its own in case the process holding it stops
+class CacheLock:
+    def __init__(self, key):
+        self.key = 'single_flight_lock:%d' % get_lock_number(key)
+
+    def acquire(self):
+        return cache.add(self.key, True, 2 * SINGLE_FLIGHT_WAIT_SECONDS)
+
+    def release(self):
+        cache.delete(self.key)
+
+
+def get_lock(key):
+    return FileLock(key) if fcntl is not None else CacheLock(key)
+
+
+def count(metric):
+    key = 'single_flight:' + metric
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Another worker may be adding the first count at the same moment
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+# Returns how many values were found up to date, worked out, found after waiting for another request to work them out,
+# sent out of date while another request worked them out, and worked out after waiting too long for another request,
+# by every worker
+def get_metrics():
+    counts = cache.get_many(['single_flight:' + metric for metric in METRICS])
+    return {metric: counts.get('single_flight:' + metric, 0) for metric in METRICS}
+
+
+# Saves a value along with the version of the data it was worked out from. It is up to date for the given number of
+# seconds, and kept for STALE_SECONDS longer
+def store(key, version, value, timeout):
+    cache.set(key, (version, time.time() + timeout, value), timeout + STALE_SECONDS)
+
+
+# Returns the value and version saved under the key if it is up to date with the given version, or None
+def get_fresh(key, version):
+    entry = cache.get(key)
+    if entry is None or entry[0] != version or entry[1] < time.time():
+        return None
+    return entry[2], entry[0]
+
+
+# Returns the value saved under the key and the version it was worked out from, working it out with compute() and saving
+# it if it is missing or out of date. Only one request at a time works out the value of a key, so when a popular value
+# goes out of date the database is asked once rather than by every request at the same moment:
+# - while one request works out a new value, the others get the old one, which may be out of date by a few moments
+# - if there is no old value, the others wait for the new one instead
+def get_or_compute(key, version, compute, timeout):
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version and entry[1] >= time.time():
+        count('fresh')
+        return entry[2], entry[0]
+
+    lock = get_lock(key)
+    if entry is not None:
+        if not lock.acquire():
+            count('stale')
+            return entry[2], entry[0]
+    else:
+        waited_until = time.monotonic() + SINGLE_FLIGHT_WAIT_SECONDS
+        while not lock.acquire():
+            if time.monotonic() >= waited_until:
+                count('lock_timeouts')
+                lock = None
+                break
+            time.sleep(LOCK_POLL_SECONDS)
+            # The request holding the lock may have saved the value already
+            found = get_fresh(key, version)
+            if found is not None:
+                count('coalesced')
+                return found
+    try:
+        # Another request may have saved the value between reading the cache and taking the lock
+        found = get_fresh(key, version)
+        if found is not None:
+            count('coalesced')
+            return found
+        value = compute()
+        store(key, version, value, timeout)
+        count('computed')
+        return value, version
+    finally:
+        if lock is not None:
+            lock.release()
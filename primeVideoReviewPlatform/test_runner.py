@@ -0,0 +1,57 @@
+import json
+import sys
+import time
+from unittest import TextTestResult
+
+from django.test.runner import DiscoverRunner
+
+
+# Adds up how long the tests of each module took. Each test is timed from the end of the test before it, so the time
+# spent setting up each class (e.g. in setUpTestData) is included and the module times add up to the whole run
+class TimedTextTestResult(TextTestResult):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.module_timings = {}
+        self.last_stopped = None
+
+    def startTestRun(self):
+        super().startTestRun()
+        self.last_stopped = time.perf_counter()
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        now = time.perf_counter()
+        seconds, count = self.module_timings.get(type(test).__module__, (0, 0))
+        self.module_timings[type(test).__module__] = (seconds + now - self.last_stopped, count + 1)
+        self.last_stopped = now
+
+
+# Prints how long each test module took after the tests have run, slowest first, and can also save the timings to a
+# file so that run_tests can combine the timings of each app
+class TimedTestRunner(DiscoverRunner):
+    def __init__(self, timings_file=None, **kwargs):
+        super().__init__(**kwargs)
+        self.timings_file = timings_file
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--timings-file', help='Saves the time taken by each test module to this file as JSON')
+
+    def get_resultclass(self):
+        return super().get_resultclass() or TimedTextTestResult
+
+    def suite_result(self, suite, result, **kwargs):
+        timings = getattr(result, 'module_timings', {})
+        if self.timings_file:
+            with open(self.timings_file, 'w') as file:
+                json.dump(timings, file)
+        elif timings:
+            print_timings(timings, sys.stderr)
+        return super().suite_result(suite, result, **kwargs)
+
+
+def print_timings(timings, stream):
+    stream.write('\nTime per test module:\n')
+    for module, (seconds, count) in sorted(timings.items(), key=lambda timing: -timing[1][0]):
+        stream.write('%8.2fs  %4d tests  %s\n' % (seconds, count, module))
@@ -0,0 +1,34 @@
+# Settings for running the tests as quickly as possible, used by the run_tests command and by python manage.py test
+# unless DJANGO_SETTINGS_MODULE says otherwise (see manage.py)
+import atexit
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401, F403
+
+# The database only ever exists in memory, so nothing is written to disk and db.sqlite3 is never touched
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+# Each run keeps the shared cache in a directory of its own, which is removed afterwards, so the tests never read or
+# clear the values of a development server or another run
+TEST_CACHE_DIR = tempfile.mkdtemp(prefix='primevideo-test-cache-')
+atexit.register(shutil.rmtree, TEST_CACHE_DIR, ignore_errors=True)
+CACHES = {
+    'default': dict(CACHES['default'], LOCATION=TEST_CACHE_DIR),  # noqa: F405
+    'local': CACHES['local'],  # noqa: F405
+}
+
+# The default password hasher is deliberately slow, which makes every test that creates an account or logs in slow
+# too. MD5 is not safe for real passwords but is fine for test users
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# The tests write many invalid forms on purpose, which should not end up in form_errors.log
+LOGGING['handlers']['file'] = {'class': 'logging.NullHandler'}  # noqa: F405
+
+# Reports how long each test module took, see test_runner.py
+TEST_RUNNER = 'primeVideoReviewPlatform.test_runner.TimedTestRunner'
@@ -0,0 +1,199 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.db import transaction
+
+from .versions import new_version
+
+# Small values read on almost every request, such as the title and rating shown at the top of a movie's review pages,
+# are kept in two places: in the memory of each worker process, which costs next to nothing to read, and in the default
+# cache (see CACHES in settings.py), which every worker shares and which outlives a worker being restarted. A value is
+# only read from the database when it is in neither.
+
+# Each worker keeps at most this many values, and at most this many bytes of them, dropping the least recently used
+# values first
+LOCAL_MAX_ENTRIES = 10000
+LOCAL_MAX_BYTES = 16 * 1024 * 1024
+
+# How long a value is kept by each worker and in the shared cache, unless a namespace sets its own
+LOCAL_TIMEOUT_SECONDS = 60
+SHARED_TIMEOUT_SECONDS = 60 * 60
+
+# Each namespace has a version kept in the shared cache, and changing it drops every value of the namespace in every
+# worker at once. Workers only check the version this often, so the other workers may use the old values for this long
+# after a change
+VERSION_CHECK_SECONDS = 1
+
+# The hit and miss counts of each worker are added to the shared cache at most this often, see get_stats()
+STATS_FLUSH_SECONDS = 10
+STATS = ['local_hits', 'shared_hits', 'misses']
+
+# Every namespace created, by name
+namespaces = {}
+
+
+def get_shared_cache():
+    return caches['default']
+
+
+# The values kept in a worker's memory, most recently used last. Each entry is the value, when it expires and its size
+class LocalCache:
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    # Returns the entry of the key, or None if it is missing or has expired
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                self.remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, timeout, size):
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            # A value that would push out everything else is not worth keeping
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (value, time.monotonic() + timeout, size)
+            self.size += size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+
+    # The lock must be held
+    def remove(self, key):
+        self.size -= self.entries.pop(key)[2]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+local_cache = LocalCache(LOCAL_MAX_ENTRIES, LOCAL_MAX_BYTES)
+
+
+# A group of values that are read through both caches and are all dropped together when any of them changes, e.g. the
+# headers of every movie. Create each namespace once, when its module is imported
+class TwoTierCache:
+    def __init__(self, namespace, local_timeout=LOCAL_TIMEOUT_SECONDS, shared_timeout=SHARED_TIMEOUT_SECONDS):
+        self.namespace = namespace
+        self.local_timeout = local_timeout
+        self.shared_timeout = shared_timeout
+        self.version_key = 'two_tier_version:' + namespace
+        self.version = None
+        self.version_checked_at = 0
+        self.counts = dict.fromkeys(STATS, 0)
+        self.counts_flushed_at = time.monotonic()
+        self.counts_lock = threading.Lock()
+        namespaces[namespace] = self
+
+    # The namespace's current version, read from the shared cache at most every VERSION_CHECK_SECONDS
+    def get_version(self):
+        now = time.monotonic()
+        if self.version is None or now - self.version_checked_at >= VERSION_CHECK_SECONDS:
+            shared_cache = get_shared_cache()
+            version = shared_cache.get(self.version_key)
+            if version is None:
+                # Another worker may be starting the namespace at the same moment, in which case its version is kept
+                shared_cache.add(self.version_key, new_version(), None)
+                version = shared_cache.get(self.version_key)
+            self.version = version
+            self.version_checked_at = now
+        return self.version
+
+    # Returns the value of the key, calling compute() to read it from the database if it is in neither cache. A value
+    # of None is never kept, so a missing row is read again each time. Values are kept under the namespace's version,
+    # so once the version changes the old values are never read again and simply expire
+    def get_or_set(self, key, compute):
+        version = self.get_version()
+        local_key = (self.namespace, version, key)
+        entry = local_cache.get(local_key)
+        if entry is not None:
+            self.count('local_hits')
+            return entry[0]
+
+        shared_cache = get_shared_cache()
+        shared_key = '%s:%s:%s' % (self.namespace, version, key)
+        value = shared_cache.get(shared_key)
+        if value is not None:
+            self.count('shared_hits')
+        else:
+            self.count('misses')
+            value = compute()
+            if value is None:
+                return None
+            shared_cache.set(shared_key, value, self.shared_timeout)
+        local_cache.set(local_key, value, self.local_timeout, len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+        return value
+
+    # Drops every value of the namespace in every worker. The version is changed straight away, so this worker reads
+    # the change it is making, and again once the transaction making it has been committed, since until then the other
+    # workers can only read the old rows and may have kept them under the first new version
+    def invalidate(self):
+        self.set_version()
+        transaction.on_commit(self.set_version)
+
+    def set_version(self):
+        version = new_version()
+        get_shared_cache().set(self.version_key, version, None)
+        self.version = version
+        self.version_checked_at = time.monotonic()
+
+    def count(self, stat):
+        with self.counts_lock:
+            self.counts[stat] += 1
+            if time.monotonic() - self.counts_flushed_at < STATS_FLUSH_SECONDS:
+                return
+        self.flush_stats()
+
+    # Adds the counts of this worker to the totals of every worker in the shared cache
+    def flush_stats(self):
+        with self.counts_lock:
+            counts = self.counts
+            self.counts = dict.fromkeys(STATS, 0)
+            self.counts_flushed_at = time.monotonic()
+        shared_cache = get_shared_cache()
+        for stat, count in counts.items():
+            if not count:
+                continue
+            key = 'two_tier_stats:%s:%s' % (self.namespace, stat)
+            try:
+                shared_cache.incr(key, count)
+            except ValueError:
+                if not shared_cache.add(key, count, None):
+                    shared_cache.incr(key, count)
+
+    # Returns how many values of the namespace were found in a worker's memory, found in the shared cache, or read from
+    # the database, by every worker. The counts of each worker are only added every STATS_FLUSH_SECONDS
+    def get_stats(self):
+        self.flush_stats()
+        keys = ['two_tier_stats:%s:%s' % (self.namespace, stat) for stat in STATS]
+        counts = get_shared_cache().get_many(keys)
+        return {stat: counts.get(key, 0) for stat, key in zip(STATS, keys)}
+
+
+# Returns the statistics of every namespace, see TwoTierCache.get_stats()
+def get_stats():
+    return {namespace: two_tier_cache.get_stats() for namespace, two_tier_cache in namespaces.items()}
+
+
+# Forgets every value, version and count, in this worker and in the shared cache
+def clear():
+    local_cache.clear()
+    for two_tier_cache in namespaces.values():
+        two_tier_cache.version = None
+        two_tier_cache.counts = dict.fromkeys(STATS, 0)
+    get_shared_cache().clear()
@@ -22,6 +22,8 @@ from user.views import register
 
 from user.views import CustomPasswordChangeView
 
+from review.views import ExportView, ModerationView, RecentReviewsView
+
 # A mapping of urls to views
 urlpatterns = [
     path('movies/', include('movie.urls')),
@@ -30,5 +32,8 @@ urlpatterns = [
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('change-password/', CustomPasswordChangeView.as_view(), name='change_password'),
     path('register/', register, name='register'),
-    path('users/', include('user.urls'))
+    path('users/', include('user.urls')),
+    path('export/<str:model_name>/', ExportView.as_view(), name='export'),
+    path('moderation/', ModerationView.as_view(), name='moderation'),
+    path('recent-reviews/', RecentReviewsView.as_view(), name='recent_reviews')
 ]
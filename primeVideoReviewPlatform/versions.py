@@ -0,0 +1,68 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Version counters are kept in the cache and change whenever the data behind a page changes. A page's ETag is built
+# from the versions it depends on, so checking whether a browser's copy is still up to date is a single cache lookup
+# instead of rendering the page and hashing it.
+
+# Bumped whenever any movie is added, changed or deleted
+MOVIES = 'movies'
+
+# Bumped whenever a movie is added, changed or deleted through its model, but not when only its rating is updated.
+# The autocomplete index in movie/autocomplete.py is rebuilt when this changes
+MOVIE_TITLES = 'movie_titles'
+
+# Bumped whenever a username could have changed, since usernames are shown on the review and user lists
+USERNAMES = 'usernames'
+
+# Bumped whenever a review is written, hidden, shown again or deleted, since the user list shows how many reviews each
+# user has written
+REVIEW_COUNTS = 'review_counts'
+
+
+def movie_key(movie_id):
+    return 'movie:' + str(movie_id)
+
+
+def user_key(user_id):
+    return 'user:' + str(user_id)
+
+
+# A new version is based on the current time rather than incrementing the old one, so a version that was lost from the
+# cache (e.g. after a restart) can never come back with a value that a browser has already seen
+def new_version():
+    return time.time_ns()
+
+
+# The versions are kept in the default cache, which every worker shares, so a change made by one worker is seen by all of
+# them. A missing version is added rather than set, so if two workers start it at the same moment they both use the
+# first one
+def get_versions(keys):
+    cache_keys = ['version:' + key for key in keys]
+    versions = cache.get_many(cache_keys)
+    for cache_key in cache_keys:
+        if cache_key not in versions:
+            version = new_version()
+            versions[cache_key] = version if cache.add(cache_key, version, timeout=None) else cache.get(cache_key, version)
+    return [versions[cache_key] for cache_key in cache_keys]
+
+
+def bump_versions(keys):
+    version = new_version()
+    cache.set_many({'version:' + key: version for key in keys}, timeout=None)
+
+
+# Builds a weak ETag from the versions of the given keys. The logged in user is always included since their username
+# is shown in the navigation bar on every page, and the release is included so that a deploy with changed templates
+# does not match ETags from the previous one
+def make_etag(request, keys):
+    keys = list(keys)
+    if request.user.is_authenticated:
+        keys.append(user_key(request.user.id))
+        viewer = str(request.user.id)
+    else:
+        viewer = 'anonymous'
+    versions = get_versions(keys)
+    return 'W/"' + '.'.join([settings.RELEASE, viewer] + [str(version) for version in versions]) + '"'
@@ -0,0 +1,35 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+from movie.autocomplete import title_index
+
+# The templates rendered by the most visited pages. With the cached template loader, loading them here means they are
+# compiled once before the workers are forked rather than once per worker on its first request
+HOT_TEMPLATES = [
+    'base.html',
+    'base_pagination.html',
+    'movie/list.html',
+    'movie/detail.html',
+    'review/list.html',
+    'review/detail.html',
+    'user/list.html',
+    'user/detail.html',
+]
+
+
+# Does the work that Django would otherwise leave until the first request: importing every view through the url
+# configuration, importing the session backend, compiling the templates and building the autocomplete index
+def warm_up():
+    get_resolver().url_patterns
+    import_module(settings.SESSION_ENGINE)
+    for template_name in HOT_TEMPLATES:
+        get_template(template_name)
+    # If the database is not ready yet, the index is built on the first search instead
+    try:
+        title_index.build()
+    except DatabaseError:
+        pass
@@ -0,0 +1,174 @@
+import math
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+
+from movie.models import MOVIE_HEADERS, Movie, MovieRanking
+from primeVideoReviewPlatform.versions import MOVIES, bump_versions, movie_key
+from .hot_pages import schedule_hot_page_refresh
+from .models import Review
+
+# Number of movies updated per query when updating many movies at once
+AGGREGATE_BATCH_SIZE = 500
+
+# The Bayesian rating of a movie is its average rating after adding this many imaginary reviews that each give the
+# average rating of all movies. A movie needs many more than this many reviews before its own average dominates
+PRIOR_WEIGHT = 10
+
+# Used as the average rating of all movies while there are no reviews at all
+DEFAULT_MEAN_RATING = 3.0
+
+# The average rating of all movies barely changes from one review to the next, so it is only recalculated this often
+MEAN_RATING_CACHE_SECONDS = 5 * 60
+MEAN_RATING_CACHE_KEY = 'ranking:mean_rating'
+
+# A review counts half as much towards a movie's trending score after this long, so the trending leaderboard mostly
+# reflects the last week
+TRENDING_HALF_LIFE_SECONDS = 3.5 * 24 * 60 * 60
+
+# The weight of a review is measured from this date rather than from now, so the scores of movies that have not been
+# reviewed recently never need to be updated. These values are copied in movie/migrations/0007_populate_movieranking.py
+TRENDING_EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+# Returns the average rating of every review of every movie, which the Bayesian rating pulls movies towards.
+# It is calculated from the small ranking table rather than the review table
+def get_mean_rating():
+    mean = cache.get(MEAN_RATING_CACHE_KEY)
+    if mean is None:
+        totals = MovieRanking.objects.aggregate(count=Sum('review_count'), total=Sum('rating_sum'))
+        mean = totals['total'] / totals['count'] if totals['count'] else DEFAULT_MEAN_RATING
+        cache.set(MEAN_RATING_CACHE_KEY, mean, MEAN_RATING_CACHE_SECONDS)
+    return mean
+
+
+def get_bayesian_rating(review_count, rating_sum, mean):
+    return (PRIOR_WEIGHT * mean + rating_sum) / (PRIOR_WEIGHT + review_count)
+
+
+# Adds a review posted at the given time to a trending score. The score is the log of the sum of the weights of the
+# reviews, and the weights grow exponentially over time, so the log is kept rather than the sum to stop it overflowing.
+# log(e^a + e^b) is calculated as max + log(1 + e^(min - max)), which never overflows
+def add_trending_activity(score, date_posted):
+    weight = math.log(2) * (date_posted - TRENDING_EPOCH).total_seconds() / TRENDING_HALF_LIFE_SECONDS
+    if score is None:
+        return weight
+    larger, smaller = max(score, weight), min(score, weight)
+    return larger + math.log1p(math.exp(smaller - larger))
+
+
+# Applies the change made by some of a movie's reviews to its ranking, statistics and average rating, without reading
+# any of the movie's other reviews. The reviews that now count and no longer count are each given as (rating, date
+# posted) pairs, so editing a review's rating removes the old rating and adds the new one. Only new reviews are counted
+# as activity for the trending leaderboard. The ranking row is locked while it is updated so that two reviews written at
+# the same time cannot both read the old counters
+def apply_review_change(movie_id, added=(), removed=(), is_new=False):
+    with transaction.atomic():
+        ranking = MovieRanking.objects.select_for_update().filter(movie_id=movie_id).first()
+        if ranking is None:
+            # The movie has no ranking yet (e.g. this is its first review), so it is built from its reviews, which
+            # already include this change
+            refresh_movie_aggregates([movie_id])
+            return
+        for rating, date_posted in added:
+            ranking.review_count += 1
+            ranking.rating_sum += rating
+            ranking.add_to_statistics(rating, date_posted)
+            if is_new:
+                ranking.trending_score = add_trending_activity(ranking.trending_score, date_posted)
+        for rating, date_posted in removed:
+            ranking.review_count -= 1
+            ranking.rating_sum -= rating
+            ranking.add_to_statistics(rating, date_posted, -1)
+        if ranking.review_count <= 0:
+            # The movie's last review was removed, so it no longer belongs on any leaderboard
+            ranking.delete()
+            average_rating = None
+        else:
+            ranking.bayesian_rating = get_bayesian_rating(ranking.review_count, ranking.rating_sum, get_mean_rating())
+            ranking.save()
+            average_rating = round(ranking.rating_sum / ranking.review_count, 1)
+        Movie.objects.filter(id=movie_id).update(average_rating_out_of_five=average_rating)
+    # update() does not send the signal that marks the movie's pages as changed
+    bump_versions([MOVIES, movie_key(movie_id)])
+    MOVIE_HEADERS.invalidate()
+    # The first pages of the movie's reviews are rendered again if they are visited often
+    schedule_hot_page_refresh(movie_id)
+
+
+def record_review_created(review):
+    apply_review_change(review.movie_id, added=[(review.rating_out_of_five, review.date_posted)], is_new=True)
+
+
+# Editing a review only changes its rating, it is not counted as new activity for the trending leaderboard
+def record_review_rating_changed(review, old_rating):
+    if review.rating_out_of_five != old_rating:
+        apply_review_change(review.movie_id, added=[(review.rating_out_of_five, review.date_posted)],
+                            removed=[(old_rating, review.date_posted)])
+
+
+# Applies the change made by hiding, showing again or deleting many reviews, once per movie. Each review is given as a
+# (movie id, rating, date posted) tuple
+def apply_reviews_change(reviews, sign):
+    changes = {}
+    for movie_id, rating, date_posted in reviews:
+        changes.setdefault(movie_id, []).append((rating, date_posted))
+    for movie_id, movie_reviews in sorted(changes.items()):
+        if sign > 0:
+            apply_review_change(movie_id, added=movie_reviews)
+        else:
+            apply_review_change(movie_id, removed=movie_reviews)
+
+
+# Hiding or deleting a visible review does not lower the trending score, since the activity still happened
+def record_reviews_removed(reviews):
+    apply_reviews_change(reviews, -1)
+
+
+# Showing a hidden review again does not add to the trending score, since it was never taken away
+def record_reviews_restored(reviews):
+    apply_reviews_change(reviews, 1)
+
+
+# Recalculates the rankings, statistics and average ratings of many movies from their reviews, e.g. after a batch of
+# reviews has been deleted or to correct any drift in the counters. Each movie is only updated once no matter how many
+# of its reviews changed, and the reviews are read with one query per batch of movies rather than one per movie
+def refresh_movie_aggregates(movie_ids):
+    movie_ids = sorted(set(movie_ids))
+    mean = get_mean_rating()
+    for start in range(0, len(movie_ids), AGGREGATE_BATCH_SIZE):
+        batch = movie_ids[start:start + AGGREGATE_BATCH_SIZE]
+        # Hidden reviews are left out by the default manager, so they do not count towards a movie's scores
+        reviews = Review.objects.filter(movie_id__in=batch).order_by() \
+            .values_list('movie_id', 'rating_out_of_five', 'date_posted')
+        rankings = {}
+        for movie_id, rating, date_posted in reviews.iterator():
+            if movie_id not in rankings:
+                rankings[movie_id] = MovieRanking(movie_id=movie_id)
+            ranking = rankings[movie_id]
+            ranking.review_count += 1
+            ranking.rating_sum += rating
+            ranking.add_to_statistics(rating, date_posted)
+            ranking.trending_score = add_trending_activity(ranking.trending_score, date_posted)
+        for ranking in rankings.values():
+            ranking.bayesian_rating = get_bayesian_rating(ranking.review_count, ranking.rating_sum, mean)
+
+        with transaction.atomic():
+            # Movies with no reviews left are removed from the leaderboards and go back to having no rating
+            MovieRanking.objects.filter(movie_id__in=batch).exclude(movie_id__in=list(rankings)).delete()
+            MovieRanking.objects.bulk_create(rankings.values(), update_conflicts=True, unique_fields=['movie'],
+                                             update_fields=['review_count', 'rating_sum', 'bayesian_rating',
+                                                            'trending_score', 'rating_counts', 'weekly_counts',
+                                                            'weekly_counts_end'])
+
+            movies = list(Movie.objects.filter(id__in=batch).only('id', 'average_rating_out_of_five'))
+            for movie in movies:
+                ranking = rankings.get(movie.id)
+                movie.average_rating_out_of_five = round(ranking.rating_sum / ranking.review_count, 1) \
+                    if ranking else None
+            Movie.objects.bulk_update(movies, ['average_rating_out_of_five'])
+        # bulk_update() does not send the signal that marks the movies' pages as changed
+        bump_versions([MOVIES] + [movie_key(movie_id) for movie_id in batch])
+        MOVIE_HEADERS.invalidate()
@@ -0,0 +1,115 @@
+import csv
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from movie.models import Movie
+from user.models import User
+from .models import Review, decompress_message
+
+# The rows are read from the database in chunks of this size, so only one chunk is ever held in memory at a time
+EXPORT_CHUNK_SIZE = 2000
+
+# Encoded rows are grouped together until they reach roughly this many bytes before being handed to the response.
+# Yielding one tiny string per row makes the WSGI server do a write per row, which is much slower
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+# Maps the name used in the url/command to the model and the fields that are safe to export.
+# Only public fields are exported for users, so passwords, emails and login information are never included
+EXPORTABLE_MODELS = {
+    'movies': (Movie, ['id', 'title', 'description', 'image_url', 'duration', 'date_released',
+                       'average_rating_out_of_five']),
+    'reviews': (Review, ['id', 'movie_id', 'user_id', 'title', 'message', 'rating_out_of_five', 'date_posted',
+                         'date_last_edited']),
+    'users': (User, ['id', 'username', 'first_name', 'last_name', 'is_admin', 'date_joined']),
+}
+
+EXPORT_FORMATS = ['csv', 'jsonl']
+
+
+# Returns the field names and a lazy iterator over the rows of the given model.
+# values_list() avoids creating a model instance per row and iterator() stops Django from caching the whole result
+def get_export_rows(model_name, chunk_size=EXPORT_CHUNK_SIZE):
+    model, fields = EXPORTABLE_MODELS[model_name]
+    if model is Review:
+        # Long messages are stored compressed in ReviewBody, which is read in the same query
+        rows = model.objects.order_by('pk').values_list(*fields, 'body__compressed').iterator(chunk_size=chunk_size)
+        return fields, with_full_messages(rows, fields.index('message'))
+    rows = model.objects.order_by('pk').values_list(*fields).iterator(chunk_size=chunk_size)
+    return fields, rows
+
+
+# Puts each review's full message in place of the empty message column of reviews with long messages
+def with_full_messages(rows, message_index):
+    for *row, compressed in rows:
+        if compressed is not None:
+            row[message_index] = decompress_message(compressed)
+        yield row
+
+
+# The csv module can only write to file-like objects, so this object just returns what it is given instead of storing
+# it. See: https://docs.djangoproject.com/en/4.2/howto/outputting-csv/#streaming-large-csv-files
+class Echo:
+    def write(self, value):
+        return value
+
+
+def encode_csv(fields, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def encode_jsonl(fields, rows):
+    # DjangoJSONEncoder knows how to serialise dates, durations and decimals
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+# Groups the encoded rows into larger chunks and converts them to bytes
+def buffer_chunks(lines, buffer_size=EXPORT_BUFFER_SIZE):
+    buffer = []
+    buffered_length = 0
+    for line in lines:
+        buffer.append(line)
+        buffered_length += len(line)
+        if buffered_length >= buffer_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            buffered_length = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+# Compresses the chunks as they are produced. A wbits value of 31 makes zlib write a gzip header, so the output can be
+# opened by any gzip tool
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        # zlib holds on to data until it has enough to compress, so it may return nothing for a chunk
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+# Builds the full export pipeline for a list of rows. Nothing is read from the database until the result is iterated
+def stream_export(fields, rows, export_format='csv', compress=False):
+    if export_format == 'jsonl':
+        lines = encode_jsonl(fields, rows)
+    else:
+        lines = encode_csv(fields, rows)
+    chunks = buffer_chunks(lines)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    return chunks
+
+
+def get_export_filename(model_name, export_format, compress=False):
+    filename = model_name + '.' + export_format
+    if compress:
+        filename += '.gz'
+    return filename
+
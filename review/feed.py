@@ -0,0 +1,87 @@
+import time
+
+from django.core.cache import cache
+
+from primeVideoReviewPlatform.single_flight import get_or_compute, store
+from primeVideoReviewPlatform.versions import MOVIE_TITLES, USERNAMES, bump_versions, get_versions, movie_key
+from .models import Review
+
+# Number of reviews kept in the feed of recent reviews of every movie
+RECENT_FEED_SIZE = 30
+
+# Number of reviews kept in the strip of latest reviews on each movie's page
+MOVIE_FEED_SIZE = 5
+
+# The feeds are rebuilt from the database at least this often, so one that missed a review (e.g. two reviews written by
+# different workers at the same moment, where the last one to be saved wins) is only wrong for a short while
+FEED_CACHE_SECONDS = 10 * 60
+
+# The fields of each review shown in a feed. The message is left out, since only its excerpt is shown
+FEED_FIELDS = ['id', 'movie_id', 'movie__title', 'user_id', 'user__username', 'title', 'excerpt',
+               'rating_out_of_five', 'date_posted']
+
+
+# The feeds are kept in the cache as short lists of the newest reviews, newest first, which a new review is added to
+# the front of and the oldest review falls off the end of
+def get_feed_key(movie_id=None):
+    return 'feed:recent' if movie_id is None else 'feed:movie:' + str(movie_id)
+
+
+# The feeds show usernames and movie titles, so a feed is out of date once either of them changes
+def get_feed_version():
+    return '%d.%d' % tuple(get_versions([USERNAMES, MOVIE_TITLES]))
+
+
+def get_feed_size(movie_id=None):
+    return RECENT_FEED_SIZE if movie_id is None else MOVIE_FEED_SIZE
+
+
+# Reads the newest visible reviews of every movie, or of one movie, from the database. These are the first rows of the
+# review_posted_idx or review_movie_posted_idx index read backwards, so only the rows returned are read
+def load_feed(movie_id=None):
+    reviews = Review.objects.all()
+    if movie_id is not None:
+        reviews = reviews.filter(movie_id=movie_id)
+    rows = reviews.order_by('-date_posted', '-id').values(*FEED_FIELDS)[:get_feed_size(movie_id)]
+    return list(rows)
+
+
+# Returns the newest reviews of every movie, or of one movie, as dictionaries of FEED_FIELDS. When the feed is not in
+# the cache it is read from the database once and kept for the next requests. While one request reads it, the others
+# are given the previous feed or wait for the new one, see primeVideoReviewPlatform/single_flight.py
+def get_feed(movie_id=None):
+    feed, version = get_or_compute(get_feed_key(movie_id), get_feed_version(), lambda: load_feed(movie_id),
+                                   FEED_CACHE_SECONDS)
+    return feed
+
+
+# Adds a review that has just been written to the front of the feeds it belongs in. A feed that is not in the cache or
+# is out of date is left alone, since starting it with only this review would hide the older ones; it is read from the
+# database instead the next time it is shown. Adding a review does not change when the feed is next read again
+def add_to_feeds(review):
+    entry = {
+        'id': review.id,
+        'movie_id': review.movie_id,
+        'movie__title': review.movie.title,
+        'user_id': review.user_id,
+        'user__username': review.user.username,
+        'title': review.title,
+        'excerpt': review.excerpt,
+        'rating_out_of_five': review.rating_out_of_five,
+        'date_posted': review.date_posted,
+    }
+    version = get_feed_version()
+    sizes = {get_feed_key(): get_feed_size(), get_feed_key(review.movie_id): get_feed_size(review.movie_id)}
+    for key, (feed_version, fresh_until, feed) in cache.get_many(sizes).items():
+        seconds_left = fresh_until - time.time()
+        if feed_version == version and seconds_left > 0:
+            store(key, version, ([entry] + feed)[:sizes[key]], seconds_left)
+
+
+# Drops the feeds of the given movies and of every movie after reviews were edited, hidden, shown again or deleted, so
+# they are read from the database the next time they are shown. These are much rarer than new reviews.
+# Each movie's page shows its feed, so the pages are marked as changed too
+def forget_feeds(movie_ids):
+    movie_ids = set(movie_ids)
+    cache.delete_many([get_feed_key()] + [get_feed_key(movie_id) for movie_id in movie_ids])
+    bump_versions([movie_key(movie_id) for movie_id in movie_ids])
@@ -0,0 +1,167 @@
+import hashlib
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Review, ReviewFingerprint, decompress_message
+
+# Messages are split into overlapping runs of this many words, so that changing a word only changes a few of the runs
+SHINGLE_WORDS = 3
+
+# Messages with fewer words than this are not fingerprinted, since many short reviews such as "Great movie, loved it"
+# are the same without being spam
+MIN_FINGERPRINT_WORDS = 20
+
+# The signature is made of BAND_COUNT bands of BAND_ROWS hashes each. A band only matches if all of its hashes match,
+# so two messages with a fraction s of their runs in common share each band with a chance of s^BAND_ROWS. With these
+# values, messages with one word in thirty changed nearly always share at least two bands, and messages with a third of
+# their words changed almost never do.
+# Changing these values changes every fingerprint, so build_review_fingerprints would need to be run again from scratch
+BAND_COUNT = 8
+BAND_ROWS = 4
+
+# Messages that share at least this many bands count as near duplicates
+MIN_MATCHING_BANDS = 2
+
+# A message is refused when at least this many other reviews already have nearly the same message
+SPAM_DUPLICATE_COUNT = 3
+
+# At most this many reviews sharing a band are compared, so that a very common message cannot make a lookup slow
+MAX_CANDIDATES = 200
+
+# Number of reviews fingerprinted per transaction by the backfill
+FINGERPRINT_BATCH_SIZE = 1000
+
+SPAM_ERROR = 'This review is nearly the same as reviews that have already been posted, so it looks like spam'
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Each hash of the signature is a different random permutation of the runs' hashes, of the form (a * x + b) mod p.
+# The numbers are derived from their position rather than chosen at random, so that they never change
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def hash_text(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+PERMUTATIONS = [(hash_text('a%d' % row) % (MERSENNE_PRIME - 1) + 1, hash_text('b%d' % row) % MERSENNE_PRIME)
+                for row in range(BAND_COUNT * BAND_ROWS)]
+
+
+# Returns the bands of the MinHash signature of a message, or None if the message is too short to fingerprint. Each
+# hash of the signature is the smallest of the runs' hashes under one of the permutations, so two messages get the same
+# hash with a chance equal to the share of runs they have in common. Each band is then hashed down to a signed 64 bit
+# number, which is what SQLite stores.
+# See: https://en.wikipedia.org/wiki/MinHash
+def get_fingerprint_bands(message):
+    words = WORD_PATTERN.findall(message.lower())
+    if len(words) < MIN_FINGERPRINT_WORDS:
+        return None
+    # Repeating the same sentence many times does not change the signature
+    hashes = {hash_text(' '.join(words[start:start + SHINGLE_WORDS]))
+              for start in range(len(words) - SHINGLE_WORDS + 1)}
+    signature = [min((a * value + b) % MERSENNE_PRIME for value in hashes) for a, b in PERMUTATIONS]
+    return [
+        int.from_bytes(hashlib.blake2b(repr(signature[start:start + BAND_ROWS]).encode('utf-8'), digest_size=8)
+                       .digest(), 'big', signed=True)
+        for start in range(0, len(signature), BAND_ROWS)
+    ]
+
+
+def get_band_fields():
+    return ['band%d' % band for band in range(BAND_COUNT)]
+
+
+# Returns the reviews whose messages are nearly the same as the one with the given bands, as (review id, user id, movie
+# id) tuples with the closest first. Each band is looked up in its own index, and only the few reviews found are
+# compared. The author's own review of the same movie (e.g. the review being edited) and reviews their authors deleted
+# are left out. If a review id is given, only earlier reviews are returned
+def find_near_duplicates(bands, user_id, movie_id, before_review_id=None):
+    band_fields = get_band_fields()
+    any_band = Q()
+    for field, value in zip(band_fields, bands):
+        any_band |= Q(**{field: value})
+    candidates = ReviewFingerprint.objects.filter(any_band).exclude(review__hidden_reason='deleted')
+    if before_review_id is not None:
+        candidates = candidates.filter(review_id__lt=before_review_id)
+    candidates = candidates.values_list('review_id', 'review__user_id', 'review__movie_id', *band_fields)
+
+    duplicates = []
+    for review_id, other_user_id, other_movie_id, *other_bands in candidates[:MAX_CANDIDATES]:
+        if other_user_id == user_id and other_movie_id == movie_id:
+            continue
+        matching_bands = sum(band == other_band for band, other_band in zip(bands, other_bands))
+        if matching_bands >= MIN_MATCHING_BANDS:
+            duplicates.append((-matching_bands, review_id, other_user_id, other_movie_id))
+    return [duplicate[1:] for duplicate in sorted(duplicates)]
+
+
+# A message is spam if its author has already posted it on another movie, or if many other reviews already have it
+def is_spam(duplicates, user_id):
+    return len(duplicates) >= SPAM_DUPLICATE_COUNT or any(
+        other_user_id == user_id for review_id, other_user_id, movie_id in duplicates)
+
+
+# Fingerprints a message about to be written by the given user for the given movie. Returns the bands and the near
+# duplicates found, or raises a ValidationError to show to the author if the message looks like spam
+def check_message(message, user_id, movie_id):
+    bands = get_fingerprint_bands(message)
+    if bands is None:
+        return None, []
+    duplicates = find_near_duplicates(bands, user_id, movie_id)
+    if is_spam(duplicates, user_id):
+        raise ValidationError(SPAM_ERROR)
+    return bands, duplicates
+
+
+def build_fingerprint(review_id, bands, duplicates):
+    return ReviewFingerprint(review_id=review_id, duplicate_of_id=duplicates[0][0] if duplicates else None,
+                             **dict(zip(get_band_fields(), bands)))
+
+
+# Saves the fingerprint of a review that has just been written, flagging it as a duplicate of the closest of the given
+# reviews. A message too short to fingerprint removes any earlier fingerprint of the review
+def save_fingerprint(review, bands, duplicates):
+    if bands is None:
+        ReviewFingerprint.objects.filter(review=review).delete()
+        return
+    ReviewFingerprint.objects.bulk_create(
+        [build_fingerprint(review.id, bands, duplicates)], update_conflicts=True, unique_fields=['review'],
+        update_fields=get_band_fields() + ['duplicate_of']
+    )
+
+
+# Fingerprints the reviews that do not have a fingerprint yet, oldest first, flagging any that are nearly the same as an
+# earlier review. Reviews that already exist are never refused, even if they look like spam. Returns the number of
+# reviews fingerprinted
+def backfill_fingerprints(batch_size=FINGERPRINT_BATCH_SIZE):
+    fingerprinted = 0
+    last_id = 0
+    while True:
+        reviews = list(Review.all_objects.filter(id__gt=last_id, fingerprint__isnull=True).order_by('id')
+                       .values_list('id', 'user_id', 'movie_id', 'message', 'body__compressed')[:batch_size])
+        if not reviews:
+            return fingerprinted
+        last_id = reviews[-1][0]
+        # Long messages are stored compressed in ReviewBody
+        reviews = [(review_id, user_id, movie_id,
+                    get_fingerprint_bands(decompress_message(compressed) if compressed is not None else message))
+                   for review_id, user_id, movie_id, message, compressed in reviews]
+        reviews = [review for review in reviews if review[3] is not None]
+        with transaction.atomic():
+            # The batch is saved before it is checked, so that reviews are also compared with earlier reviews in the
+            # same batch
+            fingerprints = ReviewFingerprint.objects.bulk_create([
+                build_fingerprint(review_id, bands, []) for review_id, user_id, movie_id, bands in reviews
+            ])
+            flagged = []
+            for fingerprint, (review_id, user_id, movie_id, bands) in zip(fingerprints, reviews):
+                duplicates = find_near_duplicates(bands, user_id, movie_id, before_review_id=review_id)
+                if duplicates:
+                    fingerprint.duplicate_of_id = duplicates[0][0]
+                    flagged.append(fingerprint)
+            ReviewFingerprint.objects.bulk_update(flagged, ['duplicate_of'])
+        fingerprinted += len(fingerprints)
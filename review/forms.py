@@ -0,0 +1,30 @@
+from django import forms
+
+from .moderation import MODERATION_ACTIONS
+from .models import Review
+
+MODERATION_STATUSES = [
+    ('visible', 'Visible'),
+    ('hidden', 'Hidden'),
+    ('flagged', 'Flagged as duplicates'),
+    ('all', 'All'),
+]
+
+
+# The filters of the moderation queue, which are sent in the query string
+class ModerationFilterForm(forms.Form):
+    # The id of the movie, which the movie links in the queue fill in. A list of every movie to pick from would read and
+    # sort the whole movie table each time the queue is shown
+    movie = forms.IntegerField(min_value=1, required=False, label='Movie id')
+    username = forms.CharField(max_length=150, required=False)
+    max_rating = forms.IntegerField(min_value=1, max_value=5, required=False)
+    status = forms.ChoiceField(choices=MODERATION_STATUSES, required=False)
+    # The id of the last review on the previous page
+    after = forms.IntegerField(required=False, widget=forms.HiddenInput)
+
+
+# The reviews selected in the moderation queue and what to do with them
+class ModerationActionForm(forms.Form):
+    action = forms.ChoiceField(choices=MODERATION_ACTIONS)
+    # Hidden reviews can be selected too, so that they can be shown again
+    reviews = forms.ModelMultipleChoiceField(queryset=Review.all_objects.all())
@@ -0,0 +1,137 @@
+import gzip
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+
+from primeVideoReviewPlatform.background import run_in_background
+from primeVideoReviewPlatform.middleware import BROTLI_QUALITY, brotli, re_accepts_brotli
+from primeVideoReviewPlatform.single_flight import get_or_compute
+
+# The visits to each movie's reviews are counted over windows of this many seconds
+HOT_WINDOW_SECONDS = 5 * 60
+
+# A movie whose reviews were visited at least this many times in the current or the previous window is hot
+HOT_HITS_THRESHOLD = 100
+
+# Number of pages of a hot movie's reviews that are rendered ahead of time, newest first
+HOT_PAGES = 3
+
+# Rendered pages are dropped after this long, they are also replaced whenever the movie's reviews change
+HOT_PAGE_CACHE_SECONDS = 60 * 60
+
+# A hot movie's pages are rendered again at most this often in the background while its reviews are changing. Pages
+# changed in between are rendered by the next visit instead
+HOT_REFRESH_INTERVAL_SECONDS = 5
+
+
+def get_hits_key(movie_id, window):
+    return 'hot_hits:%d:%d' % (window, movie_id)
+
+
+# Counts a visit to a movie's reviews and returns whether the movie is hot. Visits to hot movies only need one cache
+# operation
+def record_hit(movie_id):
+    window = int(time.time() // HOT_WINDOW_SECONDS)
+    key = get_hits_key(movie_id, window)
+    try:
+        hits = cache.incr(key)
+    except ValueError:
+        # This is the first visit of the window. The count is kept for two windows, since the previous window's count
+        # is still used during the current one
+        cache.add(key, 1, 2 * HOT_WINDOW_SECONDS)
+        hits = 1
+    return hits >= HOT_HITS_THRESHOLD or is_hot(movie_id, window - 1)
+
+
+# Returns whether a movie was visited often enough in the given window, or by default in the current or previous one
+def is_hot(movie_id, window=None):
+    if window is not None:
+        return cache.get(get_hits_key(movie_id, window), 0) >= HOT_HITS_THRESHOLD
+    window = int(time.time() // HOT_WINDOW_SECONDS)
+    return is_hot(movie_id, window) or is_hot(movie_id, window - 1)
+
+
+# Returns the number of the page asked for if it is one of the pages rendered ahead of time, or None. Only the default
+# order is rendered ahead of time, and only for visitors who are not logged in, since the page shows logged in users
+# their own review and voting buttons
+def get_hot_page_number(request):
+    if request.user.is_authenticated or set(request.GET) - {'page'}:
+        return None
+    page = request.GET.get('page', '1')
+    if page not in [str(number) for number in range(1, HOT_PAGES + 1)]:
+        return None
+    return int(page)
+
+
+def get_page_key(movie_id, page):
+    return 'hot_page:%d:%d' % (movie_id, page)
+
+
+# Returns a rendered page along with its gzip and brotli compressed copies, so serving it needs no rendering or
+# compressing at all
+def encode_page(content):
+    encodings = {'identity': content, 'gzip': gzip.compress(content, mtime=0)}
+    if brotli is not None:
+        encodings['br'] = brotli.compress(content, quality=BROTLI_QUALITY)
+    return encodings
+
+
+# Returns the stored rendering of the page in the best encoding the browser accepts. The page is stored with its ETag,
+# which is built from the versions of everything shown on it, so a stored page is out of date as soon as anything on it
+# changes. If it is missing or out of date, render() is called to render it, unless another request is already doing
+# so, see primeVideoReviewPlatform/single_flight.py
+def get_stored_page(request, movie_id, page, etag, render):
+    encodings, stored_etag = get_or_compute(get_page_key(movie_id, page), etag, lambda: encode_page(render()),
+                                            HOT_PAGE_CACHE_SECONDS)
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if 'br' in encodings and re_accepts_brotli.search(accept_encoding):
+        encoding = 'br'
+    elif 'gzip' in accept_encoding:
+        encoding = 'gzip'
+    else:
+        encoding = 'identity'
+    response = HttpResponse(encodings[encoding], content_type='text/html; charset=utf-8')
+    # The compression middleware leaves responses that are already encoded alone
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    # A page sent while a newer one is being rendered keeps its own ETag, so the browser asks for the newer one next time
+    response.headers['ETag'] = stored_etag
+    return response
+
+
+# Renders the first pages of a movie's reviews as a visitor who is not logged in would see them and stores them
+def render_hot_pages(movie_id):
+    # The views import this module, so the view is only imported when it is needed. The test client's request factory
+    # builds the same requests a browser would send
+    from django.test import RequestFactory
+    from .views import ReviewListView, review_etag
+
+    for page in range(1, HOT_PAGES + 1):
+        request = RequestFactory().get(reverse('review:list', args=[movie_id]), {'page': page})
+        request.user = AnonymousUser()
+        view = ReviewListView.as_view(render_hot_page=True)
+        # Read before rendering, so a change made while rendering is never stored as the latest version of the page
+        etag = review_etag(request, pk=movie_id)
+        try:
+            # If a visitor is already rendering the page, it is left to them
+            get_or_compute(get_page_key(movie_id, page), etag,
+                           lambda: encode_page(view(request, pk=movie_id).render().content), HOT_PAGE_CACHE_SECONDS)
+        except Http404:
+            # The movie has fewer pages of reviews
+            return
+
+
+# Renders a movie's pages again in the background after its reviews have changed, if it is hot. This waits until the
+# change has been committed, since the background thread cannot see it before then
+def schedule_hot_page_refresh(movie_id):
+    def refresh():
+        if is_hot(movie_id) and cache.add('hot_refresh:%d' % movie_id, True, HOT_REFRESH_INTERVAL_SECONDS):
+            run_in_background(render_hot_pages, movie_id)
+
+    transaction.on_commit(refresh)
@@ -0,0 +1,77 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from movie.models import Movie
+from review.views import ReviewListView
+
+DEVELOPMENT_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+PRODUCTION_LOADERS = [
+    ('django.template.loaders.cached.Loader', DEVELOPMENT_LOADERS),
+]
+
+
+# Measures how long it takes to render a page of reviews with the development template settings and with the
+# production settings (cached loader and cached review cards). Every page is rendered, even for a movie with hot pages,
+# which would send most visitors a stored copy of the page. Seed the database with seed_benchmark_data first.
+# Example: python manage.py benchmark_review_list --iterations 200
+class Command(BaseCommand):
+    help = 'Benchmarks rendering a page of reviews with and without template caching'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movie', type=int, help='Id of the movie, defaults to the one with the most reviews')
+        parser.add_argument('--iterations', type=int, default=100)
+
+    def handle(self, *args, **options):
+        movie_id = options['movie']
+        if movie_id is None:
+            movie_id = (Movie.objects.annotate(review_count=Count('review')).order_by('-review_count')
+                        .values_list('id', flat=True).first())
+        if movie_id is None:
+            self.stderr.write('There are no movies to benchmark')
+            return
+
+        results = [
+            ('Development loaders, no cached cards', self.time_renders(movie_id, options['iterations'],
+                                                                       DEVELOPMENT_LOADERS, clear_cache=True)),
+            ('Cached loader, no cached cards', self.time_renders(movie_id, options['iterations'],
+                                                                 PRODUCTION_LOADERS, clear_cache=True)),
+            ('Cached loader and cached cards', self.time_renders(movie_id, options['iterations'],
+                                                                 PRODUCTION_LOADERS, clear_cache=False)),
+        ]
+        self.stdout.write('Every page is rendered, hot pages are not used')
+        baseline = results[0][1]
+        for name, seconds_per_render in results:
+            self.stdout.write('%-40s %8.3f ms per page  (%.1fx)' % (
+                name, seconds_per_render * 1000, baseline / seconds_per_render))
+
+    def time_renders(self, movie_id, iterations, loaders, clear_cache):
+        templates = [dict(settings.TEMPLATES[0], APP_DIRS=False,
+                          OPTIONS=dict(settings.TEMPLATES[0]['OPTIONS'], loaders=loaders))]
+        request = RequestFactory().get(reverse('review:list', args=[movie_id]))
+        request.user = AnonymousUser()
+        # Rendered the way hot pages are rendered ahead of time, since after a hundred visits the view would otherwise
+        # start sending the stored page instead of rendering it (see review/hot_pages.py)
+        view = ReviewListView.as_view(render_hot_page=True)
+
+        with override_settings(TEMPLATES=templates):
+            # The first render is not timed so that the cached loader and the cached cards start off warm
+            view(request, pk=movie_id).render()
+            elapsed = 0
+            for i in range(iterations):
+                if clear_cache:
+                    caches['local'].clear()
+                start = time.perf_counter()
+                view(request, pk=movie_id).render()
+                elapsed += time.perf_counter() - start
+        return elapsed / iterations
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from review.fingerprints import FINGERPRINT_BATCH_SIZE, backfill_fingerprints
+
+
+# Fingerprints the reviews written before fingerprinting was added, flagging the ones that are nearly the same as an
+# earlier review so that they show up in the moderation queue. Reviews that are already fingerprinted are skipped, so
+# this can be stopped and run again
+class Command(BaseCommand):
+    help = 'Fingerprints the messages of reviews that do not have a fingerprint yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=FINGERPRINT_BATCH_SIZE,
+                            help='Number of reviews fingerprinted per transaction')
+
+    def handle(self, *args, **options):
+        fingerprinted = backfill_fingerprints(options['batch_size'])
+        self.stdout.write('Fingerprinted %d reviews' % fingerprinted)
@@ -0,0 +1,124 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import PermissionDenied
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import Http404
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from movie.views import MovieListView, MovieDetailView, LeaderboardView, LEADERBOARDS
+from review.aggregates import record_review_rating_changed
+from review.fingerprints import BAND_COUNT, find_near_duplicates, get_fingerprint_bands
+from review.models import Review
+from review.views import ReviewListView, ReviewDetailView, ReviewCreateView, ReviewUpdateView, ModerationView, \
+    RecentReviewsView
+from user.models import User
+from user.views import UserListView, UserDetailView
+
+
+# Used to undo any changes made while capturing the queries of code that writes to the database
+class Rollback(Exception):
+    pass
+
+
+# Runs every page against the database and asks SQLite how it will run each query the page made, using EXPLAIN QUERY
+# PLAN. Any query that has to scan a whole table or index, rather than search it, is reported, since it will get slower
+# as the table grows. A scan that is read in order and stops after a LIMIT (e.g. the first page of a list) is reported
+# as bounded and is not counted. The first review in the database, its movie and its author are used for the pages
+# that need one.
+# See: https://www.sqlite.org/eqp.html
+# Example: python manage.py explain_queries --verbose
+class Command(BaseCommand):
+    help = 'Reports queries made by the views that scan a whole table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose', action='store_true', help='Show the plan of every query, not just scans')
+        parser.add_argument('--fail-on-scan', action='store_true', help='Exit with an error if any scans are found')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN is only supported on SQLite')
+        review = Review.objects.select_related('user', 'movie').order_by('id').first()
+        if review is None:
+            raise CommandError('There needs to be at least one review in the database')
+
+        scan_count = 0
+        for name, queries in self.capture_view_queries(review):
+            for sql in queries:
+                plan = [row[-1] for row in connection.cursor().execute('EXPLAIN QUERY PLAN ' + sql).fetchall()]
+                scans = [step for step in plan if step.startswith('SCAN')]
+                # Sorting the results needs a temporary b-tree, in which case every row is read before the LIMIT
+                bounded = ' LIMIT ' in sql and not any('TEMP B-TREE' in step for step in plan)
+                if scans and not bounded:
+                    scan_count += len(scans)
+                if scans or options['verbose']:
+                    self.stdout.write(name + ': ' + sql)
+                    for step in plan:
+                        if step.startswith('SCAN'):
+                            step += ' (bounded by LIMIT)' if bounded else ' <-- full scan'
+                        self.stdout.write('    ' + step)
+
+        self.stdout.write('Found %d scans' % scan_count)
+        if scan_count and options['fail_on_scan']:
+            raise CommandError('Some queries scan a whole table')
+
+    # Calls each view directly, returning the SELECT queries it made. Queries are captured with the parameters filled in
+    def capture_view_queries(self, review):
+        movie_id = review.movie.id
+        # The moderation queue is only shown to admins, so the review's author is made one. This is never saved
+        admin = User.objects.get(id=review.user.id)
+        admin.is_admin = True
+        pages = [
+            ('MovieListView', MovieListView, 'list', {}, None),
+            ('MovieDetailView', MovieDetailView, 'detail', {'pk': movie_id}, None),
+        ] + [
+            ('LeaderboardView ' + board, LeaderboardView, 'leaderboard', {'board': board}, None)
+            for board in LEADERBOARDS
+        ] + [
+            ('ReviewListView', ReviewListView, 'review:list', {'pk': movie_id}, review.user),
+            ('ReviewListView most helpful', ReviewListView, 'review:list', {'pk': movie_id}, None,
+             {'order': 'helpful'}),
+            ('ReviewDetailView', ReviewDetailView, 'review:detail', {'pk': movie_id, 'review_id': review.id}, None),
+            ('ReviewCreateView', ReviewCreateView, 'review:create', {'pk': movie_id}, review.user),
+            ('ReviewUpdateView', ReviewUpdateView, 'review:update', {'pk': movie_id, 'review_id': review.id},
+             review.user),
+            ('RecentReviewsView', RecentReviewsView, 'recent_reviews', {}, None),
+            ('UserListView', UserListView, 'user:list', {}, None),
+            ('UserDetailView', UserDetailView, 'user:detail', {'pk': review.user.id}, None),
+            ('ModerationView', ModerationView, 'moderation', {}, admin),
+            ('ModerationView flagged', ModerationView, 'moderation', {}, admin, {'status': 'flagged'}),
+        ]
+        # Some pages are also given a query string
+        for name, view, url_name, kwargs, user, *query in pages:
+            request = RequestFactory().get(reverse(url_name, kwargs=kwargs), *query)
+            request.user = user or AnonymousUser()
+            with CaptureQueriesContext(connection) as context:
+                # Pages that refuse the request still run queries to decide to do so
+                try:
+                    response = view.as_view()(request, **kwargs)
+                    if hasattr(response, 'render'):
+                        response.render()
+                except (PermissionDenied, Http404):
+                    pass
+            yield name, select_queries(context)
+
+        # The movie's totals are updated whenever a review is written, the change is rolled back afterwards
+        with CaptureQueriesContext(connection) as context:
+            try:
+                with transaction.atomic():
+                    # The rating is passed as having been different, since an unchanged rating updates nothing
+                    record_review_rating_changed(review, review.rating_out_of_five % 5 + 1)
+                    raise Rollback()
+            except Rollback:
+                pass
+        yield 'record_review_rating_changed', select_queries(context)
+
+        # Every new or edited message is compared with the messages of earlier reviews
+        with CaptureQueriesContext(connection) as context:
+            find_near_duplicates(get_fingerprint_bands(review.get_message()) or [0] * BAND_COUNT, review.user.id, movie_id)
+        yield 'find_near_duplicates', select_queries(context)
+
+
+def select_queries(context):
+    return [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
@@ -0,0 +1,70 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from review.exports import EXPORTABLE_MODELS, EXPORT_FORMATS, EXPORT_CHUNK_SIZE, get_export_rows, stream_export
+
+# resource is only available on Unix, elsewhere the peak memory is not reported
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Returns the peak memory of the process in MB, or None if it cannot be found. ru_maxrss is in kilobytes on Linux but in
+# bytes on macOS
+def get_peak_memory_mb():
+    if resource is None:
+        return None
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_memory / (1024 * 1024) if sys.platform == 'darwin' else peak_memory / 1024
+
+
+# Exports a table to a file (or stdout) using the same streaming pipeline as the export view.
+# Example: python manage.py export_data reviews --format jsonl --gzip --output reviews.jsonl.gz
+class Command(BaseCommand):
+    help = 'Exports movies, reviews or users as csv or jsonl'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model_name', choices=list(EXPORTABLE_MODELS))
+        parser.add_argument('--format', dest='export_format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--output', help='File to write to, the export is written to stdout if this is not given')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help='Number of rows read from the database at a time')
+
+    def handle(self, *args, **options):
+        fields, rows = get_export_rows(options['model_name'], options['chunk_size'])
+        row_count = [0]
+
+        # Counts the rows as they go past so that the export speed can be reported
+        def counted(rows_to_count):
+            for row in rows_to_count:
+                row_count[0] += 1
+                yield row
+
+        chunks = stream_export(fields, counted(rows), options['export_format'], options['gzip'])
+
+        start = time.perf_counter()
+        bytes_written = 0
+        if options['output']:
+            output = open(options['output'], 'wb')
+        else:
+            output = sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                bytes_written += len(chunk)
+        finally:
+            if options['output']:
+                output.close()
+        elapsed = time.perf_counter() - start
+
+        # The report goes to stderr so that it does not end up in the export when writing to stdout.
+        # The peak memory of the process should stay the same no matter how big the table is
+        rows_per_second = row_count[0] / elapsed if elapsed else 0
+        peak_memory_mb = get_peak_memory_mb()
+        peak_memory = 'peak memory %.1f MB' % peak_memory_mb if peak_memory_mb is not None else 'peak memory unknown'
+        self.stderr.write('Exported %d rows (%d bytes) in %.2fs, %.0f rows/s, %s' % (
+            row_count[0], bytes_written, elapsed, rows_per_second, peak_memory))
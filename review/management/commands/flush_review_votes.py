@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from review.votes import flush_review_votes
+
+
+# Adds any votes that have not been counted yet to their reviews. Votes are normally flushed in the background shortly
+# after they are made, but this can be run from cron to pick up any votes missed when the server restarted
+class Command(BaseCommand):
+    help = 'Adds uncounted helpfulness votes to the reviews'
+
+    def handle(self, *args, **options):
+        updated = flush_review_votes()
+        self.stdout.write('Updated the vote counts of %d reviews' % updated)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from review.moderation import HIDDEN_REVIEW_RETENTION_DAYS, PURGE_BATCH_SIZE, purge_hidden_reviews
+
+
+# Deletes reviews that were deleted by their author or hidden by an admin long enough ago that they can no longer be
+# shown again. This should be run regularly, e.g. daily from cron
+class Command(BaseCommand):
+    help = 'Deletes reviews that have been hidden for longer than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=HIDDEN_REVIEW_RETENTION_DAYS,
+                            help='Number of days hidden reviews are kept for')
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE,
+                            help='Number of reviews deleted per transaction')
+
+    def handle(self, *args, **options):
+        purged = purge_hidden_reviews(options['days'], options['batch_size'])
+        self.stdout.write('Purged %d hidden reviews' % purged)
@@ -0,0 +1,85 @@
+import random
+from datetime import date, timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movie.models import Movie
+from review.models import Review, make_excerpt
+from user.models import User
+
+# Number of rows inserted per query
+BATCH_SIZE = 5000
+
+
+# Fills the database with generated users, movies and reviews so that features can be benchmarked against a realistic
+# amount of data. This should never be run against the production database.
+# Example: python manage.py seed_benchmark_data --users 50000 --movies 5000 --reviews 3000000
+class Command(BaseCommand):
+    help = 'Creates generated users, movies and reviews for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--movies', type=int, default=100)
+        parser.add_argument('--reviews', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed so that runs can be repeated')
+
+    def handle(self, *args, **options):
+        if options['reviews'] > options['users'] * options['movies']:
+            self.stderr.write('Each user can only review a movie once, so there cannot be more reviews than '
+                              'users multiplied by movies')
+            return
+        generator = random.Random(options['seed'])
+
+        first_user_id = self.create_users(options['users'])
+        first_movie_id = self.create_movies(options['movies'], generator)
+        self.create_reviews(options['reviews'], first_user_id, options['users'], first_movie_id, options['movies'],
+                            generator)
+        # bulk_create() skips the signals that keep the leaderboards up to date, so they are worked out again from
+        # every review, which also updates the average rating of all movies that the other movies' scores depend on
+        call_command('refresh_rankings', stdout=self.stdout)
+
+    def create_users(self, count):
+        # The ids are continued from the current highest id so that the data can be added more than once
+        first_id = (User.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        for start in range(0, count, BATCH_SIZE):
+            with transaction.atomic():
+                # An unusable password is used because hashing a password takes a deliberately long time
+                User.objects.bulk_create(
+                    User(id=first_id + i, username='benchmark_user_' + str(first_id + i), password='!')
+                    for i in range(start, min(start + BATCH_SIZE, count))
+                )
+        self.stdout.write('Created %d users' % count)
+        return first_id
+
+    def create_movies(self, count, generator):
+        first_id = (Movie.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        for start in range(0, count, BATCH_SIZE):
+            with transaction.atomic():
+                Movie.objects.bulk_create(
+                    Movie(id=first_id + i, title='Benchmark Movie ' + str(first_id + i),
+                          description='A generated movie used for benchmarking',
+                          duration=timedelta(minutes=generator.randint(80, 180)),
+                          date_released=date(1950, 1, 1) + timedelta(days=generator.randint(0, 27000)))
+                    for i in range(start, min(start + BATCH_SIZE, count))
+                )
+        self.stdout.write('Created %d movies' % count)
+        return first_id
+
+    def create_reviews(self, count, first_user_id, user_count, first_movie_id, movie_count, generator):
+        # Every (user, movie) pair is numbered, and a random sample of those numbers is taken, which guarantees that
+        # no user reviews the same movie twice
+        pairs = generator.sample(range(user_count * movie_count), count)
+        # bulk_create() does not call Review.save(), so the excerpt is set here. The message is short enough to be stored
+        # in the review table
+        message = 'A generated review used for benchmarking. ' * 5
+        for start in range(0, count, BATCH_SIZE):
+            with transaction.atomic():
+                Review.objects.bulk_create(
+                    Review(user_id=first_user_id + pair // movie_count, movie_id=first_movie_id + pair % movie_count,
+                           title='Benchmark review', message=message, excerpt=make_excerpt(message),
+                           rating_out_of_five=generator.randint(1, 5))
+                    for pair in pairs[start:start + BATCH_SIZE]
+                )
+        self.stdout.write('Created %d reviews' % count)
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.5 on 2026-10-19 17:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('movie', '0005_alter_movie_table'),
+        ('review', '0004_alter_review_unique_together'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='review',
+            name='movie',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='movie.movie'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['movie', 'date_posted', 'id'], name='review_movie_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['movie', 'rating_out_of_five'], name='review_movie_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', 'date_posted'], name='review_user_posted_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.5 on 2026-10-19 18:10
+
+from django.db import migrations, models
+
+
+# Reviews hidden before the reason was recorded could only have been hidden by an admin
+def set_hidden_reason(apps, schema_editor):
+    Review = apps.get_model('review', 'Review')
+    Review.objects.filter(hidden_at__isnull=False).update(hidden_reason='moderated')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0006_review_moderation'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='review',
+            name='review_movie_posted_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='review',
+            name='review_movie_rating_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='review',
+            name='review_user_posted_idx',
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='hidden_reason',
+            field=models.CharField(blank=True, choices=[('deleted', 'Deleted by the author'), ('moderated', 'Hidden by an admin')], max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('hidden_at__isnull', True)), fields=['movie', 'date_posted', 'id'], name='review_movie_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('hidden_at__isnull', True)), fields=['movie', 'rating_out_of_five'], name='review_movie_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('hidden_at__isnull', True)), fields=['user', 'date_posted'], name='review_user_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('hidden_at__isnull', False)), fields=['hidden_at', 'id'], name='review_hidden_idx'),
+        ),
+        migrations.RunPython(set_hidden_reason, migrations.RunPython.noop),
+    ]
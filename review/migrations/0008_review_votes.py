@@ -0,0 +1,62 @@
+# Generated by Django 4.2.5 on 2026-10-19 18:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('review', '0007_review_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_helpful', models.BooleanField()),
+                ('is_flushed', models.BooleanField(default=False)),
+                ('date_voted', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='helpful_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='helpfulness',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='unhelpful_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('hidden_at__isnull', True)), fields=['movie', 'helpfulness', 'date_posted', 'id'], name='review_movie_helpful_idx'),
+        ),
+        migrations.AddField(
+            model_name='reviewvote',
+            name='review',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='review.review'),
+        ),
+        migrations.AddField(
+            model_name='reviewvote',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='reviewvote',
+            index=models.Index(condition=models.Q(('is_flushed', False)), fields=['review'], name='reviewvote_unflushed_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='reviewvote',
+            unique_together={('review', 'user')},
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.5 on 2026-10-19 18:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0008_review_votes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewFingerprint',
+            fields=[
+                ('review', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='review.review')),
+                ('band0', models.BigIntegerField()),
+                ('band1', models.BigIntegerField()),
+                ('band2', models.BigIntegerField()),
+                ('band3', models.BigIntegerField()),
+                ('band4', models.BigIntegerField()),
+                ('band5', models.BigIntegerField()),
+                ('band6', models.BigIntegerField()),
+                ('band7', models.BigIntegerField()),
+                ('duplicate_of', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='review.review')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['band0'], name='fingerprint_band0_idx'), models.Index(fields=['band1'], name='fingerprint_band1_idx'), models.Index(fields=['band2'], name='fingerprint_band2_idx'), models.Index(fields=['band3'], name='fingerprint_band3_idx'), models.Index(fields=['band4'], name='fingerprint_band4_idx'), models.Index(fields=['band5'], name='fingerprint_band5_idx'), models.Index(fields=['band6'], name='fingerprint_band6_idx'), models.Index(fields=['band7'], name='fingerprint_band7_idx')],
+            },
+        ),
+    ]
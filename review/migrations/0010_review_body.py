@@ -0,0 +1,26 @@
+# Generated by Django 4.2.5 on 2026-10-19 18:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0009_review_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewBody',
+            fields=[
+                ('review', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='body', serialize=False, to='review.review')),
+                ('compressed', models.BinaryField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='excerpt',
+            field=models.CharField(blank=True, max_length=300),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Fills in the excerpts of the reviews that already exist and moves their long messages to ReviewBody
+
+import zlib
+
+from django.db import migrations
+
+# These are copied from review/models.py, so that this migration keeps working if they are changed later
+LONG_MESSAGE_LENGTH = 1000
+EXCERPT_LENGTH = 300
+
+# Number of reviews updated per query, so that the whole table is never held in memory
+BATCH_SIZE = 1000
+
+
+def make_excerpt(message):
+    if len(message) <= EXCERPT_LENGTH:
+        return message
+    return message[:EXCERPT_LENGTH - 1].rsplit(' ', 1)[0].rstrip() + '…'
+
+
+def move_long_messages(apps, schema_editor):
+    Review = apps.get_model('review', 'Review')
+    ReviewBody = apps.get_model('review', 'ReviewBody')
+
+    last_id = 0
+    while True:
+        reviews = list(Review.objects.filter(id__gt=last_id).order_by('id').only('id', 'message')[:BATCH_SIZE])
+        if not reviews:
+            return
+        last_id = reviews[-1].id
+        bodies = []
+        for review in reviews:
+            review.excerpt = make_excerpt(review.message)
+            if len(review.message) > LONG_MESSAGE_LENGTH:
+                bodies.append(ReviewBody(review_id=review.id, compressed=zlib.compress(review.message.encode('utf-8'))))
+                review.message = ''
+        ReviewBody.objects.bulk_create(bodies)
+        Review.objects.bulk_update(reviews, ['message', 'excerpt'])
+
+
+# The messages are moved back into the review table when the migration is undone
+def restore_long_messages(apps, schema_editor):
+    Review = apps.get_model('review', 'Review')
+    ReviewBody = apps.get_model('review', 'ReviewBody')
+
+    last_id = 0
+    while True:
+        bodies = list(ReviewBody.objects.filter(review_id__gt=last_id).order_by('review_id')[:BATCH_SIZE])
+        if not bodies:
+            return
+        last_id = bodies[-1].review_id
+        Review.objects.bulk_update([
+            Review(id=body.review_id, message=zlib.decompress(body.compressed).decode('utf-8')) for body in bodies
+        ], ['message'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0010_review_body'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_long_messages, restore_long_messages),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.5 on 2026-10-19 19:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0010_populate_movieranking_statistics'),
+        ('review', '0011_move_long_messages'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='review',
+            name='movie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='movie.movie'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-19 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0012_review_movie_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reviewfingerprint',
+            index=models.Index(condition=models.Q(('duplicate_of__isnull', False)), fields=['duplicate_of'], name='fingerprint_duplicate_of_idx'),
+        ),
+    ]
@@ -1,17 +1,59 @@
+import zlib
+
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
+
+# Messages longer than this are compressed and stored in ReviewBody rather than in the review table, so that each page
+# of the review table holds many reviews and reading a list of reviews does not read long messages it does not show
+LONG_MESSAGE_LENGTH = 1000
+
+# Number of characters of each message shown in the lists of reviews
+EXCERPT_LENGTH = 300
+
+
+# Returns the start of a message, cut at the end of a word, for the lists of reviews
+def make_excerpt(message):
+    if len(message) <= EXCERPT_LENGTH:
+        return message
+    return message[:EXCERPT_LENGTH - 1].rsplit(' ', 1)[0].rstrip() + '…'
+
+
+def compress_message(message):
+    return zlib.compress(message.encode('utf-8'))
+
+
+def decompress_message(compressed):
+    return zlib.decompress(compressed).decode('utf-8')
+
+
+# The hidden_at condition shared by the partial indexes below and the default manager. SQLite only uses a partial index
+# when the query contains the index's condition, which the default manager always adds
+VISIBLE = Q(hidden_at__isnull=True)
+
+
+# Leaves out hidden reviews, so that they are never shown or counted by accident. Review.all_objects includes them
+class VisibleReviewManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(VISIBLE)
 
 
 class Review(models.Model):
 
     # These are the foreign keys for the users who write the reviews and the movies that the reviews are about
 
+    # The user does not get an index of its own, since the unique constraint in Meta below starts with it and can be used
+    # for the same lookups. The movie keeps its own index: the indexes in Meta that start with it only contain visible
+    # reviews, so they cannot be used by lookups that include hidden reviews, such as the moderation queue, the exports
+    # and deleting a movie's reviews when the movie is deleted
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE  # This means that if the user is deleted, the reviews are too. This will make data
-                                  # compliance laws easier to follow (if the user deletes their account, they probably
-                                  # want all their data deleted too)
+        on_delete=models.CASCADE,  # This means that if the user is deleted, the reviews are too. This will make data
+                                   # compliance laws easier to follow (if the user deletes their account, they probably
+                                   # want all their data deleted too)
+        db_index=False
     )
 
     movie = models.ForeignKey(
@@ -26,9 +68,13 @@ class Review(models.Model):
     # 100 characters is more than enough to have a concise review title
     title = models.CharField(max_length=100)
 
-    # 25,000 characters is ~3500-6250 words, which should be sufficient for all reviews
+    # 25,000 characters is ~3500-6250 words, which should be sufficient for all reviews.
+    # Long messages are stored in ReviewBody instead, which leaves this empty, so use get_message() to read a message
     message = models.CharField(max_length=25_000)
 
+    # The start of the message, which is all the lists of reviews show
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True)
+
     rating_out_of_five = models.IntegerField(
         validators=[  # Enforcing the 1-5 start limit
             MaxValueValidator(5),
@@ -42,6 +88,144 @@ class Review(models.Model):
     # This should be blank until the review has been edited at least once
     date_last_edited = models.DateTimeField(null=True, blank=True)
 
-    # This enforces the constraint of a user only being able to write one review per movie
+    # Set when the review is deleted by its author or hidden by an admin. Hidden reviews are not shown on the site and
+    # do not count towards the movie's rating, but can be shown again until they are purged for good after a while
+    hidden_at = models.DateTimeField(null=True, blank=True)
+
+    HIDDEN_REASONS = [
+        ('deleted', 'Deleted by the author'),
+        ('moderated', 'Hidden by an admin'),
+    ]
+    hidden_reason = models.CharField(max_length=10, choices=HIDDEN_REASONS, blank=True)
+
+    # The number of helpful and unhelpful votes, and a score calculated from them that the reviews can be ordered by.
+    # Votes are saved in ReviewVote and added to these columns every so often by flush_review_votes in review/votes.py,
+    # so that many people voting at once do not all have to wait to update the same review row
+    helpful_count = models.IntegerField(default=0)
+    unhelpful_count = models.IntegerField(default=0)
+    helpfulness = models.FloatField(default=0)
+
+    # The first manager is the default one, which is also used by related managers such as movie.review_set
+    objects = VisibleReviewManager()
+    all_objects = models.Manager()
+
+    # Long messages are only read from ReviewBody when they are shown in full
+    def get_message(self):
+        if self.message or not self.excerpt:
+            return self.message
+        try:
+            return decompress_message(self.body.compressed)
+        except ReviewBody.DoesNotExist:
+            return self.excerpt
+
+    # Saving a review also saves its excerpt, and moves a long message to ReviewBody. The message is kept on the review
+    # object, so it can still be used after saving
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'message' not in update_fields:
+            return super().save(*args, **kwargs)
+        message = self.message
+        is_new = self._state.adding
+        self.excerpt = make_excerpt(message)
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'excerpt'}
+        is_long = len(message) > LONG_MESSAGE_LENGTH
+        if is_long:
+            self.message = ''
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                if is_long:
+                    ReviewBody.objects.update_or_create(review=self,
+                                                        defaults={'compressed': compress_message(message)})
+                elif not is_new:
+                    # The message used to be long
+                    ReviewBody.objects.filter(review=self).delete()
+        finally:
+            self.message = message
+
     class Meta:
+        # This enforces the constraint of a user only being able to write one review per movie
         unique_together = ('user', 'movie')
+
+        # The indexes used by the public pages only contain visible reviews, so hidden reviews do not make them bigger
+        # or slower however many there are
+        indexes = [
+            # Lists a movie's reviews in the order they were posted without sorting them
+            models.Index(fields=['movie', 'date_posted', 'id'], name='review_movie_posted_idx', condition=VISIBLE),
+            # Contains everything needed to calculate a movie's average rating, so the table itself is never read
+            models.Index(fields=['movie', 'rating_out_of_five'], name='review_movie_rating_idx', condition=VISIBLE),
+            # Lists a movie's most helpful reviews first, newest first when they are equally helpful
+            models.Index(fields=['movie', 'helpfulness', 'date_posted', 'id'], name='review_movie_helpful_idx',
+                         condition=VISIBLE),
+            # Lists a user's most recent reviews on their profile
+            models.Index(fields=['user', 'date_posted'], name='review_user_posted_idx', condition=VISIBLE),
+            # Lists the most recent reviews of every movie in the moderation queue, hidden or not
+            models.Index(fields=['date_posted', 'id'], name='review_posted_idx'),
+            # Lists the most recently hidden reviews in the moderation queue, and finds the ones old enough to purge
+            models.Index(fields=['hidden_at', 'id'], name='review_hidden_idx',
+                         condition=Q(hidden_at__isnull=False)),
+        ]
+
+
+# The compressed message of a review whose message is too long to be stored in the review table, see Review.save()
+class ReviewBody(models.Model):
+    review = models.OneToOneField(Review, on_delete=models.CASCADE, primary_key=True, related_name='body')
+
+    # The message compressed with zlib. Plain text usually compresses to well under half of its size
+    compressed = models.BinaryField()
+
+
+# A user's vote on whether a review was helpful. Each user can vote once per review, and can change their vote.
+# Voting only writes to this table. Votes that have not been added to the review's counts yet are marked as unflushed
+class ReviewVote(models.Model):
+    # The unique constraint below starts with the review, so a separate index for this column is not needed
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='votes', db_index=False)
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+
+    is_helpful = models.BooleanField()
+
+    is_flushed = models.BooleanField(default=False)
+
+    date_voted = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('review', 'user')
+
+        indexes = [
+            # Only contains the votes waiting to be flushed, so finding them does not read the whole table
+            models.Index(fields=['review'], name='reviewvote_unflushed_idx', condition=Q(is_flushed=False)),
+        ]
+
+
+# A MinHash signature of a review's message, used to find reviews whose messages are nearly the same, such as spam
+# pasted onto many movies (see review/fingerprints.py). The signature is split into bands that are each hashed down to
+# one number with its own index. Messages that are nearly the same are very likely to have some bands in common, while
+# different messages almost never do, so near duplicates are found by looking up each band in its index instead of
+# comparing every review
+class ReviewFingerprint(models.Model):
+    review = models.OneToOneField(Review, on_delete=models.CASCADE, primary_key=True, related_name='fingerprint')
+
+    band0 = models.BigIntegerField()
+    band1 = models.BigIntegerField()
+    band2 = models.BigIntegerField()
+    band3 = models.BigIntegerField()
+    band4 = models.BigIntegerField()
+    band5 = models.BigIntegerField()
+    band6 = models.BigIntegerField()
+    band7 = models.BigIntegerField()
+
+    # The earlier review this one is nearly the same as, if any. These reviews are flagged in the moderation queue,
+    # which finds them while reading the reviews newest first. Deleting a review has to find the fingerprints pointing
+    # to it, which is done with the partial index below, as only the few duplicates need to be in it
+    duplicate_of = models.ForeignKey(Review, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+                                     db_index=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['band%d' % band], name='fingerprint_band%d_idx' % band) for band in range(8)
+        ] + [
+            models.Index(fields=['duplicate_of'], name='fingerprint_duplicate_of_idx',
+                         condition=models.Q(duplicate_of__isnull=False)),
+        ]
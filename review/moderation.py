@@ -0,0 +1,147 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from primeVideoReviewPlatform.versions import REVIEW_COUNTS, bump_versions, user_key
+from .aggregates import record_reviews_removed, record_reviews_restored
+from .feed import forget_feeds
+from .models import Review
+
+# Get logger to log the actions taken by admins
+logger = logging.getLogger('logger')
+
+# Number of reviews shown on each page of the moderation queue
+MODERATION_PAGE_SIZE = 50
+
+MODERATION_ACTIONS = [
+    ('hide', 'Hide'),
+    ('unhide', 'Show again'),
+    ('delete', 'Delete for good'),
+]
+
+# Hidden reviews can be shown again for this long, after which purge_hidden_reviews deletes them for good
+HIDDEN_REVIEW_RETENTION_DAYS = 30
+
+# Number of hidden reviews deleted per transaction by the purge, and the time to wait between batches so that
+# requests waiting to write get a chance to do so. See user/deletion.py
+PURGE_BATCH_SIZE = 500
+PURGE_PAUSE_SECONDS = 0.05
+
+
+# Returns the reviews in the moderation queue, newest first, or most recently hidden first when showing hidden reviews.
+# This is the order of the review_posted_idx or review_hidden_idx index read backwards (or of review_movie_posted_idx/
+# review_user_posted_idx when filtering visible reviews by movie or user).
+# Instead of page numbers, the queue carries on from the last review of the previous page, so showing any page only
+# reads the reviews on it, where page numbers would need the whole queue to be counted and skipped through
+def get_moderation_queue(movie_id=None, user=None, max_rating=None, status='visible', after=None):
+    # Only the columns shown are read, e.g. the excerpt of each message and not the message, and the author's username
+    # and not their password hash
+    reviews = Review.all_objects.select_related('user', 'movie', 'fingerprint').only(
+        'title', 'excerpt', 'rating_out_of_five', 'date_posted', 'hidden_at', 'user__username', 'movie__title',
+        'fingerprint__duplicate_of'
+    )
+    if movie_id is not None:
+        reviews = reviews.filter(movie_id=movie_id)
+    if user is not None:
+        reviews = reviews.filter(user=user)
+    if max_rating is not None:
+        reviews = reviews.filter(rating_out_of_five__lte=max_rating)
+    if status == 'visible':
+        reviews = reviews.filter(hidden_at__isnull=True)
+    elif status == 'hidden':
+        reviews = reviews.filter(hidden_at__isnull=False)
+    elif status == 'flagged':
+        # Visible reviews nearly the same as an earlier review, see review/fingerprints.py
+        reviews = reviews.filter(hidden_at__isnull=True, fingerprint__duplicate_of__isnull=False)
+    order_field = 'hidden_at' if status == 'hidden' else 'date_posted'
+    reviews = reviews.order_by('-' + order_field, '-id')
+    if after is not None:
+        after_value = getattr(after, order_field)
+        reviews = reviews.filter(Q(**{order_field + '__lt': after_value}) | Q(**{order_field: after_value,
+                                                                                 'id__lt': after.id}))
+    return reviews[:MODERATION_PAGE_SIZE]
+
+
+# Hides the given reviews, which removes them from the site and from their movies' scores. Each affected movie's scores
+# are updated once however many of its reviews were hidden. Returns the number of reviews that were hidden
+def hide_reviews(review_ids, reason):
+    with transaction.atomic():
+        hidden = list(Review.objects.filter(id__in=review_ids).values_list('id', 'movie_id', 'user_id',
+                                                                           'rating_out_of_five', 'date_posted'))
+        Review.all_objects.filter(id__in=[row[0] for row in hidden]).update(hidden_at=timezone.now(),
+                                                                            hidden_reason=reason)
+        record_reviews_removed([(movie_id, rating, date_posted)
+                                for review_id, movie_id, user_id, rating, date_posted in hidden])
+    # The authors' profiles and the feeds of recent reviews list the newest reviews, and the user list counts them
+    bump_versions([REVIEW_COUNTS] + [user_key(user_id) for user_id in {row[2] for row in hidden}])
+    forget_feeds([row[1] for row in hidden])
+    return len(hidden)
+
+
+# Shows reviews hidden by an admin again, adding them back to their movies' scores. Reviews deleted by their authors
+# stay hidden, since only the author could have chosen to show them. Returns the number of reviews shown again
+def restore_reviews(review_ids):
+    with transaction.atomic():
+        restored = list(Review.all_objects.filter(id__in=review_ids, hidden_at__isnull=False, hidden_reason='moderated')
+                        .values_list('id', 'movie_id', 'user_id', 'rating_out_of_five', 'date_posted'))
+        Review.all_objects.filter(id__in=[row[0] for row in restored]).update(hidden_at=None, hidden_reason='')
+        record_reviews_restored([(movie_id, rating, date_posted)
+                                 for review_id, movie_id, user_id, rating, date_posted in restored])
+    bump_versions([REVIEW_COUNTS] + [user_key(user_id) for user_id in {row[2] for row in restored}])
+    forget_feeds([row[1] for row in restored])
+    return len(restored)
+
+
+# Deletes reviews for good, whether they are hidden or not. Returns the number of reviews deleted
+def delete_reviews(review_ids):
+    with transaction.atomic():
+        deleted = list(Review.all_objects.filter(id__in=review_ids)
+                       .values_list('id', 'movie_id', 'user_id', 'rating_out_of_five', 'date_posted', 'hidden_at'))
+        Review.all_objects.filter(id__in=[row[0] for row in deleted]).delete()
+        # Hidden reviews were already taken out of their movies' scores when they were hidden
+        record_reviews_removed([(movie_id, rating, date_posted)
+                                for review_id, movie_id, user_id, rating, date_posted, hidden_at in deleted
+                                if hidden_at is None])
+    bump_versions([REVIEW_COUNTS] + [user_key(user_id) for user_id in {row[2] for row in deleted}])
+    forget_feeds([row[1] for row in deleted])
+    return len(deleted)
+
+
+# Applies one of the moderation actions to many reviews at once, in one transaction
+def moderate_reviews(review_ids, action, admin):
+    if action == 'hide':
+        changed_count = hide_reviews(review_ids, 'moderated')
+    elif action == 'unhide':
+        changed_count = restore_reviews(review_ids)
+    else:
+        changed_count = delete_reviews(review_ids)
+    logger.info('Admin ' + admin.username + ' used ' + action + ' on ' + str(changed_count) + ' reviews: '
+                + str(sorted(review_ids)))
+    return changed_count
+
+
+# Deletes reviews that have been hidden for longer than the retention period, in small batches so that the site can
+# keep writing in between. Hidden reviews do not count towards any scores, so nothing needs recalculating afterwards.
+# Returns the number of reviews deleted
+def purge_hidden_reviews(retention_days=HIDDEN_REVIEW_RETENTION_DAYS, batch_size=PURGE_BATCH_SIZE,
+                         pause_seconds=PURGE_PAUSE_SECONDS):
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    purged = 0
+    while True:
+        with transaction.atomic():
+            # This reads the oldest hidden reviews from the review_hidden_idx index
+            batch = list(Review.all_objects.filter(hidden_at__isnull=False, hidden_at__lt=cutoff)
+                         .order_by('hidden_at', 'id').values_list('id', flat=True)[:batch_size])
+            if not batch:
+                break
+            Review.all_objects.filter(id__in=batch).delete()
+        purged += len(batch)
+        if pause_seconds:
+            time.sleep(pause_seconds)
+    if purged:
+        logger.info('Purged ' + str(purged) + ' reviews hidden for over ' + str(retention_days) + ' days')
+    return purged
@@ -0,0 +1,131 @@
+import itertools
+
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from movie.models import MovieSimilarity
+from primeVideoReviewPlatform.versions import bump_versions, movie_key
+from .models import Review
+
+# A review with at least this rating counts as the user liking the movie
+LIKED_RATING = 4
+
+# Number of similar movies stored for each movie
+SIMILAR_MOVIES_COUNT = 10
+
+# Two movies need to have been liked by at least this many of the same users to count as similar at all
+MIN_SHARED_LIKES = 2
+
+# Scores based on few shared likes are scaled down by shared / (shared + this), so a pair of movies liked by the same
+# two users does not beat a pair liked by the same two hundred
+SHRINKAGE = 10
+
+# Number of movies whose similar movies are calculated and saved at a time, which limits the memory used
+SIMILARITY_BATCH_SIZE = 500
+
+# Number of reviews read from the database at a time while building the matrix of likes
+LIKES_CHUNK_SIZE = 10000
+
+
+# Builds a sparse matrix with a row per user and a column per movie, holding a 1 where the user liked the movie.
+# Returns the matrix along with the user and movie ids of its rows and columns, both sorted.
+# numpy and scipy take a while to import, so they are only imported when the recommendations are being built rather
+# than whenever the site starts
+def load_likes():
+    import numpy as np
+    from scipy import sparse
+
+    rows = Review.objects.filter(rating_out_of_five__gte=LIKED_RATING).order_by() \
+        .values_list('user_id', 'movie_id').iterator(chunk_size=LIKES_CHUNK_SIZE)
+    pairs = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64).reshape(-1, 2)
+    user_ids, user_indexes = np.unique(pairs[:, 0], return_inverse=True)
+    movie_ids, movie_indexes = np.unique(pairs[:, 1], return_inverse=True)
+    likes = sparse.csc_matrix((np.ones(len(pairs), dtype=np.float32), (user_indexes, movie_indexes)),
+                              shape=(len(user_ids), len(movie_ids)))
+    return likes, user_ids, movie_ids
+
+
+# Finds the most similar movies of the given columns of the matrix. Returns three arrays: the column of each movie,
+# the column of a similar movie and their score, sorted by movie and then by score from highest to lowest.
+# Movies are compared with the cosine similarity of their columns, which for a matrix of 1s is the number of users who
+# liked both divided by the square root of the product of the number of users who liked each
+def find_similar_movies(likes, columns):
+    import numpy as np
+
+    like_counts = np.asarray(likes.sum(axis=0)).ravel()
+    # Row i of this holds the number of users who liked both columns[i] and each other movie
+    shared = (likes[:, columns].T @ likes).tocoo()
+    rows, others, shared_likes = shared.row, shared.col, shared.data
+    movies = np.asarray(columns)[rows]
+
+    keep = (others != movies) & (shared_likes >= MIN_SHARED_LIKES)
+    rows, movies, others, shared_likes = rows[keep], movies[keep], others[keep], shared_likes[keep]
+    scores = shared_likes / np.sqrt(like_counts[movies] * like_counts[others])
+    scores *= shared_likes / (shared_likes + SHRINKAGE)
+
+    # Sorts by row and then by score, and keeps the first few of each row
+    order = np.lexsort((-scores, rows))
+    rows, movies, others, scores = rows[order], movies[order], others[order], scores[order]
+    row_starts = np.searchsorted(rows, rows)
+    keep = np.arange(len(rows)) - row_starts < SIMILAR_MOVIES_COUNT
+    return movies[keep], others[keep], scores[keep]
+
+
+# Returns the ids of the movies whose similar movies may have changed since the given time. A review changes the
+# similarity between its movie and every other movie its author liked
+def get_changed_movie_ids(since, likes, user_ids, movie_ids):
+    import numpy as np
+
+    changed = Review.objects.filter(Q(date_posted__gte=since) | Q(date_last_edited__gte=since)).order_by() \
+        .values_list('user_id', 'movie_id')
+    changed_movie_ids = set()
+    changed_user_ids = set()
+    for user_id, movie_id in changed:
+        changed_movie_ids.add(movie_id)
+        changed_user_ids.add(user_id)
+
+    # The rows of the changed users, leaving out users who do not like anything
+    users = np.intersect1d(user_ids, sorted(changed_user_ids), return_indices=True)[1]
+    liked_movies = likes.tocsr()[users].indices
+    changed_movie_ids.update(int(movie_id) for movie_id in movie_ids[np.unique(liked_movies)])
+    return changed_movie_ids
+
+
+# Calculates and saves the similar movies of every movie, or if a refresh is asked for and an earlier build exists,
+# only of the movies affected by reviews written since then. Returns the number of movies that were updated.
+# A refresh does not notice deleted reviews or the small change a new review makes to the scores of unrelated movies,
+# so a full build should still be run every so often
+def build_similar_movies(refresh=False):
+    import numpy as np
+
+    started = timezone.now()
+    likes, user_ids, movie_ids = load_likes()
+
+    since = MovieSimilarity.objects.aggregate(latest=Max('date_computed'))['latest'] if refresh else None
+    if since is None:
+        # Movies nobody likes any more have nothing to be similar to
+        stale = MovieSimilarity.objects.exclude(movie_id__in=movie_ids.tolist())
+        stale_movie_ids = set(stale.values_list('movie_id', flat=True))
+        stale.delete()
+        bump_versions([movie_key(movie_id) for movie_id in stale_movie_ids])
+        columns = np.arange(len(movie_ids))
+    else:
+        changed_movie_ids = get_changed_movie_ids(since, likes, user_ids, movie_ids)
+        columns = np.intersect1d(movie_ids, sorted(changed_movie_ids), return_indices=True)[1]
+
+    for start in range(0, len(columns), SIMILARITY_BATCH_SIZE):
+        batch = columns[start:start + SIMILARITY_BATCH_SIZE]
+        movies, others, scores = find_similar_movies(likes, batch)
+        batch_movie_ids = movie_ids[batch].tolist()
+        with transaction.atomic():
+            MovieSimilarity.objects.filter(movie_id__in=batch_movie_ids).delete()
+            MovieSimilarity.objects.bulk_create([
+                MovieSimilarity(movie_id=movie_id, similar_movie_id=similar_movie_id, score=score,
+                                date_computed=started)
+                for movie_id, similar_movie_id, score in zip(movie_ids[movies].tolist(), movie_ids[others].tolist(),
+                                                             scores.tolist())
+            ])
+        # The similar movies are shown on each movie's page
+        bump_versions([movie_key(movie_id) for movie_id in batch_movie_ids])
+    return len(columns)
@@ -1,4 +1,16 @@
 from review.tests.create_tests import CreateReviewTestCase
 from review.tests.read_tests import ReadReviewTestCase
 from review.tests.update_tests import UpdateReviewTestCase
-from review.tests.delete_tests import DeleteReviewTestCase
\ No newline at end of file
+from review.tests.delete_tests import DeleteReviewTestCase
+from review.tests.export_tests import ExportTestCase
+from review.tests.ranking_tests import RankingTestCase
+from review.tests.recommendation_tests import RecommendationTestCase
+from review.tests.moderation_tests import ModerationTestCase
+from review.tests.hidden_tests import HiddenReviewTestCase
+from review.tests.vote_tests import VoteTestCase
+from review.tests.statistics_tests import StatisticsTestCase
+from review.tests.fingerprint_tests import FingerprintTestCase
+from review.tests.body_tests import ReviewBodyTestCase
+from review.tests.feed_tests import FeedTestCase
+from review.tests.hot_page_tests import HotPageTestCase
+from review.tests.rate_limit_tests import RateLimitTestCase
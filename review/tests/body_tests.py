@@ -0,0 +1,61 @@
+import json
+
+from django.core.cache import caches
+from django.urls import reverse
+
+from review.models import EXCERPT_LENGTH, LONG_MESSAGE_LENGTH, Review, ReviewBody
+from review.tests.test_utils import BaseTestCase, create_review_for_movie, get_updated_details, set_user_to_admin
+
+LONG_MESSAGE = ' '.join('Sentence number %d of a very long review.' % number for number in range(100))
+
+
+class ReviewBodyTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # The review cards are cached by review id, which other tests reuse
+        caches['local'].clear()
+
+    def create_long_review(self):
+        create_review_for_movie(self.client, get_updated_details(dict(self.VALID_REVIEW), message=LONG_MESSAGE),
+                                self.movie1.id)
+        return Review.objects.get(user=self.user1)
+
+    def test_that_a_long_message_is_stored_compressed_outside_the_review_table(self):
+        review = self.create_long_review()
+        self.assertGreater(len(LONG_MESSAGE), LONG_MESSAGE_LENGTH)
+        self.assertEqual(review.message, '')
+        self.assertLessEqual(len(review.excerpt), EXCERPT_LENGTH)
+        self.assertTrue(LONG_MESSAGE.startswith(review.excerpt[:-1]))
+        self.assertLess(len(ReviewBody.objects.get(review=review).compressed), len(LONG_MESSAGE))
+        self.assertEqual(review.get_message(), LONG_MESSAGE)
+
+    def test_that_a_short_message_is_stored_in_the_review_table(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        review = Review.objects.get(user=self.user1)
+        self.assertEqual(review.message, self.VALID_REVIEW['message'])
+        self.assertEqual(review.excerpt, self.VALID_REVIEW['message'])
+        self.assertFalse(ReviewBody.objects.exists())
+
+    def test_that_the_list_shows_the_excerpt_and_the_detail_page_the_whole_message(self):
+        review = self.create_long_review()
+        response = self.client.get(reverse('review:list', args=[self.movie1.id]))
+        self.assertContains(response, review.excerpt)
+        self.assertNotContains(response, LONG_MESSAGE)
+        response = self.client.get(reverse('review:detail', args=[self.movie1.id, review.id]))
+        self.assertContains(response, LONG_MESSAGE)
+
+    def test_that_shortening_a_long_message_moves_it_back_to_the_review_table(self):
+        review = self.create_long_review()
+        response = self.client.get(reverse('review:update', args=[self.movie1.id, review.id]))
+        self.assertEqual(response.context['form'].initial['message'], LONG_MESSAGE)
+        self.client.post(reverse('review:update', args=[self.movie1.id, review.id]), self.VALID_REVIEW)
+        review = Review.objects.get(id=review.id)
+        self.assertEqual(review.message, self.VALID_REVIEW['message'])
+        self.assertFalse(ReviewBody.objects.exists())
+
+    def test_that_an_export_includes_the_whole_message(self):
+        self.create_long_review()
+        set_user_to_admin(self.user1)
+        response = self.client.get(reverse('export', args=['reviews']), {'format': 'jsonl'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual(rows[0]['message'], LONG_MESSAGE)
@@ -0,0 +1,64 @@
+import gzip
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from review.tests.test_utils import BaseTestCase, create_review_for_movie, set_user_to_admin
+
+
+class ExportTestCase(BaseTestCase):
+
+    def get_export(self, model_name, **params):
+        response = self.client.get(reverse('export', args=[model_name]), params)
+        return response, b''.join(response.streaming_content)
+
+    def test_that_an_admin_can_export_movies_as_csv(self):
+        set_user_to_admin(self.user1)
+        response, content = self.get_export('movies')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = content.decode('utf-8').splitlines()
+        self.assertTrue(lines[0].startswith('id,title'))
+        self.assertEqual(len(lines), 3)  # The header and the two movies
+
+    def test_that_an_admin_can_export_reviews_as_jsonl(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        set_user_to_admin(self.user1)
+        response, content = self.get_export('reviews', format='jsonl')
+        rows = [json.loads(line) for line in content.decode('utf-8').splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], self.VALID_REVIEW['title'])
+        self.assertEqual(rows[0]['movie_id'], self.movie1.id)
+
+    def test_that_a_user_export_does_not_include_private_fields(self):
+        set_user_to_admin(self.user1)
+        response, content = self.get_export('users', format='jsonl')
+        for line in content.decode('utf-8').splitlines():
+            row = json.loads(line)
+            self.assertNotIn('password', row)
+            self.assertNotIn('email', row)
+
+    def test_that_an_export_can_be_compressed(self):
+        set_user_to_admin(self.user1)
+        response, content = self.get_export('movies', gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('movies.csv.gz', response['Content-Disposition'])
+        self.assertIn(b'Second Test Movie', gzip.decompress(content))
+
+    def test_that_a_regular_user_cannot_export_data(self):
+        response = self.client.get(reverse('export', args=['movies']))
+        self.assertEqual(response.status_code, 403)
+
+    def test_that_an_unknown_export_is_not_found(self):
+        set_user_to_admin(self.user1)
+        response = self.client.get(reverse('export', args=['passwords']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_that_the_export_command_writes_the_export_to_a_file(self):
+        output_path = os.path.join(tempfile.mkdtemp(), 'movies.jsonl')
+        call_command('export_data', 'movies', export_format='jsonl', output=output_path, stderr=open(os.devnull, 'w'))
+        with open(output_path) as output:
+            self.assertEqual(len(output.readlines()), 2)
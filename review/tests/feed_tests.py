@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from review.feed import MOVIE_FEED_SIZE, get_feed
+from review.models import Review
+from review.moderation import hide_reviews
+from review.tests.test_utils import BaseTestCase, create_review_for_movie, get_updated_details
+from user.models import User
+
+
+class FeedTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # The feeds are kept in the cache between requests
+        cache.clear()
+
+    def get_feed_titles(self, movie_id=None):
+        return [review['title'] for review in get_feed(movie_id)]
+
+    # Writes a review of the movie as a new user
+    def write_review_as_new_user(self, movie_id, title):
+        user = User.objects.create(username='author_' + title, email=title + '@email.com', password='asdfasdf123123')
+        client = Client()
+        client.force_login(user)
+        create_review_for_movie(client, get_updated_details(dict(self.VALID_REVIEW), title=title), movie_id)
+
+    def test_that_the_recent_reviews_page_lists_the_newest_reviews_of_every_movie(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        create_review_for_movie(self.client, self.SECOND_REVIEW, self.movie2.id)
+        response = self.client.get(reverse('recent_reviews'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([review['title'] for review in response.context['reviews']],
+                         ['second review title', 'review title'])
+        self.assertContains(response, 'Second Test Movie')
+        self.assertContains(response, 'test_user')
+
+    def test_that_new_reviews_are_added_to_a_cached_feed_without_reading_the_database(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        # Reads the feeds into the cache
+        self.assertEqual(self.get_feed_titles(), ['review title'])
+        self.assertEqual(self.get_feed_titles(self.movie1.id), ['review title'])
+        create_review_for_movie(self.client, self.SECOND_REVIEW, self.movie2.id)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_feed_titles(), ['second review title', 'review title'])
+            self.assertEqual(self.get_feed_titles(self.movie1.id), ['review title'])
+        self.assertEqual(len(queries), 0)
+
+    def test_that_the_feed_of_a_movie_only_keeps_its_newest_reviews(self):
+        # Reads the empty feed into the cache, which the reviews are then added to
+        self.assertEqual(self.get_feed_titles(self.movie1.id), [])
+        titles = ['review_%d' % index for index in range(MOVIE_FEED_SIZE + 2)]
+        for title in titles:
+            self.write_review_as_new_user(self.movie1.id, title)
+        expected = list(reversed(titles))[:MOVIE_FEED_SIZE]
+        self.assertEqual(self.get_feed_titles(self.movie1.id), expected)
+        # The feed read from the database when the cache is empty is the same
+        cache.clear()
+        self.assertEqual(self.get_feed_titles(self.movie1.id), expected)
+
+    def test_that_edited_and_hidden_reviews_are_updated_in_the_feeds(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        review = Review.objects.get(user=self.user1, movie=self.movie1)
+        self.assertEqual(self.get_feed_titles(), ['review title'])
+        self.client.post(reverse('review:update', args=[self.movie1.id, review.id]),
+                         get_updated_details(dict(self.VALID_REVIEW), title='edited title'))
+        self.assertEqual(self.get_feed_titles(), ['edited title'])
+        self.assertEqual(self.get_feed_titles(self.movie1.id), ['edited title'])
+        hide_reviews([review.id], 'moderated')
+        self.assertEqual(self.get_feed_titles(), [])
+        self.assertEqual(self.get_feed_titles(self.movie1.id), [])
+
+    def test_that_a_changed_username_is_shown_in_the_feeds(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        self.assertEqual(get_feed()[0]['user__username'], 'test_user')
+        self.user1.username = 'renamed_user'
+        self.user1.save()
+        self.assertEqual(get_feed()[0]['user__username'], 'renamed_user')
+
+    def test_that_a_movie_page_shows_its_latest_reviews(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        response = self.client.get(reverse('detail', args=[self.movie1.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([review['title'] for review in response.context['latest_reviews']], ['review title'])
+        self.assertContains(response, 'Latest reviews')
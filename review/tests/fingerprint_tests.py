@@ -0,0 +1,85 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from review.fingerprints import MIN_MATCHING_BANDS, SPAM_ERROR, get_fingerprint_bands
+from review.models import Review, ReviewFingerprint
+from review.tests.test_utils import BaseTestCase, create_review_for_movie, get_updated_details, \
+    set_user_to_admin
+from user.models import User
+
+SPAM_MESSAGE = ('Click the link in my profile to win a free year of streaming, a brand new phone and a holiday for two '
+                'people, offer ends soon so do not miss out on this chance to win big')
+
+
+class FingerprintTestCase(BaseTestCase):
+    # Writes a review with the given message as a new user, without going through the spam check
+    def add_review(self, movie, message, username):
+        user = User.objects.create(username=username, email=username + '@email.com', password='asdfasdf123123')
+        return Review.objects.create(movie=movie, user=user, title='title', message=message, rating_out_of_five=5)
+
+    # Counts the bands of the fingerprints of the two messages that are the same
+    def count_matching_bands(self, message, other_message):
+        return sum(band == other_band for band, other_band in zip(get_fingerprint_bands(message),
+                                                                  get_fingerprint_bands(other_message)))
+
+    def test_that_similar_messages_share_bands(self):
+        edited_message = SPAM_MESSAGE.upper().replace('PHONE', 'laptop')
+        self.assertGreaterEqual(self.count_matching_bands(SPAM_MESSAGE, edited_message), MIN_MATCHING_BANDS)
+        self.assertEqual(self.count_matching_bands(SPAM_MESSAGE, ' '.join(reversed(SPAM_MESSAGE.split()))), 0)
+        self.assertIsNone(get_fingerprint_bands('Great movie, loved it'))
+
+    def test_that_a_review_nearly_the_same_as_another_is_flagged(self):
+        self.add_review(self.movie1, SPAM_MESSAGE, 'first_poster')
+        call_command('build_review_fingerprints', stdout=StringIO())
+        response = create_review_for_movie(self.client, get_updated_details(
+            self.VALID_REVIEW, message=SPAM_MESSAGE.replace('phone', 'laptop')), self.movie1.id)
+        self.assertEqual(response.status_code, 302)
+        review = Review.objects.get(user=self.user1)
+        self.assertEqual(review.fingerprint.duplicate_of.user.username, 'first_poster')
+        set_user_to_admin(self.user1)
+        response = self.client.get(reverse('moderation'), {'status': 'flagged'})
+        self.assertEqual(list(response.context['reviews']), [review])
+
+    def test_that_posting_the_same_message_on_another_movie_is_refused(self):
+        create_review_for_movie(self.client, get_updated_details(self.VALID_REVIEW, message=SPAM_MESSAGE),
+                                self.movie1.id)
+        response = create_review_for_movie(self.client, get_updated_details(self.VALID_REVIEW, message=SPAM_MESSAGE),
+                                           self.movie2.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context['form'], 'message', SPAM_ERROR)
+        self.assertFalse(Review.objects.filter(movie=self.movie2).exists())
+
+    def test_that_a_message_many_users_already_posted_is_refused(self):
+        for index in range(3):
+            self.add_review(self.movie2, SPAM_MESSAGE, 'spammer_%d' % index)
+        call_command('build_review_fingerprints', stdout=StringIO())
+        response = create_review_for_movie(self.client, get_updated_details(self.VALID_REVIEW, message=SPAM_MESSAGE),
+                                           self.movie1.id)
+        self.assertFormError(response.context['form'], 'message', SPAM_ERROR)
+
+    def test_that_editing_a_review_updates_its_fingerprint(self):
+        create_review_for_movie(self.client, get_updated_details(self.VALID_REVIEW, message=SPAM_MESSAGE),
+                                self.movie1.id)
+        review = Review.objects.get(user=self.user1)
+        response = self.client.post(reverse('review:update', args=[self.movie1.id, review.id]),
+                                    get_updated_details(self.VALID_REVIEW, message='Actually it was fine'))
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(ReviewFingerprint.objects.filter(review=review).exists())
+
+    def test_that_the_backfill_flags_later_copies_only(self):
+        first = self.add_review(self.movie1, SPAM_MESSAGE, 'first_poster')
+        second = self.add_review(self.movie2, SPAM_MESSAGE, 'second_poster')
+        self.add_review(self.movie2, 'review message', 'short_poster')
+        output = StringIO()
+        call_command('build_review_fingerprints', stdout=output)
+        self.assertIn('Fingerprinted 2 reviews', output.getvalue())
+        self.assertIsNone(ReviewFingerprint.objects.get(review=first).duplicate_of)
+        self.assertEqual(ReviewFingerprint.objects.get(review=second).duplicate_of, first)
+
+    def test_that_the_duplicates_of_a_deleted_review_are_found_from_an_index(self):
+        # Deleting a review sets duplicate_of to null on the fingerprints of its duplicates
+        plan = ReviewFingerprint.objects.filter(duplicate_of_id__in=[1, 2]).explain()
+        self.assertIn('INDEX fingerprint_duplicate_of_idx', plan)
+        self.assertNotIn('SCAN review_reviewfingerprint', plan)
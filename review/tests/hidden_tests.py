@@ -0,0 +1,87 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from movie.models import MovieRanking
+from review.models import Review
+from review.tests.test_utils import BaseTestCase, create_review_for_movie, set_user_to_admin
+
+
+class HiddenReviewTestCase(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        self.review = Review.objects.get(movie=self.movie1)
+
+    def delete_review(self):
+        return self.client.post(reverse('review:delete', args=[self.movie1.id, self.review.id]))
+
+    def test_that_deleting_a_review_hides_it_instead_of_deleting_it(self):
+        self.delete_review()
+        self.assertFalse(Review.objects.filter(id=self.review.id).exists())
+        self.assertFalse(self.movie1.review_set.exists())
+        hidden_review = Review.all_objects.get(id=self.review.id)
+        self.assertEqual(hidden_review.hidden_reason, 'deleted')
+        self.assertFalse(MovieRanking.objects.filter(movie=self.movie1).exists())
+
+    def test_that_a_user_can_review_a_movie_again_after_deleting_their_review(self):
+        self.delete_review()
+        response = self.client.get(reverse('review:create', args=[self.movie1.id]))
+        self.assertEqual(response.status_code, 200)
+        create_review_for_movie(self.client, self.SECOND_REVIEW, self.movie1.id)
+        self.assertEqual(Review.all_objects.filter(movie=self.movie1).get().title, self.SECOND_REVIEW['title'])
+
+    def test_that_a_user_cannot_replace_a_review_hidden_by_an_admin(self):
+        self.client.force_login(self.user2)
+        set_user_to_admin(self.user2)
+        self.delete_review()
+        self.client.force_login(self.user1)
+        self.assertEqual(Review.all_objects.get(id=self.review.id).hidden_reason, 'moderated')
+        response = self.client.get(reverse('review:create', args=[self.movie1.id]))
+        self.assertEqual(response.status_code, 403)
+        # The author can still see their hidden review, but not edit it
+        response = self.client.get(reverse('review:detail', args=[self.movie1.id, self.review.id]))
+        self.assertContains(response, 'This review is hidden')
+        response = self.client.get(reverse('review:update', args=[self.movie1.id, self.review.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_that_a_review_hidden_by_an_admin_can_be_shown_again(self):
+        set_user_to_admin(self.user2)
+        self.client.force_login(self.user2)
+        self.delete_review()
+        self.client.post(reverse('moderation'), {'action': 'unhide', 'reviews': [self.review.id]})
+        self.assertTrue(Review.objects.filter(id=self.review.id).exists())
+        self.movie1.refresh_from_db()
+        self.assertEqual(self.movie1.average_rating_out_of_five, self.VALID_REVIEW['rating_out_of_five'])
+        self.assertEqual(MovieRanking.objects.get(movie=self.movie1).review_count, 1)
+
+    def test_that_a_review_deleted_by_its_author_cannot_be_shown_again_by_an_admin(self):
+        self.delete_review()
+        set_user_to_admin(self.user2)
+        self.client.force_login(self.user2)
+        self.client.post(reverse('moderation'), {'action': 'unhide', 'reviews': [self.review.id]})
+        self.assertFalse(Review.objects.filter(id=self.review.id).exists())
+        self.assertEqual(Review.all_objects.get(id=self.review.id).hidden_reason, 'deleted')
+        self.assertFalse(MovieRanking.objects.filter(movie=self.movie1).exists())
+
+    def test_that_a_review_deleted_by_its_author_cannot_be_read_by_an_admin(self):
+        self.delete_review()
+        set_user_to_admin(self.user2)
+        self.client.force_login(self.user2)
+        response = self.client.get(reverse('review:detail', args=[self.movie1.id, self.review.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_that_only_reviews_hidden_for_longer_than_the_retention_period_are_purged(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie2.id)
+        recently_hidden = Review.objects.get(movie=self.movie2)
+        self.delete_review()
+        Review.all_objects.filter(id=self.review.id).update(hidden_at=timezone.now() - timedelta(days=31))
+        self.client.post(reverse('review:delete', args=[self.movie2.id, recently_hidden.id]))
+
+        call_command('purge_hidden_reviews', stdout=StringIO())
+        self.assertFalse(Review.all_objects.filter(id=self.review.id).exists())
+        self.assertTrue(Review.all_objects.filter(id=recently_hidden.id).exists())
@@ -0,0 +1,70 @@
+import gzip
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from review.hot_pages import is_hot, render_hot_pages
+from review.tests.test_utils import BaseTestCase, create_review_for_movie
+
+
+# A movie only needs a couple of visits to become hot in these tests
+@patch('review.hot_pages.HOT_HITS_THRESHOLD', 2)
+class HotPageTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # The visits and rendered pages are kept in the cache
+        cache.clear()
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        self.anonymous_client = Client()
+        self.url = reverse('review:list', args=[self.movie1.id])
+
+    def test_that_a_hot_movies_reviews_are_sent_as_stored_without_reading_the_database(self):
+        first = self.anonymous_client.get(self.url)
+        self.assertFalse(is_hot(self.movie1.id))
+        # The visit that makes the movie hot renders and stores the page
+        self.anonymous_client.get(self.url)
+        self.assertTrue(is_hot(self.movie1.id))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.anonymous_client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), first.content)
+        self.assertEqual(len(queries), 0)
+
+    def test_that_logged_in_users_and_other_orders_are_not_sent_stored_pages(self):
+        for _ in range(3):
+            self.anonymous_client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertTrue(queries)
+        self.assertIn('pre_existing_review', response.context)
+        with CaptureQueriesContext(connection) as queries:
+            self.anonymous_client.get(self.url, {'order': 'helpful'})
+        self.assertTrue(queries)
+
+    @patch('review.hot_pages.run_in_background')
+    def test_that_a_hot_movies_pages_are_rendered_again_in_the_background_when_its_reviews_change(self,
+                                                                                               mock_run_in_background):
+        for _ in range(2):
+            self.anonymous_client.get(self.url)
+        self.client.force_login(self.user2)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_review_for_movie(self.client, self.SECOND_REVIEW, self.movie1.id)
+        mock_run_in_background.assert_called_once_with(render_hot_pages, self.movie1.id)
+        render_hot_pages(self.movie1.id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.anonymous_client.get(self.url)
+        self.assertContains(response, 'second review title')
+        self.assertEqual(len(queries), 0)
+
+    def test_that_the_review_list_benchmark_renders_the_pages_of_a_hot_movie(self):
+        output = StringIO()
+        call_command('benchmark_review_list', movie=self.movie1.id, iterations=3, stdout=output)
+        self.assertFalse(is_hot(self.movie1.id))
+        self.assertEqual(output.getvalue().count('ms per page'), 3)
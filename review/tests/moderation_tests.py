@@ -0,0 +1,99 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from movie.models import MovieRanking
+from review.models import Review
+from review.moderation import MODERATION_PAGE_SIZE
+from review.tests.test_utils import BaseTestCase, create_review_for_movie, set_user_to_admin
+from user.models import User
+
+
+class ModerationTestCase(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # user2 writes the reviews and user1 moderates them
+        self.client.force_login(self.user2)
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        create_review_for_movie(self.client, self.SECOND_REVIEW, self.movie2.id)
+        self.client.force_login(self.user1)
+        set_user_to_admin(self.user1)
+        self.review1 = Review.objects.get(movie=self.movie1)
+        self.review2 = Review.objects.get(movie=self.movie2)
+
+    def moderate(self, action, reviews):
+        return self.client.post(reverse('moderation'), {'action': action, 'reviews': [review.id for review in reviews]})
+
+    def test_that_an_admin_can_see_the_moderation_queue_newest_first(self):
+        response = self.client.get(reverse('moderation'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'review/moderation.html')
+        self.assertEqual(response.context['reviews'], [self.review2, self.review1])
+
+    def test_that_the_moderation_queue_can_be_filtered_by_movie_and_author(self):
+        response = self.client.get(reverse('moderation'), {'movie': self.movie1.id})
+        self.assertEqual(response.context['reviews'], [self.review1])
+        response = self.client.get(reverse('moderation'), {'username': self.user1.username})
+        self.assertEqual(response.context['reviews'], [])
+
+    def test_that_the_moderation_queue_only_reads_what_it_shows(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('moderation'))
+        self.assertEqual(response.context['reviews'], [self.review2, self.review1])
+        self.assertContains(response, '?movie=%d' % self.movie1.id)
+        queue_queries = [query['sql'] for query in queries if 'FROM "review_review"' in query['sql']]
+        self.assertEqual(len(queue_queries), 1)
+        self.assertNotIn('"user_user"."password"', queue_queries[0])
+        self.assertNotIn('"review_review"."message"', queue_queries[0])
+        # No list of every movie is read for the filters
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT "movie_movie"')])
+
+    def test_that_a_regular_user_cannot_see_the_moderation_queue(self):
+        self.client.force_login(self.user2)
+        response = self.client.get(reverse('moderation'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_that_a_regular_user_cannot_moderate_reviews(self):
+        self.client.force_login(self.user2)
+        response = self.moderate('delete', [self.review1])
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(Review.objects.filter(id=self.review1.id).exists())
+
+    def test_that_an_admin_can_delete_many_reviews_at_once(self):
+        response = self.moderate('delete', [self.review1, self.review2])
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Review.objects.exists())
+        self.movie1.refresh_from_db()
+        self.assertIsNone(self.movie1.average_rating_out_of_five)
+        self.assertFalse(MovieRanking.objects.exists())
+
+    def test_that_hidden_reviews_are_not_shown_or_counted_until_shown_again(self):
+        self.moderate('hide', [self.review1])
+        self.review1.refresh_from_db()
+        self.assertIsNotNone(self.review1.hidden_at)
+        self.movie1.refresh_from_db()
+        self.assertIsNone(self.movie1.average_rating_out_of_five)
+        self.client.logout()
+        response = self.client.get(reverse('review:list', args=[self.movie1.id]))
+        self.assertNotContains(response, self.VALID_REVIEW['title'])
+        response = self.client.get(reverse('review:detail', args=[self.movie1.id, self.review1.id]))
+        self.assertEqual(response.status_code, 404)
+
+        self.client.force_login(self.user1)
+        self.moderate('unhide', [self.review1])
+        self.movie1.refresh_from_db()
+        self.assertEqual(self.movie1.average_rating_out_of_five, self.VALID_REVIEW['rating_out_of_five'])
+        self.assertEqual(MovieRanking.objects.get(movie=self.movie1).review_count, 1)
+
+    def test_that_the_moderation_queue_carries_on_from_the_last_review_of_the_previous_page(self):
+        reviews = []
+        for index in range(MODERATION_PAGE_SIZE):
+            user = User.objects.create(username='author_%d' % index, email='%d@email.com' % index,
+                                       password='asdfasdf123123')
+            reviews.append(Review.objects.create(movie=self.movie1, user=user, title='title', message='message',
+                                                 rating_out_of_five=1))
+        first_page = self.client.get(reverse('moderation'))
+        self.assertEqual(len(first_page.context['reviews']), MODERATION_PAGE_SIZE)
+        second_page = self.client.get(reverse('moderation') + '?' + first_page.context['next_query'])
+        self.assertEqual(second_page.context['reviews'], [self.review2, self.review1])
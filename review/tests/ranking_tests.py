@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+
+from movie.models import MovieRanking
+from review.aggregates import refresh_movie_aggregates
+from review.models import Review
+from review.tests.test_utils import BaseTestCase, create_review_for_movie, get_updated_details
+from user.models import User
+
+
+class RankingTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # The average rating of all movies is cached between requests
+        cache.clear()
+
+    # Gives the movie a review from each of the given ratings, each written by a new user
+    def add_reviews(self, movie, ratings):
+        for index, rating in enumerate(ratings):
+            user = User.objects.create(username='reviewer_%d_%d' % (movie.id, index), email='%d_%d@email.com'
+                                       % (movie.id, index), password='asdfasdf123123')
+            Review.objects.create(movie=movie, user=user, title='title', message='message', rating_out_of_five=rating)
+        refresh_movie_aggregates([movie.id])
+
+    def test_that_creating_a_review_adds_the_movie_to_the_leaderboards(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        ranking = MovieRanking.objects.get(movie=self.movie1)
+        self.assertEqual(ranking.review_count, 1)
+        self.assertEqual(ranking.rating_sum, 5)
+        self.assertIsNotNone(ranking.trending_score)
+        response = self.client.get(reverse('leaderboard', args=['top-rated']))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'movie/leaderboard.html')
+        self.assertContains(response, self.movie1.title)
+
+    def test_that_a_single_five_star_review_does_not_outrank_many_good_reviews(self):
+        self.add_reviews(self.movie1, [5])
+        self.add_reviews(self.movie2, [5, 5, 4, 5, 4, 5, 5, 4, 5, 5, 4, 5, 5, 4, 5, 5, 5, 4, 5, 5])
+        response = self.client.get(reverse('leaderboard', args=['top-rated']))
+        self.assertEqual([ranking.movie for ranking in response.context['rankings']], [self.movie2, self.movie1])
+
+    def test_that_the_most_reviewed_leaderboard_is_ordered_by_review_count(self):
+        self.add_reviews(self.movie1, [5])
+        self.add_reviews(self.movie2, [1, 2])
+        response = self.client.get(reverse('leaderboard', args=['most-reviewed']))
+        self.assertEqual([ranking.movie for ranking in response.context['rankings']], [self.movie2, self.movie1])
+
+    def test_that_updating_a_review_rating_updates_the_ranking_without_counting_a_new_review(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        trending_score = MovieRanking.objects.get(movie=self.movie1).trending_score
+        review = Review.objects.get(movie=self.movie1)
+        self.client.post(reverse('review:update', args=[self.movie1.id, review.id]),
+                         get_updated_details(self.VALID_REVIEW, rating_out_of_five=2))
+        ranking = MovieRanking.objects.get(movie=self.movie1)
+        self.assertEqual(ranking.review_count, 1)
+        self.assertEqual(ranking.rating_sum, 2)
+        self.assertEqual(ranking.trending_score, trending_score)
+
+    def test_that_deleting_the_last_review_removes_the_movie_from_the_leaderboards(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        review = Review.objects.get(movie=self.movie1)
+        self.client.post(reverse('review:delete', args=[self.movie1.id, review.id]))
+        self.assertFalse(MovieRanking.objects.filter(movie=self.movie1).exists())
+        response = self.client.get(reverse('leaderboard', args=['trending']))
+        self.assertNotContains(response, self.movie1.title)
+
+    def test_that_the_incremental_ranking_matches_a_full_recalculation(self):
+        self.add_reviews(self.movie1, [3, 4])
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        incremental = MovieRanking.objects.get(movie=self.movie1)
+        call_command('refresh_rankings', stdout=StringIO())
+        refreshed = MovieRanking.objects.get(movie=self.movie1)
+        self.assertEqual(incremental.review_count, refreshed.review_count)
+        self.assertEqual(incremental.rating_sum, refreshed.rating_sum)
+        self.assertAlmostEqual(incremental.trending_score, refreshed.trending_score)
+
+    def test_that_an_unknown_leaderboard_is_not_found(self):
+        response = self.client.get(reverse('leaderboard', args=['worst-rated']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_that_the_benchmark_data_has_leaderboards(self):
+        call_command('seed_benchmark_data', users=5, movies=2, reviews=6, stdout=StringIO())
+        rankings = MovieRanking.objects.filter(movie__title__startswith='Benchmark Movie')
+        self.assertEqual(rankings.count(), 2)
+        self.assertEqual(sum(ranking.review_count for ranking in rankings), 6)
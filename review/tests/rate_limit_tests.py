@@ -0,0 +1,92 @@
+import multiprocessing
+import time
+from unittest import mock, skipIf
+
+from django.test import Client
+from django.urls import reverse
+
+from primeVideoReviewPlatform import rate_limit, shared_cache
+from primeVideoReviewPlatform.rate_limit import RATE_LIMITS
+from review.models import Review
+from review.tests.test_utils import BaseTestCase, create_review_for_movie
+
+USER_BURST, USER_REFILL_SECONDS = RATE_LIMITS['review_write']['user']
+
+
+# Stands in for another worker process taking tokens from the same bucket
+def take_tokens_in_other_process(times, taken):
+    taken.put(sum(rate_limit.take_token('rate_limit:test', 10, 1000) == 0 for _ in range(times)))
+
+
+class RateLimitTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        self.review = Review.objects.get(user=self.user1)
+        self.update_url = reverse('review:update', args=[self.movie1.id, self.review.id])
+
+    # Posts the update form until it is refused, returning the number of updates that were allowed and the refusal
+    def update_until_refused(self, client=None):
+        client = client or self.client
+        for allowed in range(100):
+            response = client.post(self.update_url, self.VALID_REVIEW)
+            if response.status_code == 429:
+                return allowed, response
+        self.fail('The updates were never refused')
+
+    def test_that_a_user_is_refused_with_a_retry_after_header_once_their_bucket_is_empty(self):
+        # Writing the review took the first token. The clock is stopped so that no token is added back meanwhile
+        with mock.patch.object(rate_limit.time, 'time', return_value=time.time()):
+            allowed, response = self.update_until_refused()
+        self.assertEqual(allowed, USER_BURST - 1)
+        self.assertEqual(response['Retry-After'], str(USER_REFILL_SECONDS))
+
+    def test_that_viewing_the_forms_is_not_limited(self):
+        self.update_until_refused()
+        self.assertEqual(self.client.get(self.update_url).status_code, 200)
+        self.assertEqual(self.client.get(reverse('review:create', args=[self.movie2.id])).status_code, 200)
+
+    def test_that_other_users_are_not_limited_by_a_users_bucket(self):
+        self.update_until_refused()
+        client = Client()
+        client.force_login(self.user2)
+        create_review_for_movie(client, self.VALID_REVIEW, self.movie1.id)
+        self.assertTrue(Review.objects.filter(user=self.user2).exists())
+
+    def test_that_a_bucket_is_refilled_over_time(self):
+        now = time.time()
+        with mock.patch.object(rate_limit.time, 'time', return_value=now):
+            self.update_until_refused()
+        with mock.patch.object(rate_limit.time, 'time', return_value=now + USER_REFILL_SECONDS):
+            self.assertEqual(self.client.post(self.update_url, self.VALID_REVIEW).status_code, 302)
+            self.assertEqual(self.client.post(self.update_url, self.VALID_REVIEW).status_code, 429)
+
+    def test_that_requests_refused_for_an_ip_address_do_not_use_up_the_users_allowance(self):
+        with mock.patch.object(rate_limit.time, 'time', return_value=time.time()):
+            with mock.patch.dict(RATE_LIMITS['review_write'], {'ip': (2, 1000)}):
+                statuses = [self.client.post(self.update_url, self.VALID_REVIEW).status_code for _ in range(5)]
+            self.assertEqual(statuses, [302, 302, 429, 429, 429])
+            # From another address, the user can still make the updates left after writing the review and the two
+            # that were allowed
+            allowed = 0
+            while self.client.post(self.update_url, self.VALID_REVIEW, REMOTE_ADDR='10.0.0.2').status_code == 302:
+                allowed += 1
+        self.assertEqual(allowed, USER_BURST - 3)
+
+    def test_that_requests_are_still_limited_when_the_cache_cannot_be_reached(self):
+        unreachable_cache = mock.Mock(lock=mock.Mock(side_effect=OSError))
+        with mock.patch.object(rate_limit, 'cache', unreachable_cache), \
+                mock.patch.dict(rate_limit.local_buckets, clear=True):
+            allowed, response = self.update_until_refused()
+        self.assertEqual(allowed, USER_BURST)
+
+    @skipIf(shared_cache.fcntl is None, 'Files cannot be locked on this platform')
+    def test_that_workers_taking_tokens_at_once_cannot_take_more_than_the_bucket_holds(self):
+        context = multiprocessing.get_context('fork')
+        taken = context.Queue()
+        processes = [context.Process(target=take_tokens_in_other_process, args=(10, taken)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(sum(taken.get(timeout=5) for _ in processes), 10)
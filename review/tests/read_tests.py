@@ -1,9 +1,12 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.urls import reverse
 
 from review.models import Review
 from review.tests.test_utils import BaseTestCase
 
-from review.tests.test_utils import create_review_for_movie
+from review.tests.test_utils import create_review_for_movie, get_updated_details
 
 
 class ReadReviewTestCase(BaseTestCase):
@@ -30,3 +33,45 @@ class ReadReviewTestCase(BaseTestCase):
         self.assertEqual(self.VALID_REVIEW['rating_out_of_five'], review.rating_out_of_five)
         self.assertEqual(review.movie.id, self.movie1.id)
         self.assertEqual(review.user.id, self.user1.id)
+
+    def test_that_the_review_list_shows_the_latest_version_of_an_edited_review(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        # The first request caches the review card
+        response = self.client.get(reverse('review:list', args=[self.movie1.id]))
+        self.assertContains(response, self.VALID_REVIEW['title'])
+        updated_details = get_updated_details(self.VALID_REVIEW, 'edited title', None, None)
+        self.client.post(reverse('review:update', args=[self.movie1.id, 1]), updated_details)
+        response = self.client.get(reverse('review:list', args=[self.movie1.id]))
+        self.assertContains(response, 'edited title')
+
+    def test_that_the_review_list_is_sent_again_after_a_review_is_written(self):
+        response = self.client.get(reverse('review:list', args=[self.movie1.id]))
+        etag = response['ETag']
+        response = self.client.get(reverse('review:list', args=[self.movie1.id]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        response = self.client.get(reverse('review:list', args=[self.movie1.id]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.VALID_REVIEW['title'])
+
+    def test_that_the_review_list_shows_the_newest_reviews_first(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        self.client.force_login(self.user2)
+        create_review_for_movie(self.client, self.SECOND_REVIEW, self.movie1.id)
+        response = self.client.get(reverse('review:list', args=[self.movie1.id]))
+        titles = [review.title for review in response.context['reviews']]
+        self.assertEqual(titles, [self.SECOND_REVIEW['title'], self.VALID_REVIEW['title']])
+
+    def test_that_no_view_scans_the_whole_review_table(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        output = StringIO()
+        call_command('explain_queries', stdout=output)
+        for line in output.getvalue().splitlines():
+            if 'full scan' in line:
+                self.assertNotIn('review_review', line)
+
+    def test_that_a_movies_reviews_are_found_from_an_index_whether_hidden_or_not(self):
+        # Used by the moderation queue, the exports and deleting a movie, which do not leave out hidden reviews
+        plan = Review.all_objects.filter(movie_id=self.movie1.id).explain()
+        self.assertIn('SEARCH review_review USING', plan)
+        self.assertNotIn('SCAN review_review', plan)
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+
+from movie.models import Movie, MovieSimilarity
+from review.models import Review
+from review.recommendations import build_similar_movies
+from review.tests.test_utils import BaseTestCase
+from user.models import User
+
+
+class RecommendationTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.movie3 = Movie.objects.create(
+            id=3,
+            title='Third Test Movie',
+            description='Third Test Description',
+            duration=timedelta(hours=2),
+            date_released=timezone.now().date(),
+        )
+        self.users = [
+            User.objects.create(username='fan_%d' % index, email='fan_%d@email.com' % index,
+                                password='asdfasdf123123')
+            for index in range(3)
+        ]
+
+    def like(self, user, movie, rating=5):
+        return Review.objects.create(movie=movie, user=user, title='title', message='message',
+                                     rating_out_of_five=rating)
+
+    def test_that_movies_liked_by_the_same_users_are_similar(self):
+        for user in self.users:
+            self.like(user, self.movie1)
+            self.like(user, self.movie2)
+        # Only one user likes the third movie as well, which is not enough to count as similar
+        self.like(self.users[0], self.movie3)
+        build_similar_movies()
+        similar = MovieSimilarity.objects.filter(movie=self.movie1)
+        self.assertEqual([similarity.similar_movie for similarity in similar], [self.movie2])
+
+    def test_that_low_ratings_do_not_count_as_likes(self):
+        for user in self.users:
+            self.like(user, self.movie1)
+            self.like(user, self.movie2, rating=2)
+        build_similar_movies()
+        self.assertFalse(MovieSimilarity.objects.exists())
+
+    def test_that_the_movie_page_shows_similar_movies(self):
+        for user in self.users:
+            self.like(user, self.movie1)
+            self.like(user, self.movie2)
+        build_similar_movies()
+        response = self.client.get(reverse('detail', args=[self.movie1.id]))
+        self.assertEqual(response.context['similar_movies'], [self.movie2])
+        self.assertContains(response, 'Users who liked this also liked')
+
+    def test_that_a_refresh_only_updates_movies_affected_by_new_reviews(self):
+        for user in self.users:
+            self.like(user, self.movie1)
+            self.like(user, self.movie2)
+        build_similar_movies()
+        MovieSimilarity.objects.update(date_computed=timezone.now() - timedelta(hours=1))
+
+        for user in self.users[:2]:
+            self.like(user, self.movie3)
+        # Movies 1 and 2 are affected because the new reviews' authors also like them
+        self.assertEqual(build_similar_movies(refresh=True), 3)
+        self.assertTrue(MovieSimilarity.objects.filter(movie=self.movie3, similar_movie=self.movie1).exists())
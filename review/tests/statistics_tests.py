@@ -0,0 +1,92 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from movie.models import MovieRanking, WEEKLY_COUNT_WEEKS
+from review.aggregates import refresh_movie_aggregates
+from review.models import Review
+from review.moderation import hide_reviews, restore_reviews
+from review.tests.test_utils import BaseTestCase, create_review_for_movie, get_updated_details
+from user.models import User
+
+
+class StatisticsTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # The average rating of all movies is cached between requests
+        cache.clear()
+
+    # Gives the movie a review from each of the given ratings, each written by a new user the given number of weeks ago
+    def add_reviews(self, movie, ratings, weeks_ago=0):
+        for index, rating in enumerate(ratings):
+            user = User.objects.create(username='reviewer_%d_%d_%d' % (movie.id, weeks_ago, index),
+                                       email='%d_%d_%d@email.com' % (movie.id, weeks_ago, index),
+                                       password='asdfasdf123123')
+            review = Review.objects.create(movie=movie, user=user, title='title', message='message',
+                                           rating_out_of_five=rating)
+            Review.objects.filter(id=review.id).update(date_posted=timezone.now() - timedelta(weeks=weeks_ago))
+        refresh_movie_aggregates([movie.id])
+
+    def test_that_creating_and_updating_a_review_updates_the_histogram(self):
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        ranking = MovieRanking.objects.get(movie=self.movie1)
+        self.assertEqual(ranking.rating_counts, [0, 0, 0, 0, 1])
+        self.assertEqual(ranking.get_weekly_counts()[-1], 1)
+        review = Review.objects.get(movie=self.movie1)
+        self.client.post(reverse('review:update', args=[self.movie1.id, review.id]),
+                         get_updated_details(self.VALID_REVIEW, rating_out_of_five=2))
+        ranking = MovieRanking.objects.get(movie=self.movie1)
+        self.assertEqual(ranking.rating_counts, [0, 1, 0, 0, 0])
+        self.assertEqual(ranking.get_weekly_counts()[-1], 1)
+
+    def test_that_hiding_and_restoring_a_review_updates_the_statistics(self):
+        self.add_reviews(self.movie1, [1, 4, 4])
+        review = Review.objects.filter(movie=self.movie1, rating_out_of_five=1).get()
+        hide_reviews([review.id], 'moderated')
+        ranking = MovieRanking.objects.get(movie=self.movie1)
+        self.assertEqual(ranking.rating_counts, [0, 0, 0, 2, 0])
+        self.assertEqual(ranking.get_weekly_counts()[-1], 2)
+        restore_reviews([review.id])
+        ranking = MovieRanking.objects.get(movie=self.movie1)
+        self.assertEqual(ranking.rating_counts, [1, 0, 0, 2, 0])
+        self.assertEqual(ranking.get_weekly_counts()[-1], 3)
+
+    def test_that_the_median_rating_is_calculated_from_the_histogram(self):
+        self.add_reviews(self.movie1, [1, 2, 5])
+        self.assertEqual(MovieRanking.objects.get(movie=self.movie1).get_median_rating(), 2)
+        self.add_reviews(self.movie2, [1, 2, 4, 5])
+        self.assertEqual(MovieRanking.objects.get(movie=self.movie2).get_median_rating(), 3)
+
+    def test_that_old_reviews_are_left_out_of_the_weekly_counts(self):
+        self.add_reviews(self.movie1, [5], weeks_ago=2)
+        self.add_reviews(self.movie1, [5], weeks_ago=WEEKLY_COUNT_WEEKS + 5)
+        weekly_counts = MovieRanking.objects.get(movie=self.movie1).get_weekly_counts()
+        self.assertEqual(len(weekly_counts), WEEKLY_COUNT_WEEKS)
+        self.assertEqual(sum(weekly_counts), 1)
+
+    def test_that_the_incremental_statistics_match_a_full_recalculation(self):
+        self.add_reviews(self.movie1, [3, 4], weeks_ago=3)
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        incremental = MovieRanking.objects.get(movie=self.movie1)
+        call_command('refresh_rankings', stdout=StringIO())
+        refreshed = MovieRanking.objects.get(movie=self.movie1)
+        self.assertEqual(incremental.rating_counts, refreshed.rating_counts)
+        self.assertEqual(incremental.get_weekly_counts(), refreshed.get_weekly_counts())
+
+    def test_that_the_movie_page_shows_the_statistics_without_reading_the_reviews(self):
+        self.add_reviews(self.movie1, [2, 4, 4, 5])
+        # The first visit reads the latest reviews shown on the page into the cache, see review/feed.py
+        self.client.get(reverse('detail', args=[self.movie1.id]))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('detail', args=[self.movie1.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['median_rating'], 4)
+        self.assertEqual(response.context['rating_distribution'][1], {'stars': 4, 'count': 2, 'percentage': 50})
+        self.assertContains(response, '<polyline')
+        self.assertFalse([query for query in queries if '"review_review"' in query['sql']])
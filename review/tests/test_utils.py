@@ -1,32 +1,33 @@
+from django.core.cache import cache, caches
 from django.test import TestCase, Client
 from django.urls import reverse
 from user.models import User
 from movie.models import Movie
+from primeVideoReviewPlatform import two_tier_cache
 from datetime import timedelta, datetime
 
 
 # Common class shared between all the review test files
 class BaseTestCase(TestCase):
-    def setUp(self):
-        self.client = Client()
+    # The users and movies are created once for each class rather than once for each test. Each test runs in a
+    # transaction that is rolled back afterwards, and gets its own copy of these objects, so tests can still change them
+    @classmethod
+    def setUpTestData(cls):
         # Create two users
-        self.user1 = User.objects.create(
+        cls.user1 = User.objects.create(
             username='test_user',
             email="JDoe@email.com",
             password='asdfasdf123123'
         )
-        self.user1.save()
-        self.client.force_login(self.user1)
 
-        self.user2 = User.objects.create(
+        cls.user2 = User.objects.create(
             username='second_test_user',
             email="DJoe@email.com",
             password='asdfasdf123123'
         )
-        self.user2.save()
 
         # Create 2 movies
-        self.movie1 = Movie.objects.create(
+        cls.movie1 = Movie.objects.create(
             id=1,
             title='Test Movie',
             description='Test Description',
@@ -35,9 +36,7 @@ class BaseTestCase(TestCase):
             average_rating_out_of_five=None
         )
 
-        self.movie1.save()
-
-        self.movie2 = Movie.objects.create(
+        cls.movie2 = Movie.objects.create(
             id=2,
             title='Second Test Movie',
             description='Second Test Description',
@@ -46,9 +45,16 @@ class BaseTestCase(TestCase):
             average_rating_out_of_five=None
         )
 
-        self.movie2.save()
+    def setUp(self):
+        # The caches are not rolled back with the database. The rate limits are counted in the cache, and every test
+        # client posts from the same address
+        cache.clear()
+        caches['local'].clear()
+        two_tier_cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user1)
 
-        # Constants
+        # Constants, which some tests change
 
         self.VALID_REVIEW = {
             'title': 'review title',
@@ -0,0 +1,99 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from review.models import Review, ReviewVote
+from review.tests.test_utils import BaseTestCase, create_review_for_movie
+from review.votes import VOTE_FLUSH_LOCK_KEY, flush_review_votes, get_helpfulness
+from user.models import User
+
+
+# The votes are normally flushed in a background thread, which is replaced here so that the tests can flush them
+@patch('review.votes.run_in_background')
+class VoteTestCase(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Each process only flushes the votes every so often, which is tracked in the cache
+        cache.clear()
+        # user2 writes the reviews and user1 votes on them
+        self.client.force_login(self.user2)
+        create_review_for_movie(self.client, self.VALID_REVIEW, self.movie1.id)
+        self.client.force_login(self.user1)
+        self.review = Review.objects.get(movie=self.movie1)
+
+    def vote(self, review, helpful):
+        return self.client.post(reverse('review:vote', args=[self.movie1.id, review.id]), {'helpful': helpful})
+
+    def test_that_a_vote_is_only_added_to_the_review_when_the_votes_are_flushed(self, mock_run_in_background):
+        response = self.vote(self.review, '1')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(mock_run_in_background.called)
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.helpful_count, 0)
+
+        self.assertEqual(flush_review_votes(), 1)
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.helpful_count, 1)
+        self.assertGreater(self.review.helpfulness, 0)
+        self.assertFalse(ReviewVote.objects.filter(is_flushed=False).exists())
+
+    def test_that_changing_a_vote_replaces_the_earlier_vote(self, mock_run_in_background):
+        self.vote(self.review, '1')
+        flush_review_votes()
+        self.vote(self.review, '0')
+        flush_review_votes()
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.helpful_count, self.review.unhelpful_count), (0, 1))
+
+    def test_that_a_user_cannot_vote_on_their_own_review(self, mock_run_in_background):
+        self.client.force_login(self.user2)
+        response = self.vote(self.review, '1')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(ReviewVote.objects.exists())
+
+    def test_that_an_unauthenticated_user_cannot_vote(self, mock_run_in_background):
+        self.client.logout()
+        response = self.vote(self.review, '1')
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(ReviewVote.objects.exists())
+
+    def test_that_reviews_can_be_listed_most_helpful_first(self, mock_run_in_background):
+        self.client.force_login(self.user1)
+        create_review_for_movie(self.client, self.SECOND_REVIEW, self.movie1.id)
+        newer_review = Review.objects.get(user=self.user1)
+        for index in range(3):
+            voter = User.objects.create(username='voter_%d' % index, email='%d@email.com' % index,
+                                        password='asdfasdf123123')
+            ReviewVote.objects.create(review=self.review, user=voter, is_helpful=True)
+        flush_review_votes()
+
+        response = self.client.get(reverse('review:list', args=[self.movie1.id]))
+        self.assertEqual(list(response.context['reviews']), [newer_review, self.review])
+        response = self.client.get(reverse('review:list', args=[self.movie1.id]), {'order': 'helpful'})
+        self.assertEqual(list(response.context['reviews']), [self.review, newer_review])
+
+    def test_that_a_vote_cast_while_the_votes_are_being_flushed_is_flushed_too(self, mock_run_in_background):
+        voter = User.objects.create(username='voter', email='voter@email.com', password='asdfasdf123123')
+        self.vote(self.review, '1')
+        self.assertEqual(mock_run_in_background.call_count, 1)
+
+        # The second vote is cast while the first flush waits, when the lock is held and no flush is scheduled for it
+        def vote_while_waiting(seconds):
+            if not ReviewVote.objects.filter(user=voter).exists():
+                self.client.force_login(voter)
+                self.vote(self.review, '1')
+
+        with patch('review.votes.time.sleep', side_effect=vote_while_waiting):
+            mock_run_in_background.call_args[0][0]()
+        self.assertEqual(mock_run_in_background.call_count, 1)
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.helpful_count, 2)
+        self.assertFalse(ReviewVote.objects.filter(is_flushed=False).exists())
+        # Once every vote is flushed, the next vote schedules a flush again
+        self.assertIsNone(cache.get(VOTE_FLUSH_LOCK_KEY))
+
+    def test_that_more_votes_make_a_review_more_certainly_helpful(self, mock_run_in_background):
+        self.assertGreater(get_helpfulness(90, 10), get_helpfulness(1, 0))
+        self.assertEqual(get_helpfulness(0, 0), 0)
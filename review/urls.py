@@ -11,6 +11,7 @@ urlpatterns = [
     path('create/', views.ReviewCreateView.as_view(), name='create'),
     path('<int:review_id>/', views.ReviewDetailView.as_view(), name='detail'),
     path('<int:review_id>/update/', views.ReviewUpdateView.as_view(), name='update'),
-    path('<int:review_id>/delete/', views.ReviewDeleteView.as_view(), name='delete')
+    path('<int:review_id>/delete/', views.ReviewDeleteView.as_view(), name='delete'),
+    path('<int:review_id>/vote/', views.ReviewVoteView.as_view(), name='vote'),
 
 ]
\ No newline at end of file
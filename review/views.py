@@ -3,21 +3,51 @@ import logging
 # This mixin means only authenticated users can access the views that take it in their constructor
 from django.contrib.auth.mixins import LoginRequiredMixin
 
-from django.core.exceptions import PermissionDenied
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import Http404, HttpResponseBadRequest, HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
-from django.db.models import Avg
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from datetime import datetime
 
-from movie.models import Movie
+from movie.models import Movie, get_movie_header
+from user.models import User
+from user.notifications import queue_review_notification
+from primeVideoReviewPlatform.rate_limit import RateLimitMixin
+from primeVideoReviewPlatform.versions import REVIEW_COUNTS, USERNAMES, bump_versions, make_etag, movie_key, user_key
+from .aggregates import record_review_created, record_review_rating_changed
+from .feed import add_to_feeds, forget_feeds, get_feed
+from .fingerprints import check_message, save_fingerprint
+from .hot_pages import get_hot_page_number, get_stored_page, record_hit
+from .forms import ModerationActionForm, ModerationFilterForm
+from .moderation import MODERATION_PAGE_SIZE, get_moderation_queue, hide_reviews, moderate_reviews
 from .models import Review
+from .votes import record_vote
 from django.views import generic
 
 # Get logger to log form errors
 logger = logging.getLogger('logger')
 
 
+# Reviews are shown with their author's username, so these pages change when the movie's reviews change or when a
+# username changes. Changing a review always updates the movie's version, since its average rating is recalculated
+def review_etag(request, *args, **kwargs):
+    return make_etag(request, [movie_key(kwargs['pk']), USERNAMES])
+
+
+# Returns the title and average rating shown at the top of a movie's review pages, which are usually read from memory
+# rather than the database, see get_movie_header()
+def get_movie_header_or_404(movie_id):
+    header = get_movie_header(movie_id)
+    if header is None:
+        raise Http404('No movie matches the given query.')
+    return header
+
+
 # This lists all the reviews for a given movie in the database
+@method_decorator(condition(etag_func=review_etag), name='dispatch')
 class ReviewListView(generic.ListView):
     model = Review
     # Renders the result to the list.html file
@@ -25,30 +55,63 @@ class ReviewListView(generic.ListView):
     context_object_name = 'reviews'
     # Displays 5 reviews per page
     paginate_by = 5
+    # Set when the page is being rendered ahead of time, see review/hot_pages.py
+    render_hot_page = False
+
+    # The first pages of the most visited movies are rendered ahead of time for visitors who are not logged in, and
+    # sent as they were stored
+    def get(self, request, *args, **kwargs):
+        if self.render_hot_page:
+            return super().get(request, *args, **kwargs)
+        movie_id = self.kwargs['pk']
+        page = get_hot_page_number(request) if record_hit(movie_id) else None
+        if page is None:
+            return super().get(request, *args, **kwargs)
+        return get_stored_page(request, movie_id, page, review_etag(request, pk=movie_id),
+                               lambda: self.render_page(request, *args, **kwargs))
+
+    def render_page(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        response.render()
+        return response.content
 
     # This method is used to get additional data
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Here we check if a user has written a review for the movie or not
-        context['movie'] = get_object_or_404(Movie, id=self.kwargs['pk'])
+        context['movie'] = get_movie_header_or_404(self.kwargs['pk'])
+        context['order'] = self.get_ordering_name()
         context['first_review'] = True
         if not self.request.user.is_authenticated:
             return context
-        pre_existing_review = Review.objects.filter(user=self.request.user, movie=context['movie'])
+        # A review hidden by an admin still counts, but one the user deleted themselves does not
+        pre_existing_review = Review.all_objects.filter(user=self.request.user, movie_id=self.kwargs['pk']) \
+            .exclude(hidden_reason='deleted').first()
         # If they have, then we pass their review into the template so that we can add a hyperlink to it.
         # This is because if a user has written a review, they are not shown the form to create a review, but a user
         # may have forgotten that they wrote a review, so they could be confused. This is to remind and show them theirs
-        if pre_existing_review.exists():
+        if pre_existing_review is not None:
             context['first_review'] = False
-            context['pre_existing_review'] = pre_existing_review.get()
+            context['pre_existing_review'] = pre_existing_review
         return context
 
     # Filter the reviews for the specific movie (as opposed to getting all reviews that exist in the database)
+    # The authors are fetched in the same query because each review card shows its author's username.
+    # The newest reviews are shown first, which is the order of the review_movie_posted_idx index read backwards, or the
+    # most helpful first, which is the order of review_movie_helpful_idx read backwards.
+    # Only the excerpt of each message is shown, so the messages themselves are not read
     def get_queryset(self):
-        return Review.objects.filter(movie_id=self.kwargs['pk'])
+        reviews = Review.objects.filter(movie_id=self.kwargs['pk']).select_related('user').defer('message')
+        if self.get_ordering_name() == 'helpful':
+            return reviews.order_by('-helpfulness', '-date_posted', '-id')
+        return reviews.order_by('-date_posted', '-id')
+
+    def get_ordering_name(self):
+        return 'helpful' if self.request.GET.get('order') == 'helpful' else 'newest'
 
 
 # Displays an individual review with more information
+@method_decorator(condition(etag_func=review_etag), name='dispatch')
 class ReviewDetailView(generic.DetailView):
     model = Review
     # Renders the result to the detail.html file
@@ -58,25 +121,33 @@ class ReviewDetailView(generic.DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # We pass in the movie so that we can show both the review and the movie the review was written for
-        context['movie'] = get_object_or_404(Movie, pk=self.kwargs['pk'])
+        context['movie'] = get_movie_header_or_404(self.kwargs['pk'])
         return context
 
-    # Get the specific review
+    # Get the specific review. Reviews hidden by an admin can only be seen by their author and admins, and reviews
+    # deleted by their author cannot be seen by anyone
     def get_object(self, queryset=None):
-        review = Review.objects.filter(id=self.kwargs['review_id']).get()
+        review = get_object_or_404(Review.all_objects.exclude(hidden_reason='deleted'), id=self.kwargs['review_id'])
+        if review.hidden_at is not None and self.request.user != review.user and not \
+                getattr(self.request.user, 'is_admin', False):
+            raise Http404('This review has been hidden')
         return review
 
 
-# Handles the creation of new reviews
-class ReviewCreateView(LoginRequiredMixin, generic.CreateView):
+# Handles the creation of new reviews. Every write updates the movie's scores, so users and IP addresses can only write
+# so many reviews in a row
+class ReviewCreateView(RateLimitMixin, LoginRequiredMixin, generic.CreateView):
     model = Review
+    rate_limit = 'review_write'
     # These are the required form fields when creating a review
     fields = ['title', 'message', 'rating_out_of_five']
 
-    # This checks whether a user has already written a review, and, if so, prevents them from writing another
+    # This checks whether a user has already written a review, and, if so, prevents them from writing another.
+    # A review hidden by an admin counts, so that it cannot be replaced, but one the user deleted themselves does not
     def get(self, request, *args, **kwargs):
-        movie = get_object_or_404(Movie, id=self.kwargs['pk'])
-        review_already_exists = Review.objects.filter(user=self.request.user, movie=movie).exists()
+        get_movie_header_or_404(self.kwargs['pk'])
+        review_already_exists = Review.all_objects.filter(user=self.request.user, movie_id=self.kwargs['pk']) \
+            .exclude(hidden_reason='deleted').exists()
         if review_already_exists:
             raise PermissionDenied('You have already written a review for this movie')
         return super().get(request, *args, **kwargs)
@@ -84,7 +155,7 @@ class ReviewCreateView(LoginRequiredMixin, generic.CreateView):
     # This method is used to get additional data
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['movie'] = get_object_or_404(Movie, pk=self.kwargs['pk'])
+        context['movie'] = get_movie_header_or_404(self.kwargs['pk'])
         context['action'] = 'Create'
         return context
 
@@ -96,10 +167,26 @@ class ReviewCreateView(LoginRequiredMixin, generic.CreateView):
     def form_valid(self, form):
         form.instance.user = self.request.user
         form.instance.movie = get_object_or_404(Movie, id=self.kwargs['pk'])
+        # Messages nearly the same as ones already posted are refused if they look like spam, and otherwise flagged
+        try:
+            bands, duplicates = check_message(form.cleaned_data['message'], form.instance.user.id,
+                                                form.instance.movie.id)
+        except ValidationError as error:
+            form.add_error('message', error)
+            return self.form_invalid(form)
+        # A user can only have one review per movie, so a review they deleted earlier is deleted for good first
+        Review.all_objects.filter(user=form.instance.user, movie=form.instance.movie, hidden_reason='deleted').delete()
         form.save()
         response = super().form_valid(form)
-        # Updating the movie's average rating upon review creation
-        update_average_rating_for_movie(form.instance.movie)
+        save_fingerprint(form.instance, bands, duplicates)
+        # Updating the movie's average rating and leaderboard scores upon review creation
+        record_review_created(form.instance)
+        # The new review goes to the front of the feeds of recent reviews
+        add_to_feeds(form.instance)
+        # Users watching the movie are told about the review in their next digest
+        queue_review_notification(form.instance)
+        # The author's profile lists their recent reviews, and the user list counts them
+        bump_versions([REVIEW_COUNTS, user_key(form.instance.user_id)])
         return response
 
     # If the form is invalid, we log the form errors
@@ -111,8 +198,9 @@ class ReviewCreateView(LoginRequiredMixin, generic.CreateView):
 
 # Handles the editing/updating of existing reviews
 # It is handled in a very similar way to the creation of reviews
-class ReviewUpdateView(LoginRequiredMixin, generic.UpdateView):
+class ReviewUpdateView(RateLimitMixin, LoginRequiredMixin, generic.UpdateView):
     model = Review
+    rate_limit = 'review_write'
     fields = ['title', 'message', 'rating_out_of_five']
 
     def get_success_url(self):
@@ -120,26 +208,46 @@ class ReviewUpdateView(LoginRequiredMixin, generic.UpdateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['movie'] = get_object_or_404(Movie, pk=self.kwargs['pk'])
+        context['movie'] = get_movie_header_or_404(self.kwargs['pk'])
 
         # Since the same form is used for creating and updating, this action defines what to display in the HTML
         context['action'] = 'Update'
         return context
 
+    # Hidden reviews cannot be edited
     def get_object(self, queryset=None):
-        review = Review.objects.filter(id=self.kwargs['review_id']).get()
+        review = get_object_or_404(Review, id=self.kwargs['review_id'])
         # Enforce the restriction that only an author can edit a review
         if self.request.user != review.user:
             raise PermissionDenied('You cannot update this review because you did not write it!')
+        # The rating before the edit is needed to update the movie's totals afterwards
+        self.old_rating = review.rating_out_of_five
+        # The form is filled in with the whole message, even if it is stored separately
+        review.message = review.get_message()
         return review
 
     def form_valid(self, form):
+        # An edited message is checked for spam the same way as a new one
+        message_changed = 'message' in form.changed_data
+        if message_changed:
+            try:
+                bands, duplicates = check_message(form.cleaned_data['message'], form.instance.user_id,
+                                                    form.instance.movie_id)
+            except ValidationError as error:
+                form.add_error('message', error)
+                return self.form_invalid(form)
         # If the form is valid, we update the date_last_edited to when the request is processed
         form.instance.date_last_edited = datetime.now()
         form.save()
         response = super().form_valid(form)
-        # Updating the movie's average rating upon review creation
-        update_average_rating_for_movie(form.instance.movie)
+        if message_changed:
+            save_fingerprint(form.instance, bands, duplicates)
+        # Updating the movie's average rating and leaderboard scores upon review update
+        record_review_rating_changed(form.instance, self.old_rating)
+        # The feeds of recent reviews show the review's title, excerpt and rating
+        forget_feeds([form.instance.movie_id])
+        # The author's profile lists their recent reviews
+        bump_versions([user_key(form.instance.user_id)])
         return response
 
     # If the form is invalid, we log the form errors
@@ -150,8 +258,9 @@ class ReviewUpdateView(LoginRequiredMixin, generic.UpdateView):
 
 
 # Handles the deleting of existing reviews
-class ReviewDeleteView(LoginRequiredMixin, generic.DeleteView):
+class ReviewDeleteView(RateLimitMixin, LoginRequiredMixin, generic.DeleteView):
     model = Review
+    rate_limit = 'review_write'
 
     # If the movie has any reviews left after the user deletes theirs, then we show the user the rest of the reviews
     # But if it has no reviews left (i.e. the user deleted the last review for the movie), then we should the movie
@@ -166,22 +275,130 @@ class ReviewDeleteView(LoginRequiredMixin, generic.DeleteView):
 
     # Here we enforce the restriction that only authors and admins can delete a review
     def get_object(self, queryset=None):
-        review = Review.objects.filter(id=self.kwargs['review_id']).get()
+        review = get_object_or_404(Review, id=self.kwargs['review_id'])
         if self.request.user != review.user and not self.request.user.is_admin:
             raise PermissionDenied('You cannot delete this review since you neither wrote it nor are you an admin')
         return review
 
-    # Updating the movie's average rating upon review deletion
+    # The review is hidden rather than deleted, so that it can be brought back (e.g. if an admin deleted it by mistake)
+    # until it is purged. Hiding it also updates the movie's average rating and leaderboard scores
     def form_valid(self, form):
-        response = super().form_valid(form)
-        movie = get_object_or_404(Movie, pk=self.kwargs['pk'])
-        update_average_rating_for_movie(movie)
+        success_url = self.get_success_url()
+        reason = 'deleted' if self.request.user == self.object.user else 'moderated'
+        hide_reviews([self.object.id], reason)
+        return HttpResponseRedirect(success_url)
+
+
+# Records whether a user found a review helpful. Users cannot vote on their own reviews
+class ReviewVoteView(LoginRequiredMixin, generic.View):
+
+    def post(self, request, *args, **kwargs):
+        review = get_object_or_404(Review, id=self.kwargs['review_id'], movie_id=self.kwargs['pk'])
+        if review.user_id == request.user.id:
+            raise PermissionDenied('You cannot vote on your own review')
+        if request.POST.get('helpful') not in ('1', '0'):
+            return HttpResponseBadRequest('The vote must be helpful (1) or unhelpful (0)')
+        record_vote(review, request.user, request.POST['helpful'] == '1')
+        # Goes back to the page the vote was made on, which is only allowed to be a page of this site
+        next_url = request.POST.get('next')
+        if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+            next_url = reverse_lazy('review:list', kwargs={'pk': self.kwargs['pk']})
+        return HttpResponseRedirect(next_url)
+
+
+# Shows the newest reviews of every movie. They are read from the feed kept in the cache, so showing this page does not
+# read the review table at all unless the cache has been emptied
+class RecentReviewsView(generic.TemplateView):
+    template_name = 'review/recent.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['reviews'] = get_feed()
+        return context
+
+
+# Streams a full table as a csv or jsonl file. Only admins can export data
+class ExportView(LoginRequiredMixin, generic.View):
+
+    def get(self, request, *args, **kwargs):
+        # Exports are rarely used, so the export code is only imported when it is needed rather than when each worker
+        # starts up
+        from .exports import EXPORTABLE_MODELS, EXPORT_FORMATS, get_export_rows, stream_export, get_export_filename
+
+        if not request.user.is_admin:
+            raise PermissionDenied('Only admins can export data')
+        model_name = self.kwargs['model_name']
+        if model_name not in EXPORTABLE_MODELS:
+            raise Http404('There is no export called ' + model_name)
+
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            export_format = 'csv'
+        compress = request.GET.get('gzip') == '1'
+
+        fields, rows = get_export_rows(model_name)
+        # The rows are read, encoded and sent in chunks while the response is being written, so the whole table is
+        # never held in memory
+        response = StreamingHttpResponse(stream_export(fields, rows, export_format, compress))
+        if compress:
+            response['Content-Type'] = 'application/gzip'
+        elif export_format == 'jsonl':
+            response['Content-Type'] = 'application/x-ndjson'
+        else:
+            response['Content-Type'] = 'text/csv'
+        response['Content-Disposition'] = ('attachment; filename="'
+                                           + get_export_filename(model_name, export_format, compress) + '"')
         return response
 
 
-# Helper method to reduce repetition
-def update_average_rating_for_movie(movie):
-    updated_average_rating = Review.objects.filter(movie=movie).aggregate(
-        Avg('rating_out_of_five'))['rating_out_of_five__avg']
-    movie.average_rating_out_of_five = updated_average_rating
-    movie.save()
+# Lists the most recent reviews of every movie so that admins can hide or delete many of them at once. The queue can be
+# filtered by movie, author, rating and whether the reviews are hidden. Only admins can moderate reviews
+class ModerationView(LoginRequiredMixin, generic.FormView):
+    template_name = 'review/moderation.html'
+    form_class = ModerationActionForm
+
+    def dispatch(self, request, *args, **kwargs):
+        # Users who are not logged in are sent to the login page by LoginRequiredMixin instead
+        if request.user.is_authenticated and not request.user.is_admin:
+            raise PermissionDenied('Only admins can moderate reviews')
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        filters = ModerationFilterForm(self.request.GET)
+        reviews = []
+        if filters.is_valid():
+            data = filters.cleaned_data
+            user = None
+            if data['username']:
+                user = User.objects.filter(username=data['username']).first()
+            after = None
+            if data['after']:
+                after = Review.all_objects.filter(id=data['after']).first()
+            # An unknown username matches no reviews rather than every review
+            if user is not None or not data['username']:
+                reviews = list(get_moderation_queue(data['movie'], user, data['max_rating'],
+                                                    data['status'] or 'visible', after))
+        context['filters'] = filters
+        context['reviews'] = reviews
+        # A full page means there may be more reviews, which the next page starts after
+        if len(reviews) == MODERATION_PAGE_SIZE:
+            next_query = self.request.GET.copy()
+            next_query['after'] = reviews[-1].id
+            context['next_query'] = next_query.urlencode()
+        return context
+
+    def form_valid(self, form):
+        moderate_reviews([review.id for review in form.cleaned_data['reviews']], form.cleaned_data['action'],
+                         self.request.user)
+        return super().form_valid(form)
+
+    # Goes back to the same page of the queue with the same filters
+    def get_success_url(self):
+        return self.request.get_full_path()
+
+    # If the form is invalid (e.g. no reviews were selected), we log the form errors
+    def form_invalid(self, form):
+        logger.warning('Moderation by admin ' + self.request.user.username + ' failed. Form errors: '
+                       + str(form.errors))
+        return super().form_invalid(form)
@@ -0,0 +1,131 @@
+import math
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from primeVideoReviewPlatform.background import run_in_background
+from primeVideoReviewPlatform.versions import bump_versions, movie_key
+from .hot_pages import schedule_hot_page_refresh
+from .models import Review, ReviewVote
+
+# Votes are added to the reviews' counts at most this often while people are voting
+VOTE_FLUSH_INTERVAL_SECONDS = 30
+VOTE_FLUSH_LOCK_KEY = 'votes:flush'
+# The flush lock expires on its own after this long, in case the process holding it is stopped
+VOTE_FLUSH_LOCK_SECONDS = VOTE_FLUSH_INTERVAL_SECONDS * 4
+
+# Number of reviews whose counts are updated per transaction
+VOTE_FLUSH_BATCH_SIZE = 500
+
+# The z-score for 95% confidence, used by the helpfulness score
+HELPFULNESS_CONFIDENCE = 1.96
+
+
+# The lower bound of the Wilson score interval of the share of votes that were helpful. A review with 1 helpful vote
+# out of 1 is scored lower than one with 90 out of 100, since it is much less certain that most people find it helpful.
+# See: https://www.evanmiller.org/how-not-to-sort-by-average-rating.html
+def get_helpfulness(helpful_count, unhelpful_count):
+    vote_count = helpful_count + unhelpful_count
+    if vote_count == 0:
+        return 0
+    z = HELPFULNESS_CONFIDENCE
+    share = helpful_count / vote_count
+    return ((share + z * z / (2 * vote_count) - z * math.sqrt((share * (1 - share) + z * z / (4 * vote_count))
+                                                              / vote_count)) / (1 + z * z / vote_count))
+
+
+# Saves a user's vote, replacing their earlier vote on the review if there is one. This is a single insert into the vote
+# table, the review itself is not touched until the votes are flushed
+def record_vote(review, user, is_helpful):
+    ReviewVote.objects.bulk_create(
+        [ReviewVote(review=review, user=user, is_helpful=is_helpful)],
+        update_conflicts=True, unique_fields=['review', 'user'], update_fields=['is_helpful', 'is_flushed', 'date_voted']
+    )
+    schedule_vote_flush()
+
+
+# Flushes the votes in the background, unless a worker is already doing so, in which case it picks up this vote too
+def schedule_vote_flush():
+    if cache.add(VOTE_FLUSH_LOCK_KEY, True, VOTE_FLUSH_LOCK_SECONDS):
+        run_in_background(flush_review_votes_while_voting)
+
+
+# Flushes the votes, then flushes again every VOTE_FLUSH_INTERVAL_SECONDS for as long as votes keep arriving. The lock is
+# only given up once there are no unflushed votes left, and a vote saved after that finds the lock free and schedules
+# the next flush itself, so the last votes of a burst are never left waiting for another vote
+def flush_review_votes_while_voting():
+    while True:
+        flush_review_votes()
+        time.sleep(VOTE_FLUSH_INTERVAL_SECONDS)
+        cache.delete(VOTE_FLUSH_LOCK_KEY)
+        if not ReviewVote.objects.filter(is_flushed=False).exists():
+            return
+        # Another worker may have been sent a vote since the lock was given up, and is then flushing it
+        if not cache.add(VOTE_FLUSH_LOCK_KEY, True, VOTE_FLUSH_LOCK_SECONDS):
+            return
+
+
+# Recounts the votes of every review that has unflushed votes and saves the counts to the review. Recounting rather than
+# adding the new votes means a vote is never counted twice, even if two flushes run at once. Returns the number of
+# reviews updated
+def flush_review_votes(batch_size=VOTE_FLUSH_BATCH_SIZE):
+    updated = 0
+    while True:
+        with transaction.atomic():
+            review_ids = list(ReviewVote.objects.filter(is_flushed=False).order_by()
+                              .values_list('review_id', flat=True).distinct()[:batch_size])
+            if not review_ids:
+                break
+            # Marked first, so that a vote arriving while this runs is left unflushed for the next flush
+            ReviewVote.objects.filter(review_id__in=review_ids, is_flushed=False).update(is_flushed=True)
+            reviews = recount_votes(review_ids)
+        show_recounted_votes(reviews)
+        updated += len(reviews)
+    return updated
+
+
+# Deletes a user's votes, recounting the reviews they voted on in the same transaction, so the reviews' counts never
+# include votes that no longer exist. Used when the user's account is deleted, since the votes would otherwise be
+# deleted along with the user without the reviews being recounted. Returns the number of votes deleted
+def delete_user_votes(user_id, batch_size=VOTE_FLUSH_BATCH_SIZE):
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            review_ids = list(ReviewVote.objects.filter(user_id=user_id).order_by('review_id')
+                              .values_list('review_id', flat=True)[:batch_size])
+            if not review_ids:
+                break
+            ReviewVote.objects.filter(user_id=user_id, review_id__in=review_ids).delete()
+            reviews = recount_votes(review_ids)
+        show_recounted_votes(reviews)
+        deleted += len(review_ids)
+    return deleted
+
+
+# Saves the vote counts of the given reviews, counted from their votes. Must be run in a transaction. Returns the
+# reviews, with only their ids and movies read
+def recount_votes(review_ids):
+    counts = {
+        row['review_id']: row for row in ReviewVote.objects.filter(review_id__in=review_ids)
+        .values('review_id').annotate(helpful=Count('id', filter=Q(is_helpful=True)),
+                                      unhelpful=Count('id', filter=Q(is_helpful=False)))
+    }
+    # Hidden reviews keep their counts, in case they are shown again
+    reviews = list(Review.all_objects.filter(id__in=review_ids).only('id', 'movie_id'))
+    for review in reviews:
+        row = counts.get(review.id, {'helpful': 0, 'unhelpful': 0})
+        review.helpful_count = row['helpful']
+        review.unhelpful_count = row['unhelpful']
+        review.helpfulness = get_helpfulness(review.helpful_count, review.unhelpful_count)
+    Review.all_objects.bulk_update(reviews, ['helpful_count', 'unhelpful_count', 'helpfulness'])
+    return reviews
+
+
+# The counts are shown on the movies' review lists, which are rendered again once the counts have been saved
+def show_recounted_votes(reviews):
+    movie_ids = {review.movie_id for review in reviews}
+    bump_versions([movie_key(movie_id) for movie_id in movie_ids])
+    for movie_id in movie_ids:
+        schedule_hot_page_refresh(movie_id)
@@ -0,0 +1,35 @@
+// Suggests movie titles while a title is typed into the search box in the navigation bar, and opens the movie's page
+// when one of the suggestions is picked
+(function () {
+    var input = document.getElementById('movie-search');
+    if (!input) {
+        return;
+    }
+    var list = document.getElementById(input.getAttribute('list'));
+    var urls = {};
+    var latest = 0;
+
+    input.addEventListener('input', function () {
+        if (urls[input.value]) {
+            window.location = urls[input.value];
+            return;
+        }
+        // Answers can arrive out of order, so only the answer to the latest search is shown
+        var search = ++latest;
+        fetch(input.dataset.url + '?q=' + encodeURIComponent(input.value))
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                if (search !== latest) {
+                    return;
+                }
+                list.innerHTML = '';
+                urls = {};
+                data.results.forEach(function (movie) {
+                    var option = document.createElement('option');
+                    option.value = movie.title;
+                    list.appendChild(option);
+                    urls[movie.title] = movie.url;
+                });
+            });
+    });
+})();
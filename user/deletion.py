@@ -0,0 +1,72 @@
+import logging
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from review.aggregates import refresh_movie_aggregates
+from review.models import Review
+from review.votes import delete_user_votes
+from .models import AccountDeletion, User
+
+# Get logger to log the progress of account deletions
+logger = logging.getLogger('logger')
+
+# Number of reviews deleted per transaction. SQLite locks the whole database while writing, so keeping each
+# transaction small means other requests only ever wait for one short batch rather than the whole deletion
+DELETION_BATCH_SIZE = 500
+
+# Time to wait between batches so that requests waiting to write get a chance to do so
+DELETION_PAUSE_SECONDS = 0.05
+
+
+# Starts deleting an account by deactivating it, which stops the user from logging in while their reviews are removed
+def start_account_deletion(user):
+    with transaction.atomic():
+        deletion = AccountDeletion.objects.create(
+            user_id=user.id,
+            username=user.username,
+            review_count=Review.all_objects.filter(user_id=user.id).count()
+        )
+        User.objects.filter(id=user.id).update(is_active=False)
+    logger.info('Account deletion for user ' + user.username + ' started, ' + str(deletion.review_count)
+                + ' reviews to delete')
+    return deletion
+
+
+# Deletes the reviews of the account in batches, updates the average rating of every affected movie once and then
+# deletes the user. This can be run again on an unfinished deletion to carry on from where it stopped
+def run_account_deletion(deletion_id, batch_size=DELETION_BATCH_SIZE, pause_seconds=DELETION_PAUSE_SECONDS):
+    deletion = AccountDeletion.objects.get(id=deletion_id)
+    if deletion.is_finished:
+        return deletion
+    affected_movie_ids = set(deletion.affected_movie_ids)
+
+    while True:
+        with transaction.atomic():
+            batch = list(Review.all_objects.filter(user_id=deletion.user_id).order_by('id')
+                         .values_list('id', 'movie_id')[:batch_size])
+            if not batch:
+                break
+            Review.all_objects.filter(id__in=[review_id for review_id, movie_id in batch]).delete()
+            # The progress is saved in the same transaction as the delete, so it is always accurate
+            affected_movie_ids.update(movie_id for review_id, movie_id in batch)
+            deletion.reviews_deleted += len(batch)
+            deletion.affected_movie_ids = sorted(affected_movie_ids)
+            deletion.save(update_fields=['reviews_deleted', 'affected_movie_ids'])
+        logger.info('Account deletion for user ' + deletion.username + ': deleted ' + str(deletion.reviews_deleted)
+                    + ' of ' + str(deletion.review_count) + ' reviews')
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    refresh_movie_aggregates(affected_movie_ids)
+    # Deleting the user would delete their votes too, without taking them off the counts of the reviews they voted on
+    delete_user_votes(deletion.user_id, batch_size)
+
+    with transaction.atomic():
+        # The reviews have already been deleted, so this does not have to collect anything
+        User.objects.filter(id=deletion.user_id).delete()
+        deletion.date_finished = timezone.now()
+        deletion.save(update_fields=['date_finished'])
+    logger.info('Account deletion for user ' + deletion.username + ' finished')
+    return deletion
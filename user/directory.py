@@ -0,0 +1,76 @@
+import string
+import sys
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import Lower
+
+from primeVideoReviewPlatform.versions import get_versions, user_key
+from review.models import Review
+from .models import User
+
+# Number of users shown on each page of the user directory
+USER_DIRECTORY_PAGE_SIZE = 25
+
+# Review counts are kept for this long, or until the user's version changes
+REVIEW_COUNT_CACHE_SECONDS = 60 * 60
+
+# SQLite's LOWER() only changes the letters A to Z, so searches are lowercased the same way to match it
+ASCII_LOWERCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def fold_case(text):
+    return text.translate(ASCII_LOWERCASE)
+
+
+# Returns the first string after every string that starts with the prefix, e.g. 'ac' for 'ab', or None if there is no
+# such string, which is the case when the prefix is made up of only the last character there is
+def get_prefix_end(prefix):
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    next_code = ord(prefix[-1]) + 1
+    # Surrogates cannot be written as UTF-8, and no username has them, so they are skipped
+    if 0xD800 <= next_code <= 0xDFFF:
+        next_code = 0xE000
+    return prefix[:-1] + chr(next_code)
+
+
+# Returns the users whose username starts with the given prefix, ignoring case, in alphabetical order of their
+# usernames. This is the order of the user_username_lower_idx index, and a prefix is a range of it (e.g. 'ab' is
+# everything from 'ab' up to but not including 'ac'), so only the rows shown are read however many users there are.
+# Instead of page numbers, each page carries on from the last user of the previous page, like the moderation queue.
+# Only the columns shown are read
+def get_user_directory(prefix='', after=None):
+    users = User.objects.annotate(username_lower=Lower('username'))
+    prefix = fold_case(prefix)
+    if prefix:
+        users = users.filter(username_lower__gte=prefix)
+        prefix_end = get_prefix_end(prefix)
+        if prefix_end is not None:
+            users = users.filter(username_lower__lt=prefix_end)
+    if after is not None:
+        after_lower = fold_case(after.username)
+        # The first condition on its own is a range of the index, which the second only narrows down
+        users = users.filter(Q(username_lower__gt=after_lower) | Q(id__gt=after.id), username_lower__gte=after_lower)
+    users = users.order_by('username_lower', 'id').values('id', 'username')
+    return users[:USER_DIRECTORY_PAGE_SIZE]
+
+
+# Returns the number of visible reviews written by each of the given users. Counts are kept in the cache under the
+# user's version, which changes whenever one of their reviews is written, hidden, shown again or deleted, so only the
+# users whose reviews changed are counted again, all with one query
+def get_review_counts(user_ids):
+    keys = {'review_count:%d:%d' % (user_id, version): user_id
+            for user_id, version in zip(user_ids, get_versions([user_key(user_id) for user_id in user_ids]))}
+    cached = cache.get_many(keys)
+    counts = {keys[key]: count for key, count in cached.items()}
+    missing = [user_id for key, user_id in keys.items() if key not in cached]
+    if missing:
+        # Read from the review_user_posted_idx index
+        counted = dict(Review.objects.filter(user_id__in=missing).order_by().values('user_id')
+                       .annotate(count=Count('id')).values_list('user_id', 'count'))
+        counts.update({user_id: counted.get(user_id, 0) for user_id in missing})
+        cache.set_many({key: counts[user_id] for key, user_id in keys.items() if key not in cached},
+                       REVIEW_COUNT_CACHE_SECONDS)
+    return counts
@@ -9,4 +9,11 @@ class UserRegistrationForm(UserCreationForm):
     class Meta:
         model = User
         # Defines the fields in the registration form
-        fields = ['username', 'email', 'first_name', 'last_name', 'password1', 'password2']
\ No newline at end of file
+        fields = ['username', 'email', 'first_name', 'last_name', 'password1', 'password2']
+
+
+# The search of the user directory, which is sent in the query string
+class UserSearchForm(forms.Form):
+    username = forms.CharField(max_length=150, required=False, label='Username starts with')
+    # The id of the last user on the previous page
+    after = forms.IntegerField(required=False, widget=forms.HiddenInput)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from user.deletion import run_account_deletion
+from user.models import AccountDeletion
+
+
+# Finishes any account deletions that were stopped part way through, e.g. because the server restarted while they
+# were running in the background
+class Command(BaseCommand):
+    help = 'Finishes any unfinished account deletions'
+
+    def handle(self, *args, **options):
+        unfinished = AccountDeletion.objects.filter(date_finished__isnull=True).order_by('id')
+        for deletion_id in unfinished.values_list('id', flat=True):
+            deletion = run_account_deletion(deletion_id)
+            self.stdout.write('Deleted account ' + deletion.username + ' and ' + str(deletion.reviews_deleted)
+                              + ' reviews')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from user.models import DIGEST_FREQUENCIES
+from user.notifications import fan_out_notifications, send_digests
+
+
+# Emails the digests of new reviews of the movies on users' watchlists. Run this from cron every hour with
+# --frequency hourly and every day with --frequency daily. Any new reviews that have not been turned into notifications
+# yet (e.g. because the server restarted) are handled first
+class Command(BaseCommand):
+    help = 'Sends the digests of new reviews of watched movies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--frequency', required=True,
+                            choices=[value for value, label in DIGEST_FREQUENCIES if value != 'never'])
+
+    def handle(self, *args, **options):
+        handled = fan_out_notifications()
+        sent = send_digests(options['frequency'])
+        self.stdout.write('Handled %d new reviews and sent %d digests' % (handled, sent))
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.5 on 2026-10-19 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_remove_user_is_staff_remove_user_is_superuser'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(db_index=True)),
+                ('username', models.CharField(max_length=150)),
+                ('review_count', models.IntegerField(default=0)),
+                ('reviews_deleted', models.IntegerField(default=0)),
+                ('affected_movie_ids', models.JSONField(default=list)),
+                ('date_requested', models.DateTimeField(auto_now_add=True)),
+                ('date_finished', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
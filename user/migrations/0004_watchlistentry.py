@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-19 18:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0010_populate_movieranking_statistics'),
+        ('user', '0003_accountdeletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_added', models.DateTimeField(auto_now_add=True)),
+                ('movie', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movie.movie')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watchlist', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='watchlistentry',
+            constraint=models.UniqueConstraint(fields=('user', 'movie'), name='watchlist_user_movie_unique'),
+        ),
+    ]
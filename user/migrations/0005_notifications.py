@@ -0,0 +1,57 @@
+# Generated by Django 4.2.5 on 2026-10-19 19:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0011_move_long_messages'),
+        ('user', '0004_watchlistentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NotificationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='digest_frequency',
+            field=models.CharField(choices=[('never', 'Never'), ('hourly', 'Hourly'), ('daily', 'Daily')], default='daily', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='watchlistentry',
+            index=models.Index(fields=['movie', 'user'], name='watchlist_movie_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificationevent',
+            name='review',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='review.review'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='review',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='review.review'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('user', 'review'), name='notification_user_review_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-19 19:15
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0005_notifications'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('username'), models.F('id'), models.F('username'), name='user_username_lower_idx'),
+        ),
+    ]
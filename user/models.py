@@ -1,7 +1,21 @@
 from django.core.exceptions import ValidationError
+from django.conf import settings
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import AbstractUser
 
+from primeVideoReviewPlatform.versions import USERNAMES, bump_versions, user_key
+
+# The choices of how often users are sent a digest of new reviews, see user/notifications.py
+DIGEST_FREQUENCIES = [
+    ('never', 'Never'),
+    ('hourly', 'Hourly'),
+    ('daily', 'Daily'),
+]
+
 # The abstract user class provides most of the base functionality needed for a user class, e.g. username, email, etc.
 # See here: https://docs.djangoproject.com/en/4.2/topics/auth/customizing/#django.contrib.auth.models.AbstractBaseUser
 
@@ -19,6 +33,17 @@ class User(AbstractUser):
     # may change and evolve
     is_admin = models.BooleanField(default=False)
 
+    # How often the user is emailed a digest of the new reviews of the movies on their watchlist
+    digest_frequency = models.CharField(max_length=10, choices=DIGEST_FREQUENCIES, default='daily')
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # The user directory lists users in alphabetical order of their usernames ignoring case, and searches them
+            # by the start of their username, see user/directory.py. The username is included so that the directory is
+            # read from the index alone
+            models.Index(Lower('username'), F('id'), F('username'), name='user_username_lower_idx'),
+        ]
+
     # Forms clean data, which means the first and last name are validated to have only alphabetical chars
     def clean(self):
         super().clean()
@@ -27,5 +52,80 @@ class User(AbstractUser):
             raise ValidationError('Names should not contain numbers')
 
 
+# Marks the pages showing a user as changed. Logging in only saves the last login time, which is not shown anywhere
+# else, so the username version is left alone in that case
+@receiver([post_save, post_delete], sender=User)
+def user_changed_callback(sender, instance, update_fields=None, **kwargs):
+    keys = [user_key(instance.id)]
+    if update_fields is None or 'username' in update_fields:
+        keys.append(USERNAMES)
+    bump_versions(keys)
+
+
+# Tracks the progress of deleting an account. Accounts with a lot of reviews are deleted in the background, so this is
+# kept separately from the user, which lets the deletion be resumed if the server restarts part way through
+class AccountDeletion(models.Model):
+    # This is not a foreign key because the user row is deleted at the end, and the record of it should be kept
+    user_id = models.BigIntegerField(db_index=True)
+    username = models.CharField(max_length=150)
+
+    review_count = models.IntegerField(default=0)
+    reviews_deleted = models.IntegerField(default=0)
+
+    # The movies whose reviews have been deleted so far, their average ratings are updated once at the end
+    affected_movie_ids = models.JSONField(default=list)
+
+    date_requested = models.DateTimeField(auto_now_add=True)
+    date_finished = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def is_finished(self):
+        return self.date_finished is not None
+
+
+# A movie a user has saved to watch later. Each row only holds the two ids and when it was added, so a user with
+# thousands of movies on their watchlist only needs a few pages of the table and of its index
+class WatchlistEntry(models.Model):
+    # The index on the user also holds each row's id, which is the order the movies were added in, so the newest entries
+    # of a user's watchlist are read from the end of their part of the index without any sorting
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='watchlist')
+
+    # The index in Meta below starts with the movie, so it is used to find the entries of a deleted movie instead
+    movie = models.ForeignKey('movie.Movie', on_delete=models.CASCADE, related_name='+', db_index=False)
+
+    date_added = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # A movie can only be on a user's watchlist once. The index this creates is also used to check which movies of
+        # a page are on the user's watchlist
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'movie'], name='watchlist_user_movie_unique'),
+        ]
+        indexes = [
+            # Finds the users to notify about a new review of a movie without reading the rest of the table
+            models.Index(fields=['movie', 'user'], name='watchlist_movie_idx'),
+        ]
+
+
+# A review waiting to be announced to the users watching its movie. Writing a review only adds one of these, however
+# many users are watching the movie, and the notifications are made from it afterwards, see user/notifications.py.
+# Rows stay in the table until they have been handled, so nothing is lost if the server restarts in between
+class NotificationEvent(models.Model):
+    review = models.ForeignKey('review.Review', on_delete=models.CASCADE, related_name='+')
+    date_created = models.DateTimeField(auto_now_add=True)
+
+
+# A new review of a movie on the user's watchlist that has not been sent to them yet. They are sent together in a digest
+# and removed once sent
+class Notification(models.Model):
+    # The unique index in Meta below starts with the user, so the notifications are read for each user in order
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', db_index=False)
 
+    # Deleting a review deletes its notifications before they are sent
+    review = models.ForeignKey('review.Review', on_delete=models.CASCADE, related_name='+')
 
+    class Meta:
+        # A review is only announced to each user once, even if its event is handled twice
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'review'], name='notification_user_review_unique'),
+        ]
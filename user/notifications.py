@@ -0,0 +1,111 @@
+import itertools
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import get_template
+
+from primeVideoReviewPlatform.background import run_in_background
+from .models import Notification, NotificationEvent, WatchlistEntry
+
+# Get logger to log the digests that are sent
+logger = logging.getLogger('logger')
+
+# Number of events handled, notifications written per insert, or users sent a digest, at a time
+NOTIFICATION_BATCH_SIZE = 1000
+
+# New reviews are turned into notifications in the background at most this often while reviews are being written.
+# Reviews written in between are picked up by the next run, or by the send_notification_digests command
+FAN_OUT_INTERVAL_SECONDS = 10
+FAN_OUT_LOCK_KEY = 'notifications:fan_out'
+
+# Number of reviews listed in each digest, any more are only counted
+DIGEST_MAX_REVIEWS = 20
+
+
+# Queues the announcement of a review that has just been written. This is a single insert, the users watching the movie
+# are only looked up in the background, so a review of a movie with many watchers is written as quickly as any other
+def queue_review_notification(review):
+    NotificationEvent.objects.create(review=review)
+    # The background thread uses its own connection, so it has to wait until the event has been committed to see it
+    transaction.on_commit(schedule_notification_fan_out)
+
+
+def schedule_notification_fan_out():
+    if cache.add(FAN_OUT_LOCK_KEY, True, FAN_OUT_INTERVAL_SECONDS):
+        run_in_background(fan_out_notifications)
+
+
+# Turns each queued review into a notification for every user watching its movie, except its author and users who do
+# not want digests. Each event is removed in the same transaction as its notifications are written, so an event is
+# handled again if this stops part way through, and the unique constraint stops that from notifying anyone twice.
+# Returns the number of events handled
+def fan_out_notifications(batch_size=NOTIFICATION_BATCH_SIZE):
+    handled = 0
+    while True:
+        events = list(NotificationEvent.objects.order_by('id')
+                      .values_list('id', 'review_id', 'review__movie_id', 'review__user_id')[:batch_size])
+        if not events:
+            return handled
+        for event_id, review_id, movie_id, author_id in events:
+            # These are read from the watchlist_movie_idx index
+            watchers = WatchlistEntry.objects.filter(movie_id=movie_id, user__is_active=True) \
+                .exclude(user_id=author_id).exclude(user__digest_frequency='never') \
+                .values_list('user_id', flat=True).iterator(chunk_size=batch_size)
+            with transaction.atomic():
+                # A popular movie may have many watchers, so they are read and written a batch at a time
+                while True:
+                    user_ids = list(itertools.islice(watchers, batch_size))
+                    if not user_ids:
+                        break
+                    Notification.objects.bulk_create([Notification(user_id=user_id, review_id=review_id)
+                                                      for user_id in user_ids], ignore_conflicts=True)
+                NotificationEvent.objects.filter(id=event_id).delete()
+        handled += len(events)
+
+
+# Emails every user with the given digest frequency a digest of the reviews they have been notified about, then removes
+# those notifications. The users are handled in batches: the notifications of a whole batch are read with one query, the
+# template is only loaded once, and the emails of a batch are sent over one connection. Reviews hidden since they were
+# written are left out. Returns the number of digests sent
+def send_digests(frequency, batch_size=NOTIFICATION_BATCH_SIZE):
+    template = get_template('user/digest_email.txt')
+    sent = 0
+    last_user_id = 0
+    while True:
+        user_ids = list(Notification.objects.filter(user__digest_frequency=frequency, user_id__gt=last_user_id)
+                        .order_by('user_id').values_list('user_id', flat=True).distinct()[:batch_size])
+        if not user_ids:
+            return sent
+        last_user_id = user_ids[-1]
+        notifications = Notification.objects.filter(user_id__in=user_ids) \
+            .select_related('user', 'review__movie', 'review__user') \
+            .only('user', 'user__username', 'user__email', 'review', 'review__title', 'review__excerpt',
+                  'review__rating_out_of_five', 'review__hidden_at', 'review__movie', 'review__movie__title',
+                  'review__user', 'review__user__username') \
+            .order_by('user_id', 'review_id')
+
+        digests = {}
+        last_notification_id = 0
+        for notification in notifications:
+            last_notification_id = max(last_notification_id, notification.id)
+            if notification.review.hidden_at is None:
+                digests.setdefault(notification.user_id, (notification.user, []))[1].append(notification.review)
+
+        messages = []
+        for user, reviews in digests.values():
+            # Users without an email address cannot be sent a digest, so their notifications are simply dropped
+            if not user.email:
+                continue
+            body = template.render({'user': user, 'reviews': reviews[:DIGEST_MAX_REVIEWS],
+                                    'more_count': max(len(reviews) - DIGEST_MAX_REVIEWS, 0)})
+            subject = '%d new review%s of movies on your watchlist' % (len(reviews), '' if len(reviews) == 1 else 's')
+            messages.append(EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [user.email]))
+        # If sending fails the notifications are kept, so they are sent with the next digest
+        get_connection().send_messages(messages)
+        # Notifications added while the digests were being sent are kept for the next digest
+        Notification.objects.filter(user_id__in=user_ids, id__lte=last_notification_id).delete()
+        sent += len(messages)
+        logger.info('Sent ' + str(len(messages)) + ' ' + frequency + ' notification digests')
@@ -1,4 +1,7 @@
 from user.tests.create_tests import CreateUserTestCase
 from user.tests.read_tests import ReadUserTestCase
 from user.tests.update_tests import UpdateUserTestCase
-from user.tests.delete_tests import DeleteUserTestCase
\ No newline at end of file
+from user.tests.delete_tests import DeleteUserTestCase
+from user.tests.watchlist_tests import WatchlistTestCase
+from user.tests.notification_tests import NotificationTestCase
+from user.tests.directory_tests import UserDirectoryTestCase
@@ -1,7 +1,9 @@
+import time
 from unittest.mock import patch
 
 from django.core.exceptions import ValidationError
 from django.test import TestCase, Client
+from primeVideoReviewPlatform import rate_limit
 from user.models import User
 from django.urls import reverse
 
@@ -62,3 +64,16 @@ class CreateUserTestCase(BaseTestCase):
         response = self.client.post(reverse('register'), invalid_details)
         self.assertFalse(User.objects.filter(username=invalid_details['username']).exists())
         self.assertTrue(mock_logger.warning.called)
+
+    def test_that_an_ip_address_can_only_register_so_many_accounts_in_a_row(self):
+        # The clock is stopped so that no token is added back while the accounts are created
+        with patch.object(rate_limit.time, 'time', return_value=time.time()):
+            for number in range(5):
+                details = get_valid_account_details()
+                details['username'] = details['username'] + 'abcde'[number]
+                details['email'] = details['username'] + '@email.com'
+                self.assertEqual(self.client.post(reverse('register'), details).status_code, 302)
+            response = self.client.post(reverse('register'), get_valid_account_details())
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertFalse(User.objects.filter(email=get_valid_account_details()['email']).exists())
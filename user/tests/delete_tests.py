@@ -1,7 +1,14 @@
+from datetime import timedelta, datetime
+from unittest.mock import patch
+
 from django.test import TestCase, Client
-from user.models import User
+from user.models import User, AccountDeletion
 from django.urls import reverse
 
+from movie.models import Movie
+from review.models import Review, ReviewVote
+from user.deletion import start_account_deletion, run_account_deletion
+
 from user.tests.test_utils import BaseTestCase
 
 
@@ -48,3 +55,63 @@ class DeleteUserTestCase(BaseTestCase):
         self.assertTemplateUsed(response, 'registration/login.html')
         self.assertEqual(response.status_code, 200) # The login page is rendered successfully
 
+    def create_reviews_for_user(self, user, ratings):
+        movies = []
+        for i, rating in enumerate(ratings):
+            movie = Movie.objects.create(title='Movie ' + str(i), description='Description',
+                                         duration=timedelta(hours=2), date_released=datetime.today())
+            Review.objects.create(user=user, movie=movie, title='title', message='message', rating_out_of_five=rating)
+            movies.append(movie)
+        return movies
+
+    def test_that_deleting_an_account_deletes_its_reviews_and_recalculates_the_movie_ratings(self):
+        movie = self.create_reviews_for_user(self.user, [1])[0]
+        Review.objects.create(user=self.another_user, movie=movie, title='title', message='message',
+                              rating_out_of_five=5)
+        movie.average_rating_out_of_five = 3
+        movie.save()
+        self.client.post(reverse('user:delete', args=[self.user.id]))
+        movie.refresh_from_db()
+        self.assertFalse(Review.objects.filter(user_id=self.user.id).exists())
+        self.assertEqual(movie.average_rating_out_of_five, 5)
+
+    def test_that_an_account_deletion_removes_reviews_in_batches_and_records_its_progress(self):
+        self.create_reviews_for_user(self.user, [1, 2, 3, 4, 5])
+        deletion = start_account_deletion(self.user)
+        self.assertFalse(User.objects.get(id=self.user.id).is_active)
+        deletion = run_account_deletion(deletion.id, batch_size=2, pause_seconds=0)
+        self.assertEqual(deletion.review_count, 5)
+        self.assertEqual(deletion.reviews_deleted, 5)
+        self.assertEqual(len(deletion.affected_movie_ids), 5)
+        self.assertTrue(deletion.is_finished)
+        self.assertFalse(User.objects.filter(id=self.user.id).exists())
+
+    def test_that_every_affected_movie_has_no_rating_after_its_only_review_is_deleted(self):
+        movies = self.create_reviews_for_user(self.user, [4, 5])
+        Movie.objects.update(average_rating_out_of_five=4)
+        run_account_deletion(start_account_deletion(self.user).id, batch_size=1, pause_seconds=0)
+        for movie in movies:
+            movie.refresh_from_db()
+            self.assertIsNone(movie.average_rating_out_of_five)
+
+    def test_that_deleting_an_account_takes_its_votes_off_the_reviews_it_voted_on(self):
+        movie = self.create_reviews_for_user(self.another_user, [4])[0]
+        review = Review.objects.get(movie=movie)
+        ReviewVote.objects.create(review=review, user=self.user, is_helpful=True, is_flushed=True)
+        Review.objects.filter(id=review.id).update(helpful_count=1, helpfulness=1)
+        run_account_deletion(start_account_deletion(self.user).id, batch_size=1, pause_seconds=0)
+        review.refresh_from_db()
+        self.assertFalse(ReviewVote.objects.filter(review=review).exists())
+        self.assertEqual(review.helpful_count, 0)
+        self.assertEqual(review.helpfulness, 0)
+
+    @patch('user.views.DELETION_BATCH_SIZE', 1)
+    @patch('user.views.run_in_background')
+    def test_that_accounts_with_many_reviews_are_deleted_in_the_background(self, mock_run_in_background):
+        self.create_reviews_for_user(self.user, [3, 3])
+        response = self.client.post(reverse('user:delete', args=[self.user.id]))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(mock_run_in_background.called)
+        # The account cannot be used while it is being deleted
+        self.assertFalse(User.objects.get(id=self.user.id).is_active)
+        self.assertTrue(AccountDeletion.objects.filter(user_id=self.user.id, date_finished__isnull=True).exists())
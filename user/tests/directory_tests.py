@@ -0,0 +1,80 @@
+from datetime import timedelta, datetime
+from unittest.mock import patch
+
+from django.urls import reverse
+
+from movie.models import Movie
+from review.models import Review
+from review.moderation import hide_reviews
+from user.directory import get_prefix_end, get_review_counts
+from user.models import User
+from user.tests.test_utils import BaseTestCase
+
+
+class UserDirectoryTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for username in ['Alice', 'albert', 'ALFRED', 'bob', 'Alba']:
+            User.objects.create(username=username, email=username + '@email.com', password='asdfasdf123123')
+        cls.movie = Movie.objects.create(title='Reviewed Movie', description='Description',
+                                         duration=timedelta(hours=2), date_released=datetime.today())
+
+    def get_usernames(self, query):
+        response = self.client.get(reverse('user:list'), query)
+        return [user['username'] for user in response.context['users']]
+
+    def test_that_users_are_listed_in_alphabetical_order_ignoring_case(self):
+        self.assertEqual(self.get_usernames({}), ['Alba', 'albert', 'ALFRED', 'Alice', 'bob', 'test_user',
+                                                  'test_user2'])
+
+    def test_that_users_can_be_searched_by_the_start_of_their_username_ignoring_case(self):
+        self.assertEqual(self.get_usernames({'username': 'AL'}), ['Alba', 'albert', 'ALFRED', 'Alice'])
+        self.assertEqual(self.get_usernames({'username': 'alb'}), ['Alba', 'albert'])
+        self.assertEqual(self.get_usernames({'username': 'lice'}), [])
+        self.assertContains(self.client.get(reverse('user:list'), {'username': 'zzz'}), 'No users were found!')
+
+    def test_that_a_search_ending_in_the_last_unicode_character_does_not_fail(self):
+        User.objects.create(username='al\U0010ffffx', email='last@email.com', password='asdfasdf123123')
+        response = self.client.get(reverse('user:list') + '?username=%F4%8F%BF%BF')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_usernames({'username': 'al\U0010ffff'}), ['al\U0010ffffx'])
+        self.assertEqual(get_prefix_end('al\U0010ffff'), 'am')
+        self.assertIsNone(get_prefix_end('\U0010ffff\U0010ffff'))
+        self.assertEqual(get_prefix_end('\ud7ff'), '\ue000')
+
+    @patch('user.views.USER_DIRECTORY_PAGE_SIZE', 2)
+    @patch('user.directory.USER_DIRECTORY_PAGE_SIZE', 2)
+    def test_that_each_page_carries_on_from_the_last_user_of_the_previous_page(self):
+        usernames = []
+        query = 'username=a'
+        while query is not None:
+            response = self.client.get(reverse('user:list') + '?' + query)
+            usernames += [user['username'] for user in response.context['users']]
+            query = response.context.get('next_query')
+        self.assertEqual(usernames, ['Alba', 'albert', 'ALFRED', 'Alice'])
+
+    def test_that_review_counts_are_cached_until_the_users_reviews_change(self):
+        review = Review.objects.create(user=self.user, movie=self.movie, title='title', message='message',
+                                       rating_out_of_five=4)
+        user_ids = [self.user.id, self.another_user.id]
+        with self.assertNumQueries(1):
+            self.assertEqual(get_review_counts(user_ids), {self.user.id: 1, self.another_user.id: 0})
+        with self.assertNumQueries(0):
+            get_review_counts(user_ids)
+        hide_reviews([review.id], 'spam')
+        self.assertEqual(get_review_counts(user_ids), {self.user.id: 0, self.another_user.id: 0})
+
+    def test_that_the_list_shows_review_counts_and_reads_no_more_than_it_shows(self):
+        Review.objects.create(user=self.user, movie=self.movie, title='title', message='message',
+                              rating_out_of_five=4)
+        response = self.client.get(reverse('user:list'), {'username': 'test_user'})
+        self.assertContains(response, '1 review<')
+        self.assertContains(response, '0 reviews<')
+        self.assertEqual(set(response.context['users'][0]), {'id', 'username', 'review_count'})
+
+    def test_that_a_users_email_is_only_shown_to_themselves(self):
+        self.assertContains(self.client.get(reverse('user:detail', args=[self.user.id])), self.user.email)
+        self.assertNotContains(self.client.get(reverse('user:detail', args=[self.another_user.id])),
+                               self.another_user.email)
@@ -0,0 +1,88 @@
+from datetime import timedelta, datetime
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from movie.models import Movie
+from review.models import Review
+from review.moderation import hide_reviews
+from user.models import Notification, NotificationEvent, User, WatchlistEntry
+from user.notifications import DIGEST_MAX_REVIEWS, fan_out_notifications, send_digests
+from user.tests.test_utils import BaseTestCase
+
+
+class NotificationTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.movie = Movie.objects.create(title='Watched Movie', description='Description', duration=timedelta(hours=2),
+                                         date_released=datetime.today())
+        WatchlistEntry.objects.create(user=cls.user, movie=cls.movie)
+
+    def setUp(self):
+        super().setUp()
+        # The fan out is only started once every few seconds, which is remembered in the cache
+        cache.clear()
+
+    # Writes a review of the movie through the site as a new user
+    def write_review(self, title='review title', movie=None):
+        author = User.objects.create(username='author_' + title, email=title + '@email.com', password='asdfasdf123123')
+        client = Client()
+        client.force_login(author)
+        client.post(reverse('review:create', args=[(movie or self.movie).id]),
+                    {'title': title, 'message': 'review message', 'rating_out_of_five': 4})
+        return Review.objects.get(title=title)
+
+    @patch('user.notifications.run_in_background')
+    def test_that_writing_a_review_only_queues_an_event_and_starts_the_fan_out_after_committing(self,
+                                                                                               mock_run_in_background):
+        with self.captureOnCommitCallbacks(execute=True):
+            review = self.write_review()
+        self.assertEqual(list(NotificationEvent.objects.values_list('review_id', flat=True)), [review.id])
+        self.assertFalse(Notification.objects.exists())
+        mock_run_in_background.assert_called_once_with(fan_out_notifications)
+
+    def test_that_the_fan_out_notifies_the_users_watching_the_movie(self):
+        review = self.write_review()
+        # The author and users who do not want digests are not notified
+        WatchlistEntry.objects.create(user=review.user, movie=self.movie)
+        WatchlistEntry.objects.create(user=self.another_user, movie=self.movie)
+        self.another_user.digest_frequency = 'never'
+        self.another_user.save()
+        self.assertEqual(fan_out_notifications(), 1)
+        self.assertEqual(list(Notification.objects.values_list('user_id', 'review_id')), [(self.user.id, review.id)])
+        self.assertFalse(NotificationEvent.objects.exists())
+        # Handling the same review again does not notify anyone twice
+        NotificationEvent.objects.create(review=review)
+        fan_out_notifications(batch_size=1)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_that_each_user_gets_one_digest_of_their_notifications(self):
+        for index in range(DIGEST_MAX_REVIEWS + 2):
+            self.write_review('review_%d' % index)
+        hidden = self.write_review('hidden review')
+        fan_out_notifications()
+        hide_reviews([hidden.id], 'moderated')
+        # Daily digests are not sent with the hourly ones
+        self.assertEqual(send_digests('hourly'), 0)
+        self.assertEqual(send_digests('daily'), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.user.email])
+        self.assertIn('%d new reviews' % (DIGEST_MAX_REVIEWS + 2), mail.outbox[0].subject)
+        self.assertIn('Watched Movie: "review_0"', mail.outbox[0].body)
+        self.assertIn('and 2 more', mail.outbox[0].body)
+        self.assertNotIn('hidden review', mail.outbox[0].body)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(send_digests('daily'), 0)
+
+    def test_that_a_user_can_choose_how_often_they_get_digests(self):
+        response = self.client.post(reverse('user:digest_frequency'), {'digest_frequency': 'hourly'})
+        self.assertRedirects(response, reverse('user:detail', args=[self.user.id]))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.digest_frequency, 'hourly')
+        response = self.client.post(reverse('user:digest_frequency'), {'digest_frequency': 'weekly'})
+        self.assertEqual(response.status_code, 400)
@@ -3,6 +3,10 @@ from django.test import TestCase, Client
 from user.models import User
 from django.urls import reverse
 
+from datetime import timedelta, datetime
+
+from movie.models import Movie
+from review.models import Review
 from user.tests.test_utils import BaseTestCase
 
 
@@ -21,3 +25,11 @@ class ReadUserTestCase(BaseTestCase):
     def test_that_user_is_redirected_to_where_they_were_before_after_logging_in(self):
         self.client.logout()
         response = self.client.get(reverse('review:list', args=[1]))
+
+    def test_that_a_users_profile_shows_their_recent_reviews(self):
+        movie = Movie.objects.create(title='Reviewed Movie', description='Description', duration=timedelta(hours=2),
+                                     date_released=datetime.today())
+        Review.objects.create(user=self.user, movie=movie, title='my review', message='message', rating_out_of_five=4)
+        response = self.client.get(reverse('user:detail', args=[self.user.id]))
+        self.assertEqual(len(response.context['recent_reviews']), 1)
+        self.assertContains(response, 'Reviewed Movie')
@@ -1,23 +1,33 @@
+from django.core.cache import cache, caches
 from django.test import TestCase, Client
 from user.models import User
+from primeVideoReviewPlatform import two_tier_cache
 
 
 class BaseTestCase(TestCase):
-    def setUp(self):
-        self.client = Client()
-        self.user = User.objects.create(
+    # The users are created once for each class rather than once for each test. Each test runs in a transaction that is
+    # rolled back afterwards, and gets its own copy of these objects, so tests can still change them
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
             username='test_user',
             email="JDoe@email.com",
             password='asdfasdf123123'
         )
-        self.user.save()
-        self.client.force_login(self.user)
-        self.another_user = User.objects.create(
+        cls.another_user = User.objects.create(
             username='test_user2',
             email="JDoe2@email.com",
             password='asdfasdf123123'
         )
-        self.another_user.save()
+
+    def setUp(self):
+        # The caches are not rolled back with the database. The rate limits are counted in the cache, and every test
+        # client posts from the same address
+        cache.clear()
+        caches['local'].clear()
+        two_tier_cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
 
 
 def get_valid_account_details():
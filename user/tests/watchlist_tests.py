@@ -0,0 +1,62 @@
+from datetime import timedelta, datetime
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from movie.models import Movie
+from user.models import WatchlistEntry
+from user.tests.test_utils import BaseTestCase
+
+
+class WatchlistTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.movies = [Movie.objects.create(title='Movie %d' % index, description='Description',
+                                           duration=timedelta(hours=2), date_released=datetime.today())
+                      for index in range(8)]
+
+    def change_watchlist(self, movie, action):
+        return self.client.post(reverse('user:watchlist', args=[movie.id]), {'action': action})
+
+    def test_that_a_movie_can_be_added_to_and_removed_from_the_watchlist(self):
+        movie = self.movies[0]
+        response = self.change_watchlist(movie, 'add')
+        self.assertRedirects(response, reverse('detail', args=[movie.id]))
+        # Adding a movie twice keeps one entry
+        self.change_watchlist(movie, 'add')
+        self.assertEqual(WatchlistEntry.objects.filter(user=self.user, movie=movie).count(), 1)
+        response = self.client.get(reverse('detail', args=[movie.id]))
+        self.assertTrue(response.context['on_watchlist'])
+        self.assertContains(response, 'Remove from your watchlist')
+        self.change_watchlist(movie, 'remove')
+        self.assertFalse(WatchlistEntry.objects.filter(user=self.user).exists())
+
+    def test_that_the_watchlist_needs_a_logged_in_user_and_a_valid_action(self):
+        self.assertEqual(self.change_watchlist(self.movies[0], 'watch').status_code, 400)
+        self.client.logout()
+        self.change_watchlist(self.movies[0], 'add')
+        self.assertFalse(WatchlistEntry.objects.exists())
+
+    def test_that_the_movie_list_checks_the_whole_page_against_the_watchlist_in_one_query(self):
+        for movie in self.movies[:3]:
+            self.change_watchlist(movie, 'add')
+        # Another user's watchlist is not shown
+        WatchlistEntry.objects.create(user=self.another_user, movie=self.movies[4])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('list'))
+        self.assertEqual(response.context['watchlisted_movie_ids'], {movie.id for movie in self.movies[:3]})
+        self.assertContains(response, 'On your watchlist', count=3)
+        self.assertEqual(len([query for query in queries if 'user_watchlistentry' in query['sql']]), 1)
+
+    def test_that_a_users_watchlist_is_shown_on_their_profile_newest_first(self):
+        for movie in self.movies[:3]:
+            self.change_watchlist(movie, 'add')
+        response = self.client.get(reverse('user:detail', args=[self.user.id]))
+        self.assertEqual(response.context['watchlist'], list(reversed(self.movies[:3])))
+        self.assertEqual(response.context['watchlist_count'], 3)
+        # Other users cannot see it
+        response = self.client.get(reverse('user:detail', args=[self.another_user.id]))
+        self.assertNotIn('watchlist', response.context)
@@ -11,4 +11,6 @@ urlpatterns = [
     path('<int:pk>/', views.UserDetailView.as_view(), name='detail'),
     path('<int:pk>/update/', views.UserUpdateView.as_view(), name='update'),
     path('<int:pk>/delete/', views.UserDeleteView.as_view(), name='delete'),
+    path('watchlist/<int:movie_id>/', views.WatchlistView.as_view(), name='watchlist'),
+    path('digest-frequency/', views.DigestFrequencyView.as_view(), name='digest_frequency'),
 ]
\ No newline at end of file
@@ -1,6 +1,6 @@
 import logging
 
-from django.contrib.auth import login, user_login_failed, update_session_auth_hash
+from django.contrib.auth import login, logout, user_login_failed, update_session_auth_hash
 
 # This mixin means only authenticated users can access the views that take it in their constructor
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -8,33 +8,122 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import PasswordChangeView
 from django.core.exceptions import PermissionDenied
 from django.dispatch import receiver
-from django.shortcuts import render, redirect
+from django.http import HttpResponseBadRequest, HttpResponseRedirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse_lazy, reverse
+from django.utils.decorators import method_decorator
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.views import generic
-
-from .forms import UserRegistrationForm
-from .models import User
+from django.views.decorators.http import condition
+
+from primeVideoReviewPlatform.background import run_in_background
+from primeVideoReviewPlatform.rate_limit import check_rate_limit, too_many_requests
+from primeVideoReviewPlatform.versions import REVIEW_COUNTS, USERNAMES, make_etag, user_key
+from .deletion import DELETION_BATCH_SIZE, start_account_deletion, run_account_deletion
+from movie.models import Movie
+from review.models import Review
+from .directory import USER_DIRECTORY_PAGE_SIZE, get_review_counts, get_user_directory
+from .forms import UserRegistrationForm, UserSearchForm
+from .models import DIGEST_FREQUENCIES, User
+from .watchlist import add_to_watchlist, get_watchlist, remove_from_watchlist
 
 # Get logger to log form errors
 logger = logging.getLogger('logger')
 
+# Number of reviews shown on a user's profile
+RECENT_REVIEWS_ON_PROFILE = 5
 
-# This lists all the users
-class UserListView(generic.ListView):
-    model = User
+
+# These build the ETag of each page from the versions of the data shown on it, see primeVideoReviewPlatform/versions.py
+def user_list_etag(request, *args, **kwargs):
+    return make_etag(request, [USERNAMES, REVIEW_COUNTS])
+
+
+def user_detail_etag(request, *args, **kwargs):
+    return make_etag(request, [user_key(kwargs['pk'])])
+
+
+# This lists the users in alphabetical order of their usernames, or those whose username starts with what was searched
+# for, along with how many reviews each has written. See user/directory.py
+@method_decorator(condition(etag_func=user_list_etag), name='dispatch')
+class UserListView(generic.TemplateView):
     # Renders the result to the list.html file
     template_name = 'user/list.html'
-    context_object_name = 'users'
-    # Displays 8 users per page
-    paginate_by = 8
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        search = UserSearchForm(self.request.GET)
+        users = []
+        if search.is_valid():
+            after = None
+            if search.cleaned_data['after']:
+                after = User.objects.filter(id=search.cleaned_data['after']).only('id', 'username').first()
+            users = list(get_user_directory(search.cleaned_data['username'], after))
+        review_counts = get_review_counts([user['id'] for user in users])
+        for user in users:
+            user['review_count'] = review_counts[user['id']]
+        context['search'] = search
+        context['users'] = users
+        # A full page means there may be more users, which the next page starts after
+        if len(users) == USER_DIRECTORY_PAGE_SIZE:
+            next_query = self.request.GET.copy()
+            next_query['after'] = users[-1]['id']
+            context['next_query'] = next_query.urlencode()
+        return context
 
 
 # Displays an individual user with more information
+@method_decorator(condition(etag_func=user_detail_etag), name='dispatch')
 class UserDetailView(generic.DetailView):
     model = User
     # Renders the result to the detail.html file
     template_name = 'user/detail.html'
     context_object_name = 'displayed_user'
+    # Only the columns shown on the profile are read, leaving out e.g. the password hash
+    queryset = User.objects.only('id', 'username', 'first_name', 'last_name', 'email', 'is_admin', 'digest_frequency')
+
+    # The profile shows the user's most recent reviews, read in order from the review_user_posted_idx index
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['recent_reviews'] = (Review.objects.filter(user=self.object).select_related('movie')
+                                     .order_by('-date_posted')[:RECENT_REVIEWS_ON_PROFILE])
+        # A user's watchlist is only shown to themselves
+        if self.request.user == self.object:
+            context['watchlist'] = get_watchlist(self.object)
+            context['watchlist_count'] = self.object.watchlist.count()
+            context['digest_frequencies'] = DIGEST_FREQUENCIES
+        return context
+
+
+# Changes how often the logged in user is emailed a digest of the new reviews of the movies on their watchlist
+class DigestFrequencyView(LoginRequiredMixin, generic.View):
+
+    def post(self, request, *args, **kwargs):
+        frequency = request.POST.get('digest_frequency')
+        if frequency not in [value for value, label in DIGEST_FREQUENCIES]:
+            return HttpResponseBadRequest('There is no such digest frequency')
+        request.user.digest_frequency = frequency
+        request.user.save(update_fields=['digest_frequency'])
+        return HttpResponseRedirect(reverse('user:detail', args=[request.user.id]))
+
+
+# Adds a movie to the logged in user's watchlist or removes it
+class WatchlistView(LoginRequiredMixin, generic.View):
+
+    def post(self, request, *args, **kwargs):
+        movie = get_object_or_404(Movie, id=self.kwargs['movie_id'])
+        action = request.POST.get('action')
+        if action == 'add':
+            add_to_watchlist(request.user, movie.id)
+        elif action == 'remove':
+            remove_from_watchlist(request.user, movie.id)
+        else:
+            return HttpResponseBadRequest('The action must be add or remove')
+        # Goes back to the page the movie was added from, which is only allowed to be a page of this site
+        next_url = request.POST.get('next')
+        if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+            next_url = reverse('detail', args=[movie.id])
+        return HttpResponseRedirect(next_url)
 
 
 # Handles the editing/updating of existing users
@@ -101,6 +190,18 @@ class UserDeleteView(LoginRequiredMixin, generic.DeleteView):
             raise PermissionDenied('You cannot delete someone else\'s user profile!')
         return self.request.user
 
+    # Deleting a user deletes all of their reviews, which could take a long time and lock the database for an account
+    # with a lot of reviews. Instead, the reviews are deleted in small batches and the movie ratings are updated once at
+    # the end. Small accounts are deleted straight away, larger ones are deleted in the background
+    def form_valid(self, form):
+        deletion = start_account_deletion(self.object)
+        logout(self.request)
+        if deletion.review_count <= DELETION_BATCH_SIZE:
+            run_account_deletion(deletion.id, pause_seconds=0)
+        else:
+            run_in_background(run_account_deletion, deletion.id)
+        return HttpResponseRedirect(self.get_success_url())
+
 
 # Extending Django's built in password change view so we can log if there is an error
 class CustomPasswordChangeView(PasswordChangeView):
@@ -122,7 +223,11 @@ class CustomPasswordChangeView(PasswordChangeView):
 
 # This method handles the creation of new users
 def register(request):
+    # Each IP address can only create so many accounts in a row, which stops scripts from creating many accounts
     if request.method == 'POST':
+        wait = check_rate_limit(request, 'register')
+        if wait:
+            return too_many_requests(request, 'register', wait)
         form = UserRegistrationForm(request.POST)
 
         # We check if the names have any digits. The reason we do this manually instead of relying on the error raised
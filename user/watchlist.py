@@ -0,0 +1,39 @@
+from django.db import IntegrityError, transaction
+
+from primeVideoReviewPlatform.versions import bump_versions, user_key
+from .models import WatchlistEntry
+
+# Number of movies shown on the watchlist of a user's profile, newest first
+WATCHLIST_ON_PROFILE = 20
+
+
+# Returns the ids of the given movies that are on the user's watchlist, e.g. for every movie of a page, with one query
+# on the watchlist_user_movie_unique index however many movies are checked
+def get_watchlisted_movie_ids(user, movie_ids):
+    if not user.is_authenticated or not movie_ids:
+        return set()
+    return set(WatchlistEntry.objects.filter(user_id=user.id, movie_id__in=list(movie_ids))
+               .values_list('movie_id', flat=True))
+
+
+# Returns the movies most recently added to the user's watchlist, read from the end of the user's part of their index
+def get_watchlist(user, limit=WATCHLIST_ON_PROFILE):
+    return [entry.movie for entry in WatchlistEntry.objects.filter(user_id=user.id).select_related('movie')
+            .only('movie', 'movie__title').order_by('-id')[:limit]]
+
+
+def add_to_watchlist(user, movie_id):
+    try:
+        # The savepoint lets the request carry on if the movie was already on the watchlist
+        with transaction.atomic():
+            WatchlistEntry.objects.create(user_id=user.id, movie_id=movie_id)
+    except IntegrityError:
+        return
+    # Every page a user sees shows whether movies are on their watchlist, and each page's ETag includes the version of
+    # the user viewing it, see primeVideoReviewPlatform/versions.py
+    bump_versions([user_key(user.id)])
+
+
+def remove_from_watchlist(user, movie_id):
+    if WatchlistEntry.objects.filter(user_id=user.id, movie_id=movie_id).delete()[0]:
+        bump_versions([user_key(user.id)])